@@ -1,13 +1,42 @@
 import os
+import json
 import logging
 import asyncio
 import threading
 import http.server
 import socketserver
+import time
+import signal
+import hashlib
+import itertools
+import heapq
+import re
+import queue
+import random
+import atexit
+import bisect
+import contextlib
+import contextvars
+import functools
+import gzip
+import math
+import multiprocessing
+import secrets
+import sqlite3
+import sys
+import tracemalloc
+import unicodedata
+import zlib
+import logging.handlers
+from collections import OrderedDict, deque
+from collections.abc import MutableMapping
 from typing import Dict, Any, List
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta, date, time as dtime
+from zoneinfo import ZoneInfo
 
+import httpx
 from dotenv import load_dotenv
+import groq
 from groq import Groq
 
 from telegram import (
@@ -16,7 +45,12 @@ from telegram import (
     InlineKeyboardMarkup,
     ReplyKeyboardMarkup,
     LabeledPrice,
+    InputMediaPhoto,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
 )
+from telegram.request import BaseRequest
+from telegram.error import BadRequest, Forbidden, RetryAfter, TelegramError
 from telegram.ext import (
     ApplicationBuilder,
     CommandHandler,
@@ -25,6 +59,10 @@ from telegram.ext import (
     ConversationHandler,
     ContextTypes,
     PreCheckoutQueryHandler,
+    TypeHandler,
+    InlineQueryHandler,
+    ApplicationHandlerStop,
+    BaseRateLimiter,
     filters,
 )
 
@@ -33,10 +71,145 @@ from telegram.ext import (
 load_dotenv()
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# alte servere decât cele reale, de ex. Bot API-ul și Groq-ul false din loadtest.py
+TELEGRAM_BASE_URL = os.getenv("TELEGRAM_BASE_URL", "https://api.telegram.org").rstrip("/")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+# mai multe chei separate prin virgulă (altfel doar GROQ_API_KEY) și modele în ordinea preferinței
+GROQ_API_KEYS = [k.strip() for k in os.getenv("GROQ_API_KEYS", GROQ_API_KEY or "").split(",") if k.strip()]
+GROQ_CONSULT_MODELS = [
+    m.strip() for m in os.getenv("GROQ_CONSULT_MODELS", "llama-3.3-70b-versatile").split(",") if m.strip()
+]
+GROQ_CARD_MODELS = [
+    m.strip() for m in os.getenv("GROQ_CARD_MODELS", "llama-3.1-70b-versatile").split(",") if m.strip()
+]
+GROQ_MAX_INFLIGHT = int(os.getenv("GROQ_MAX_INFLIGHT", "4"))  # cereri simultane per cheie și model
+GROQ_QUEUE_MAX = int(os.getenv("GROQ_QUEUE_MAX", "50"))
+GROQ_QUEUE_TIMEOUT = float(os.getenv("GROQ_QUEUE_TIMEOUT", "20"))
+
+# Cost AI: prețuri USD per 1M tokeni [input, output], buget zilnic per magazin (0 = nelimitat).
+# Peste AI_DEGRADE_AT × buget: prompturi scurte + GROQ_LEAN_MODELS; peste buget: doar răspunsuri din cache.
+GROQ_PRICES = {
+    "llama-3.3-70b-versatile": [0.59, 0.79],
+    "llama-3.1-70b-versatile": [0.59, 0.79],
+    "llama-3.1-8b-instant": [0.05, 0.08],
+    **json.loads(os.getenv("GROQ_PRICES", "{}")),
+}
+GROQ_LEAN_MODELS = [
+    m.strip() for m in os.getenv("GROQ_LEAN_MODELS", "llama-3.1-8b-instant").split(",") if m.strip()
+]
+AI_DAILY_BUDGET_USD = float(os.getenv("AI_DAILY_BUDGET_USD", "0"))
+AI_DEGRADE_AT = float(os.getenv("AI_DEGRADE_AT", "0.8"))
+AI_CONSULT_MAX_TOKENS = int(os.getenv("AI_CONSULT_MAX_TOKENS", "700"))
+AI_CARD_MAX_TOKENS = int(os.getenv("AI_CARD_MAX_TOKENS", "400"))
+AI_ANSWER_CACHE_MAX = int(os.getenv("AI_ANSWER_CACHE_MAX", "500"))
+AI_USER_STATS_DAYS = int(os.getenv("AI_USER_STATS_DAYS", "7"))  # detaliu per user, apoi doar totaluri
+
+# Recomandări precalculate pentru profilurile frecvente (0 = dezactivat); se completează în fundal
+AI_PRECOMPUTE_CONCURRENCY = int(os.getenv("AI_PRECOMPUTE_CONCURRENCY", "2"))
+AI_PRECOMPUTE_INTERVAL_MINUTES = float(os.getenv("AI_PRECOMPUTE_INTERVAL_MINUTES", "60"))
 ADMIN_CHAT_ID = os.getenv("ADMIN_CHAT_ID")
 SUPPORT_CHAT_ID = os.getenv("SUPPORT_CHAT_ID")  # optional, alt chat pentru operatori
 PAYMENT_PROVIDER_TOKEN = os.getenv("PAYMENT_PROVIDER_TOKEN")  # pentru Telegram Payments
 
+# Sincronizare comenzi în fundal (Google Sheets / CRM)
+ORDER_SYNC_URL = os.getenv("ORDER_SYNC_URL")  # webhook care primește loturi JSON
+ORDER_SYNC_FILE = os.getenv("ORDER_SYNC_FILE")  # sink local JSONL (teste / fără CRM)
+ORDER_SYNC_BATCH_SIZE = int(os.getenv("ORDER_SYNC_BATCH_SIZE", "20"))
+ORDER_SYNC_FLUSH_SECONDS = float(os.getenv("ORDER_SYNC_FLUSH_SECONDS", "10"))
+ORDER_SYNC_MAX_RETRIES = int(os.getenv("ORDER_SYNC_MAX_RETRIES", "5"))
+
+# Stare persistentă (ledger plăți etc.), fișiere JSON mici
+STATE_DIR = os.getenv("STATE_DIR", "data")
+STATE_FLUSH_SECONDS = float(os.getenv("STATE_FLUSH_SECONDS", "5"))
+
+# Logging: json | text, limită de înregistrări / secundă pe nivel, eșantion loguri comenzi
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_RATE_PER_SECOND = float(os.getenv("LOG_RATE_PER_SECOND", "50"))
+LOG_ORDER_SAMPLE_RATE = float(os.getenv("LOG_ORDER_SAMPLE_RATE", "0.1"))
+
+# Oprire controlată (SIGTERM la deploy pe Render): timp maxim de golire a cozilor
+SHUTDOWN_DEADLINE_SECONDS = float(os.getenv("SHUTDOWN_DEADLINE_SECONDS", "25"))
+
+# Stocuri: cât ține o rezervare neplătită / neconfirmată de operator
+RESERVATION_TTL_MINUTES = float(os.getenv("RESERVATION_TTL_MINUTES", "60"))
+
+# Sloturi de livrare: zile oferite, intervale orare, capacitate per interval și oraș
+SLOT_TIMEZONE = os.getenv("SLOT_TIMEZONE", "Europe/Chisinau")
+SLOT_DAYS_AHEAD = int(os.getenv("SLOT_DAYS_AHEAD", "7"))
+SLOT_WINDOWS = os.getenv("SLOT_WINDOWS", "10:00-13:00,13:00-16:00,16:00-19:00")
+SLOT_CAPACITY = int(os.getenv("SLOT_CAPACITY", "10"))
+SLOT_CITY_CAPACITY = json.loads(os.getenv("SLOT_CITY_CAPACITY", "{}"))  # {"chisinau": 30}
+SLOT_MAX_BUTTONS = int(os.getenv("SLOT_MAX_BUTTONS", "12"))
+
+# Rapoarte automate către admin (ore locale HH:MM; zi săptămânală 0=duminică … 6=sâmbătă)
+REPORT_TIMEZONE = os.getenv("REPORT_TIMEZONE", "Europe/Chisinau")
+REPORT_DAILY_TIME = os.getenv("REPORT_DAILY_TIME", "21:00")
+REPORT_WEEKLY_DAY = int(os.getenv("REPORT_WEEKLY_DAY", "1"))
+REPORT_WEEKLY_TIME = os.getenv("REPORT_WEEKLY_TIME", "09:00")
+REPORT_RETENTION_DAYS = int(os.getenv("REPORT_RETENTION_DAYS", "90"))
+
+# Reamintire comenzi abandonate (0 = dezactivat)
+ORDER_REMINDER_MINUTES = float(os.getenv("ORDER_REMINDER_MINUTES", "30"))
+
+# Deduplicare update-uri (redelivery după restart / erori de rețea)
+SEEN_UPDATES_MAX = int(os.getenv("SEEN_UPDATES_MAX", "10000"))
+# cât timp după pornire respingem tot ce e sub ultimul update_id procesat înainte de oprire
+SEEN_UPDATES_GUARD_SECONDS = float(os.getenv("SEEN_UPDATES_GUARD_SECONDS", "300"))
+
+# Broadcast marketing (/broadcast)
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "20"))  # mesaje / secundă
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "5"))
+BROADCAST_REPORT_SECONDS = float(os.getenv("BROADCAST_REPORT_SECONDS", "10"))
+
+# Relay suport: câte fire (mesaj operator → client) ținem minte
+SUPPORT_RELAY_MAX = int(os.getenv("SUPPORT_RELAY_MAX", "5000"))
+
+# Poze produse (PRODUCTS[...]["image"] relativ la acest director)
+IMAGES_DIR = os.getenv("IMAGES_DIR", "images")
+
+# Căutare inline (@bot romantic)
+INLINE_PAGE_SIZE = int(os.getenv("INLINE_PAGE_SIZE", "20"))
+INLINE_CACHE_TIME = int(os.getenv("INLINE_CACHE_TIME", "300"))
+
+# Catalog paginat
+CATALOG_PAGE_SIZE = int(os.getenv("CATALOG_PAGE_SIZE", "5"))
+PENDING_PAGE_SIZE = int(os.getenv("PENDING_PAGE_SIZE", "10"))  # comenzi pe pagină în /pending
+# notificări admin: peste ADMIN_INSTANT_MAX mesaje într-o fereastră, restul vin într-un rezumat
+ADMIN_DIGEST_WINDOW_SECONDS = float(os.getenv("ADMIN_DIGEST_WINDOW_SECONDS", "30"))  # 0 = mereu imediat
+ADMIN_INSTANT_MAX = int(os.getenv("ADMIN_INSTANT_MAX", "3"))
+ADMIN_DIGEST_MAX_ITEMS = int(os.getenv("ADMIN_DIGEST_MAX_ITEMS", "8"))
+# limite per utilizator: funcție -> [rafală, secunde per cerere], ex. {"ai": [3, 120]}
+THROTTLE_LIMITS = {
+    "ai": [3, 120],
+    "card": [3, 60],
+    "support": [5, 30],
+    "order_confirm": [3, 120],
+    **json.loads(os.getenv("THROTTLE_LIMITS", "{}")),
+}
+
+# Mai multe magazine într-un proces: fișier JSON cu configurația fiecărui bot
+# (fără el rulează un singur magazin, configurat din variabilele de mai sus)
+TENANTS_FILE = os.getenv("TENANTS_FILE")
+# GET /metrics cere `Authorization: Bearer <METRICS_TOKEN>`; fără token răspunde doar pe localhost
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Înregistrare trafic pentru replay offline (replay.py); fără RECORD_DIR e oprită
+RECORD_DIR = os.getenv("RECORD_DIR")
+RECORD_SAMPLE_RATE = float(os.getenv("RECORD_SAMPLE_RATE", "1"))  # fracțiune din chaturi
+RECORD_ROTATE_MB = float(os.getenv("RECORD_ROTATE_MB", "50"))  # necomprimat, per fișier
+
+# Scale-out: WORKERS > 1 = un ingress webhook (procesul principal) + N procese worker;
+# update-urile unui chat ajung mereu la același worker. Starea comună stă în STATE_DIR/shared.sqlite.
+WORKERS = int(os.getenv("WORKERS", "1"))
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # URL-ul public al serverului HTTP (ex. https://cadolab.onrender.com)
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or secrets.token_urlsafe(32)
+WORKER_QUEUE_MAX = int(os.getenv("WORKER_QUEUE_MAX", "10000"))  # update-uri în așteptare per worker
+
+# Limită comună pentru apelurile Bot API (toți boții din proces) și per bot
+OUTBOUND_RATE = float(os.getenv("OUTBOUND_RATE", "60"))  # cereri / secundă
+BOT_SEND_RATE = float(os.getenv("BOT_SEND_RATE", "30"))
+
 if ADMIN_CHAT_ID:
     try:
         ADMIN_CHAT_ID = int(ADMIN_CHAT_ID)
@@ -51,18 +224,150 @@ if SUPPORT_CHAT_ID:
     except ValueError:
         SUPPORT_CHAT_ID = None
 
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
+# ----------------- Logging -----------------
+
+# update-ul procesat acum (setat de bind_log_context), pentru corelarea logurilor
+LOG_CONTEXT: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar(
+    "log_context", default={}
 )
+
+# numere care încep cu + sau 0 (formatele MD: +373 69 123 456, 069123456);
+# ID-urile Telegram și numerele de comandă nu încep cu 0, deci nu sunt atinse
+_PHONE_RE = re.compile(r"(?<![\w#])(?:\+|0)\d[\d\s().-]{5,}\d(?!\w)")
+
+
+def _mask_phone(match: re.Match) -> str:
+    digits = re.sub(r"\D", "", match.group(0))
+    if not 8 <= len(digits) <= 15:
+        return match.group(0)
+    return "***" + digits[-2:]
+
+
+def redact_pii(text: str) -> str:
+    """Maschează numerele de telefon, păstrând ultimele 2 cifre."""
+    return _PHONE_RE.sub(_mask_phone, text)
+
+
+class CorrelationFilter(logging.Filter):
+    """Adaugă update_id / chat_id / user_id din LOG_CONTEXT (rulează în thread-ul apelant)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        ctx = LOG_CONTEXT.get()
+        record.update_id = ctx.get("update_id")
+        record.chat_id = ctx.get("chat_id")
+        record.user_id = ctx.get("user_id")
+        record.tenant = ctx.get("tenant")
+        return True
+
+
+class LevelRateLimitFilter(logging.Filter):
+    """Token bucket per nivel; ce depășește rata e aruncat și numărat.
+
+    ERROR și mai sus nu sunt limitate niciodată.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+        self._buckets: Dict[int, List[float]] = {}
+        self.suppressed: Dict[int, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno >= logging.ERROR:
+            return True
+        now = time.monotonic()
+        bucket = self._buckets.setdefault(record.levelno, [self.rate, now])
+        bucket[0] = min(self.rate, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if bucket[0] < 1:
+            self.suppressed[record.levelno] = self.suppressed.get(record.levelno, 0) + 1
+            return False
+        bucket[0] -= 1
+        dropped = self.suppressed.pop(record.levelno, 0)
+        if dropped:
+            record.suppressed = dropped
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """O linie JSON per înregistrare; PII redactat. Rulează în thread-ul de scriere.
+
+    QueueHandler a inclus deja traceback-ul în mesaj.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": redact_pii(record.getMessage()),
+        }
+        for key in ("tenant", "update_id", "chat_id", "user_id", "suppressed"):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        record.msg = redact_pii(record.getMessage())
+        record.args = None
+        text = super().format(record)
+        if getattr(record, "update_id", None) is not None:
+            text += f" [tenant={record.tenant} update={record.update_id} chat={record.chat_id}]"
+        if getattr(record, "suppressed", None):
+            text += f" (+{record.suppressed} suppressed)"
+        return text
+
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """Handler-ul de pe event loop doar pune înregistrarea în coadă;
+    formatarea și scrierea pe stdout se fac într-un thread separat."""
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(LevelRateLimitFilter(LOG_RATE_PER_SECOND))
+    queue_handler.addFilter(CorrelationFilter())
+
+    stream_handler = logging.StreamHandler()
+    if LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(
+            TextFormatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        )
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+    # httpx loghează fiecare getUpdates la INFO – zgomot pur pe event loop
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+setup_logging()
 logger = logging.getLogger(__name__)
 
-if not TELEGRAM_TOKEN or not GROQ_API_KEY:
-    logger.error("Missing TELEGRAM_TOKEN or GROQ_API_KEY env vars!")
 
-if not PAYMENT_PROVIDER_TOKEN:
-    logger.warning("PAYMENT_PROVIDER_TOKEN is not set – payment will be disabled.")
+async def bind_log_context(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Primul handler: leagă update_id/chat/user de toate logurile update-ului curent."""
+    LOG_CONTEXT.set(
+        {
+            "tenant": context.application.bot_data["tenant"].name,
+            "update_id": update.update_id,
+            "chat_id": update.effective_chat.id if update.effective_chat else None,
+            "user_id": update.effective_user.id if update.effective_user else None,
+        }
+    )
 
-groq_client = Groq(api_key=GROQ_API_KEY)
+if not (TELEGRAM_TOKEN or TENANTS_FILE) or not GROQ_API_KEYS:
+    logger.error("Missing TELEGRAM_TOKEN (or TENANTS_FILE) or GROQ_API_KEY(S) env vars!")
 
 LANG_RO = "ro"
 LANG_RU = "ru"
@@ -90,17 +395,20 @@ LANG_RU = "ru"
     SUPPORT_MESSAGE,
 ) = range(20)
 
-# In-memorie pentru rapoarte simple
-ORDERS: List[Dict[str, Any]] = []
+PAYMENT_CURRENCY = "MDL"  # schimbă dacă providerul cere altă valută
 
 # --------- PRODUSE ----------
 
+# catalogul implicit (magazinul unic / tenanții fără catalog propriu)
 PRODUCTS = [
     {
         "id": "SWEET_BOX",
         "name_ro": "Sweet Box Clasic",
         "name_ru": "Sweet Box Классик",
         "price": 650,
+        "category": "classic",
+        # "stock": 20,  # opțional – fără cheie = stoc nelimitat
+        "image": "sweet_box.jpg",
         "description_ro": "Cutie cu mix de dulciuri premium, ambalată gata de oferit.",
         "description_ru": "Коробка с миксом премиальных сладостей, сразу готова к подарку.",
     },
@@ -109,12 +417,27 @@ PRODUCTS = [
         "name_ro": "Romantic Box",
         "name_ru": "Romantic Box",
         "price": 820,
+        "category": "romantic",
+        "image": "romantic_box.jpg",
         "description_ro": "Perfectă pentru iubit/ iubită: dulciuri, lumânare și mic mesaj.",
         "description_ru": "Идеальна для второй половинки: сладости, свеча и милое послание.",
     },
     # TODO: adaugă aici restul boxelor tale reale
 ]
 
+# Filtre catalog: categorii (cheia din PRODUCTS[...]["category"]) și benzi de preț
+CATALOG_CATEGORIES: Dict[str, Dict[str, str]] = {
+    "classic": {LANG_RO: "Clasice", LANG_RU: "Классика"},
+    "romantic": {LANG_RO: "Romantice", LANG_RU: "Романтика"},
+}
+
+PRICE_BANDS = [
+    # (cheie, preț minim inclusiv, preț maxim exclusiv)
+    ("low", 0, 700),
+    ("mid", 700, 1000),
+    ("high", 1000, None),
+]
+
 # --------- Texte în RO / RU ----------
 
 TEXTS: Dict[str, Dict[str, str]] = {
@@ -143,9 +466,16 @@ TEXTS: Dict[str, Dict[str, str]] = {
         "ask_interests": "Spune-mi câteva preferințe sau detalii: ce îi place, stil, hobby-uri, dulciuri preferate.",
         "ai_thinking": "Analizez informațiile și aleg cele mai potrivite boxe pentru tine... 🤔",
         "ai_error": "A apărut o problemă cu AI-ul. Încearcă din nou sau alege direct din catalog.",
+        "ai_busy": "Consultantul AI e foarte solicitat acum. Încearcă din nou peste un minut sau alege din catalog.",
         "ai_done": "Iată ce îți recomand:",
         "ai_message_btn": "✍️ Creează mesaj de felicitare",
         "ai_message_intro": "Iată câteva idei de mesaje de felicitare:",
+        "ai_fallback": "Potrivit bugetului tău, din catalog aș alege:",
+        "ai_card_fallback": (
+            "• Cu drag, pentru cineva special — să ai o zi la fel de dulce ca tine!\n"
+            "• Un mic gest pentru un zâmbet mare. La mulți ani și numai bucurii!\n"
+            "• Pentru tine, cu toată căldura — fie ca fiecare zi să aibă gust de sărbătoare."
+        ),
         "order_from_menu_intro": (
             "Perfect, hai să plasăm o comandă. 📦\n\n"
             "Poți alege cutia din *Catalog cadouri* sau scrie direct numele cutiei dorite."
@@ -164,7 +494,6 @@ TEXTS: Dict[str, Dict[str, str]] = {
         "btn_delivery_courier": "🚚 Livrare la adresă",
         "btn_delivery_pickup": "📍 Ridicare personală",
         "order_ask_address": "Scrie adresa completă de livrare.",
-        "order_ask_date": "Când dorești livrarea? (dată și interval orar)",
         "order_ask_payment": "Cum preferi să plătești? (cash, card etc.)",
         "order_ask_comments": "Ai observații speciale? Dacă nu, scrie „nu”.",
         "order_ask_occasion": "Pentru ce ocazie este această comandă? (zi de naștere, aniversare, copil, corporate etc.)",
@@ -186,9 +515,40 @@ TEXTS: Dict[str, Dict[str, str]] = {
             "Eu îl voi trimite mai departe în chatul de lucru. Când ai terminat, poți apăsa *Înapoi la meniu*."
         ),
         "support_sent": "Am trimis mesajul tău operatorului. Îți va răspunde cât mai curând.",
+        "support_reply_prefix": "💬 Răspuns de la operator:",
+        "support_reply_hint": "Ca să-i răspunzi operatorului, dă reply la mesajul lui.",
         "payment_invoice_info": "💳 Pentru a finaliza comanda, achită factura de mai sus.",
         "payment_ok": "✅ Plata a fost acceptată! Mulțumim, comanda ta este în lucru. 🎁",
         "payment_error": "❌ A apărut o eroare la plată. Încearcă din nou sau contactează operatorul.",
+        "payment_invalid": "Factura nu mai este valabilă sau a fost deja achitată. Contactează operatorul.",
+        "order_status_accepted": "✅ Comanda ta #{order_id} a fost confirmată de operator. Mulțumim!",
+        "throttled": "⏳ Prea multe cereri într-un timp scurt. Mai încearcă peste {seconds} s.",
+        "order_status_in_delivery": "🚚 Comanda ta #{order_id} a plecat spre tine!",
+        "order_status_done": "🎁 Comanda #{order_id} a fost livrată. Mulțumim că ne-ai ales! 💛",
+        "order_status_cancelled": "❌ Comanda ta #{order_id} a fost marcată ca anulată de operator.",
+        "order_legacy_accepted": "✅ Comanda ta a fost confirmată de operator. Mulțumim!",
+        "order_legacy_cancelled": "❌ Comanda ta a fost marcată ca anulată de operator.",
+        "inline_order_btn": "🛒 Comandă în bot",
+        "catalog_page": "Pagina {page}/{pages}",
+        "catalog_all": "Toate",
+        "catalog_empty": "Nu sunt boxe pentru acest filtru.",
+        "catalog_photos_btn": "🖼 Poze",
+        "catalog_sold_out": "epuizat",
+        "order_sold_out": "😔 Ne pare rău, boxa aleasă tocmai s-a epuizat. Alege alta din catalog.",
+        "order_pickup_selected": "📍 Ridicare personală.",
+        "slot_ask": "Alege ziua și intervalul de livrare:",
+        "slot_none": "Nu mai sunt intervale libere în zilele următoare. Scrie data dorită și operatorul te va contacta.",
+        "slot_full": "Intervalul ales tocmai s-a ocupat. Te rog alege altul:",
+        "slot_chosen": "📅 Livrare: {slot}",
+        "order_reminder": (
+            "🎁 Ai rămas la jumătatea comenzii. Continuă oricând – răspunde la ultima întrebare "
+            "sau scrie /cancel dacă te-ai răzgândit."
+        ),
+        "order_reminder_restored": (
+            "🎁 Ai rămas la jumătatea comenzii, dar între timp botul a fost repornit și "
+            "răspunsurile nu s-au păstrat. Apasă butonul și o reluăm de la început."
+        ),
+        "btn_order_resume": "🛒 Reia comanda",
     },
     LANG_RU: {
         "start_choose_lang": "Привет! 👋\nВыбери язык, на котором будем общаться:",
@@ -214,9 +574,16 @@ TEXTS: Dict[str, Dict[str, str]] = {
         "ask_interests": "Напиши пару предпочтений: что любит человек, стиль, хобби, любимые сладости.",
         "ai_thinking": "Собираю информацию и подбираю самые подходящие боксы... 🤔",
         "ai_error": "Возникла ошибка при запросе к AI. Попробуй ещё раз или выбери коробку из каталога.",
+        "ai_busy": "Консультант AI сейчас перегружен. Попробуй через минуту или выбери бокс из каталога.",
         "ai_done": "Вот что я рекомендую:",
         "ai_message_btn": "✍️ Создать текст поздравления",
         "ai_message_intro": "Вот несколько идей для поздравительного текста:",
+        "ai_fallback": "С учётом бюджета я бы выбрал(а) из каталога:",
+        "ai_card_fallback": (
+            "• С любовью для особенного человека — пусть день будет таким же сладким, как ты!\n"
+            "• Маленький знак внимания для большой улыбки. Счастья и только радостей!\n"
+            "• Для тебя, со всем теплом — пусть каждый день будет со вкусом праздника."
+        ),
         "order_from_menu_intro": (
             "Отлично, давай оформим заказ. 📦\n\n"
             "Можно выбрать бокс в *Каталоге подарков* или просто написать название нужной коробки."
@@ -235,7 +602,6 @@ TEXTS: Dict[str, Dict[str, str]] = {
         "btn_delivery_courier": "🚚 Доставка по адресу",
         "btn_delivery_pickup": "📍 Самовывоз",
         "order_ask_address": "Напиши полный адрес доставки.",
-        "order_ask_date": "На какую дату и время нужна доставка?",
         "order_ask_payment": "Как удобнее оплатить? (наличные, карта и т.д.)",
         "order_ask_comments": "Есть ли особые пожелания? Если нет, напиши «нет».",
         "order_ask_occasion": "Для какого повода этот заказ? (день рождения, годовщина, ребёнок, корпоратив и т.д.)",
@@ -257,9 +623,40 @@ TEXTS: Dict[str, Dict[str, str]] = {
             "Я перешлю его в рабочий чат. Когда закончишь, можешь нажать *Назад в меню*."
         ),
         "support_sent": "Я отправил твоё сообщение оператору. Он ответит как можно скорее.",
+        "support_reply_prefix": "💬 Ответ оператора:",
+        "support_reply_hint": "Чтобы ответить оператору, ответь (reply) на его сообщение.",
         "payment_invoice_info": "💳 Чтобы завершить заказ, оплати выставленный счёт выше.",
         "payment_ok": "✅ Оплата прошла успешно! Спасибо, твой заказ в обработке. 🎁",
         "payment_error": "❌ Произошла ошибка при оплате. Попробуй ещё раз или свяжись с оператором.",
+        "payment_invalid": "Счёт больше не действителен или уже оплачен. Свяжись с оператором.",
+        "order_status_accepted": "✅ Твой заказ #{order_id} подтверждён оператором. Спасибо!",
+        "throttled": "⏳ Слишком много запросов подряд. Попробуй снова через {seconds} сек.",
+        "order_status_in_delivery": "🚚 Твой заказ #{order_id} уже в пути!",
+        "order_status_done": "🎁 Заказ #{order_id} доставлен. Спасибо, что выбрал нас! 💛",
+        "order_status_cancelled": "❌ Твой заказ #{order_id} отменён оператором.",
+        "order_legacy_accepted": "✅ Твой заказ подтверждён оператором. Спасибо!",
+        "order_legacy_cancelled": "❌ Твой заказ отменён оператором.",
+        "inline_order_btn": "🛒 Заказать в боте",
+        "catalog_page": "Страница {page}/{pages}",
+        "catalog_all": "Все",
+        "catalog_empty": "Для этого фильтра нет боксов.",
+        "catalog_photos_btn": "🖼 Фото",
+        "catalog_sold_out": "нет в наличии",
+        "order_sold_out": "😔 К сожалению, выбранный бокс только что закончился. Выбери другой в каталоге.",
+        "order_pickup_selected": "📍 Самовывоз.",
+        "slot_ask": "Выбери день и интервал доставки:",
+        "slot_none": "В ближайшие дни свободных интервалов нет. Напиши желаемую дату, и оператор свяжется с тобой.",
+        "slot_full": "Этот интервал только что заняли. Пожалуйста, выбери другой:",
+        "slot_chosen": "📅 Доставка: {slot}",
+        "order_reminder": (
+            "🎁 Ты остановился(ась) на середине заказа. Продолжи в любой момент – ответь на последний "
+            "вопрос или напиши /cancel, если передумал(а)."
+        ),
+        "order_reminder_restored": (
+            "🎁 Ты остановился(ась) на середине заказа, но бот тем временем перезапустился и "
+            "ответы не сохранились. Нажми кнопку, и начнём заново."
+        ),
+        "btn_order_resume": "🛒 Продолжить заказ",
     },
 }
 
@@ -269,15 +666,23 @@ def get_lang(context: ContextTypes.DEFAULT_TYPE) -> str:
 
 
 def tr(lang: str, key: str) -> str:
-    return TEXTS.get(lang, TEXTS[LANG_RO])[key]
+    """Textul tenantului curent (TEXTS + suprascrierile lui)."""
+    current = _CURRENT_TENANT.get(None)
+    texts = current.texts if current else TEXTS
+    return texts.get(lang, texts[LANG_RO])[key]
+
+
+def is_admin(update: Update) -> bool:
+    admin_chat_id = tenant().admin_chat_id
+    return bool(admin_chat_id and update.effective_user and update.effective_user.id == admin_chat_id)
 
 
 def get_menu_keyboard(lang: str) -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(
         [
-            [TEXTS[lang]["btn_catalog"], TEXTS[lang]["btn_ai"]],
-            [TEXTS[lang]["btn_order"], TEXTS[lang]["btn_info"]],
-            [TEXTS[lang]["btn_back"]],
+            [tr(lang, "btn_catalog"), tr(lang, "btn_ai")],
+            [tr(lang, "btn_order"), tr(lang, "btn_info")],
+            [tr(lang, "btn_back")],
         ],
         resize_keyboard=True,
     )
@@ -297,10 +702,73 @@ async def send_text(
     return msg
 
 
+class HealthHandler(http.server.BaseHTTPRequestHandler):
+    """Health-check pentru Render; /metrics – contoarele fiecărui tenant și ale routerului Groq (JSON)."""
+
+    def _metrics_allowed(self) -> bool:
+        if METRICS_TOKEN:
+            return secrets.compare_digest(
+                self.headers.get("Authorization", ""), f"Bearer {METRICS_TOKEN}"
+            )
+        return self.client_address[0] in ("127.0.0.1", "::1", "::ffff:127.0.0.1")
+
+    def do_GET(self):
+        if self.path == "/metrics" and not self._metrics_allowed():
+            self.send_response(401 if METRICS_TOKEN else 403)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/metrics":
+            if INGRESS is not None:
+                # contoarele tenanților sunt în worker-i (/metrics în chatul de admin)
+                payload = {"ingress": INGRESS.stats()}
+            else:
+                payload = {
+                    "tenants": {t.name: t.metrics_snapshot() for t in TENANTS},
+                    "groq": groq_router.stats(),
+                }
+            body = json.dumps(payload).encode()
+            content_type = "application/json"
+        else:
+            body = b"OK"
+            content_type = "text/plain"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        """Webhook Telegram (doar ingress-ul, WORKERS > 1): /webhook/<tenant>."""
+        match = re.fullmatch(r"/webhook/([\w-]+)", self.path)
+        if INGRESS is None or not match or match.group(1) not in INGRESS.tokens:
+            status = 404
+        elif self.headers.get("X-Telegram-Bot-Api-Secret-Token") != INGRESS.secret:
+            status = 403
+        else:
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            try:
+                status = 200 if INGRESS.route(match.group(1), body) else 503
+            except (ValueError, KeyError, TypeError):
+                status = 400
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass  # health-check-urile ar umple logul
+
+
+class _HttpServer(socketserver.ThreadingTCPServer):
+    # cu thread-uri: ingress-ul primește webhook-uri în paralel (max_connections la Telegram)
+    daemon_threads = True
+    allow_reuse_address = True
+
+
 def run_http_server():
+    """Un singur server HTTP pentru tot procesul, indiferent de numărul de tenanți."""
     port = int(os.getenv("PORT", "10000"))
-    handler = http.server.SimpleHTTPRequestHandler
-    with socketserver.TCPServer(("", port), handler) as httpd:
+    with _HttpServer(("", port), HealthHandler) as httpd:
         logger.info(f"HTTP dummy server running on port {port}")
         httpd.serve_forever()
 
@@ -309,7 +777,7 @@ def run_http_server():
 
 
 def _find_product_by_id(product_id: str) -> Dict[str, Any] | None:
-    for p in PRODUCTS:
+    for p in tenant().products:
         if p["id"] == product_id:
             return p
     return None
@@ -317,16 +785,2190 @@ def _find_product_by_id(product_id: str) -> Dict[str, Any] | None:
 
 def _find_product_by_name_guess(text: str) -> Dict[str, Any] | None:
     text_l = text.lower()
-    for p in PRODUCTS:
+    for p in tenant().products:
         if p["name_ro"].lower() in text_l or p["name_ru"].lower() in text_l:
             return p
     return None
 
 
-def save_order_for_stats(order: Dict[str, Any]):
-    """Hook pentru viitor Google Sheets, deocamdată doar log + listă in-memory."""
-    ORDERS.append(order)
-    logger.info("Order saved for stats: %s", order)
+def save_order_for_stats(order: Dict[str, Any]) -> Dict[str, Any]:
+    """Înregistrează comanda (status `new`) și o pune în coada de sincronizare (fără I/O pe loc)."""
+    t = tenant()
+    order = t.order_book.create(order)
+    logger.info(
+        "Order saved for stats: #%s %s (%s MDL)",
+        order["order_id"], order.get("product_id"), order.get("price"),
+    )
+    if random.random() < LOG_ORDER_SAMPLE_RATE:
+        # eșantion cu înregistrarea completă, fără date personale
+        logger.info(
+            "Order sample: %s",
+            {k: v for k, v in order.items() if k not in ("name", "phone", "address")},
+        )
+    t.report_aggregates.record_order(order)
+    if t.order_sync:
+        t.order_sync.submit(order)
+    return order
+
+
+# ----------------- Stare persistentă -----------------
+
+STATE_STORES: List["PersistentState"] = []
+# bucle de fundal pornite în run_bots / start_tenant și oprite la final în run_bots
+BACKGROUND_TASKS: List[asyncio.Task] = []
+
+
+class PersistentState:
+    """Dict JSON persistat în `directory` (implicit STATE_DIR); rescris atomic doar când a fost modificat."""
+
+    def __init__(self, name: str, directory: str = STATE_DIR):
+        self.path = os.path.join(directory, f"{name}.json")
+        self.data: Dict[str, Any] = {}
+        self._dirty = False
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("Could not load state %s: %r", self.path, e)
+        STATE_STORES.append(self)
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def dump(self) -> str | None:
+        """Serializează pe event loop (datele nu se schimbă în timpul dump-ului)."""
+        if not self._dirty:
+            return None
+        self._dirty = False
+        return json.dumps(self.data, ensure_ascii=False, default=str)
+
+    def write(self, text: str):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, self.path)
+
+    def flush(self):
+        text = self.dump()
+        if text is not None:
+            self.write(text)
+
+
+def flush_state_stores():
+    for store in STATE_STORES:
+        try:
+            store.flush()
+        except Exception as e:
+            logger.exception("Failed to flush state %s: %s", store.path, e)
+
+
+async def state_flush_loop():
+    """Scrie periodic stările modificate; I/O-ul de fișier rulează în thread."""
+    while True:
+        await asyncio.sleep(STATE_FLUSH_SECONDS)
+        for store in STATE_STORES:
+            text = store.dump()
+            if text is None:
+                continue
+            try:
+                await asyncio.to_thread(store.write, text)
+            except Exception as e:
+                store.mark_dirty()
+                logger.exception("Failed to flush state %s: %s", store.path, e)
+
+
+# ----------------- Stare comună între worker-i (SQLite) -----------------
+
+# setate doar în procesele worker (WORKERS > 1), vezi worker_main
+WORKER_INDEX: int | None = None
+shared_store: "SharedStore | None" = None
+
+
+def is_primary_worker() -> bool:
+    """Joburile unice per magazin (rapoarte, precalculare AI) rulează doar într-un proces."""
+    return WORKER_INDEX in (None, 0)
+
+
+class SharedStore:
+    """SQLite local (WAL) comun worker-ilor: secvențe, contoare și mapări JSON.
+
+    Fiecare modificare e o tranzacție scurtă (`BEGIN IMMEDIATE`), deci verificare +
+    scriere sunt atomice și între procese. Apelurile sunt sincrone: pe disc local
+    durează zeci de microsecunde, cât un flush de stare de până acum.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS kv (
+                ns TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (ns, key));
+            CREATE TABLE IF NOT EXISTS counters (
+                ns TEXT NOT NULL, key TEXT NOT NULL, value INTEGER NOT NULL, PRIMARY KEY (ns, key));
+            CREATE TABLE IF NOT EXISTS sequences (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            """
+        )
+        self._lock = threading.RLock()  # /metrics citește din thread-ul HTTP
+        self._depth = 0
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Tranzacție reentrantă: apelurile imbricate fac parte din cea exterioară."""
+        with self._lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield self._conn
+                finally:
+                    self._depth -= 1
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._depth = 1
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+            finally:
+                self._depth = 0
+
+    def _query(self, sql: str, args: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, args).fetchall()
+
+    def next_value(self, name: str, floor: int = 0) -> int:
+        with self.transaction() as conn:
+            row = conn.execute("SELECT value FROM sequences WHERE name = ?", (name,)).fetchone()
+            value = max(floor, (row[0] if row else 0) + 1)
+            conn.execute("INSERT OR REPLACE INTO sequences (name, value) VALUES (?, ?)", (name, value))
+        return value
+
+    # --- contoare ---
+
+    def counter(self, ns: str, key: str) -> int | None:
+        rows = self._query("SELECT value FROM counters WHERE ns = ? AND key = ?", (ns, key))
+        return rows[0][0] if rows else None
+
+    def counters(self, ns: str) -> Dict[str, int]:
+        return dict(self._query("SELECT key, value FROM counters WHERE ns = ?", (ns,)))
+
+    def set_counter(self, ns: str, key: str, value: int, only_if_missing: bool = False):
+        verb = "INSERT OR IGNORE" if only_if_missing else "INSERT OR REPLACE"
+        with self.transaction() as conn:
+            conn.execute(f"{verb} INTO counters (ns, key, value) VALUES (?, ?, ?)", (ns, key, value))
+
+    def add(
+        self,
+        ns: str,
+        key: str,
+        delta: int,
+        maximum: int | None = None,
+        default: int | None = None,
+    ) -> int | None:
+        """Adună `delta` dacă rezultatul rămâne în [0, maximum]; None = refuzat.
+
+        Un contor inexistent pornește de la `default` (None = refuzat).
+        """
+        with self.transaction() as conn:
+            row = conn.execute("SELECT value FROM counters WHERE ns = ? AND key = ?", (ns, key)).fetchone()
+            current = row[0] if row else default
+            if current is None:
+                return None
+            value = current + delta
+            if value < 0 or (maximum is not None and value > maximum):
+                return None
+            conn.execute("INSERT OR REPLACE INTO counters (ns, key, value) VALUES (?, ?, ?)", (ns, key, value))
+        return value
+
+    def delete_counters(self, ns: str, keys: List[str]):
+        with self.transaction() as conn:
+            conn.executemany("DELETE FROM counters WHERE ns = ? AND key = ?", [(ns, k) for k in keys])
+
+    # --- mapări JSON (ordinea de iterare = ordinea ultimei scrieri) ---
+
+    def kv_get(self, ns: str, key: str) -> Any:
+        rows = self._query("SELECT value FROM kv WHERE ns = ? AND key = ?", (ns, key))
+        return json.loads(rows[0][0]) if rows else None
+
+    def kv_put(self, ns: str, key: str, value: Any):
+        text = json.dumps(value, ensure_ascii=False, default=str)
+        with self.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO kv (ns, key, value) VALUES (?, ?, ?)", (ns, key, text))
+
+    def kv_delete(self, ns: str, key: str) -> bool:
+        with self.transaction() as conn:
+            return conn.execute("DELETE FROM kv WHERE ns = ? AND key = ?", (ns, key)).rowcount > 0
+
+    def kv_keys(self, ns: str) -> List[str]:
+        return [row[0] for row in self._query("SELECT key FROM kv WHERE ns = ? ORDER BY rowid", (ns,))]
+
+    def kv_items(self, ns: str) -> List[tuple]:
+        rows = self._query("SELECT key, value FROM kv WHERE ns = ? ORDER BY rowid", (ns,))
+        return [(key, json.loads(value)) for key, value in rows]
+
+    def kv_count(self, ns: str) -> int:
+        return self._query("SELECT COUNT(*) FROM kv WHERE ns = ?", (ns,))[0][0]
+
+    def kv_page(self, ns: str, after: str, limit: int) -> List[str]:
+        """Cheile după `after`, în ordine; folosește cheia primară, deci O(log n + limit)."""
+        rows = self._query(
+            "SELECT key FROM kv WHERE ns = ? AND key > ? ORDER BY key LIMIT ?", (ns, after, limit)
+        )
+        return [row[0] for row in rows]
+
+    def kv_clear(self, ns: str):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM kv WHERE ns = ?", (ns,))
+
+
+class SharedMapping(MutableMapping):
+    """Dict JSON într-un namespace din SharedStore.
+
+    Valorile citite sunt copii: o valoare compusă se modifică prin atribuire
+    sau prin `update_entry` (read-modify-write într-o singură tranzacție).
+    """
+
+    def __init__(self, store: SharedStore, ns: str):
+        self._store = store
+        self.ns = ns
+
+    def __getitem__(self, key: str):
+        value = self._store.kv_get(self.ns, key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default=None):
+        value = self._store.kv_get(self.ns, key)
+        return default if value is None else value
+
+    def __setitem__(self, key: str, value):
+        self._store.kv_put(self.ns, key, value)
+
+    def __delitem__(self, key: str):
+        if not self._store.kv_delete(self.ns, key):
+            raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        return self._store.kv_get(self.ns, key) is not None
+
+    def __iter__(self):
+        return iter(self._store.kv_keys(self.ns))
+
+    def __len__(self) -> int:
+        return self._store.kv_count(self.ns)
+
+    def items(self):
+        return self._store.kv_items(self.ns)
+
+    def values(self):
+        return [value for _, value in self._store.kv_items(self.ns)]
+
+    def clear(self):
+        self._store.kv_clear(self.ns)
+
+    def pop(self, key: str, *default):
+        with self._store.transaction():
+            return super().pop(key, *default)
+
+    def transaction(self):
+        return self._store.transaction()
+
+    def update_entry(self, key: str, factory, fn):
+        with self._store.transaction():
+            value = self.get(key)
+            if value is None:
+                value = factory()
+            fn(value)
+            self[key] = value
+
+
+def update_entry(mapping, key: str, factory, fn):
+    """Aplică `fn` pe valoarea de la `key` (creată cu `factory` dacă lipsește).
+
+    Pe un dict obișnuit modifică pe loc; pe SharedMapping scrie înapoi atomic,
+    ca două procese să nu-și piardă una alteia incrementările.
+    """
+    if isinstance(mapping, SharedMapping):
+        mapping.update_entry(key, factory, fn)
+        return
+    value = mapping.get(key)
+    if value is None:
+        value = mapping[key] = factory()
+    fn(value)
+
+
+class _SharedRoot(MutableMapping):
+    """`data` pentru SharedState: sub-dict-urile devin SharedMapping, valorile simple stau în kv."""
+
+    def __init__(self, store: SharedStore, name: str):
+        self._store = store
+        self._name = name
+
+    def _mapping(self, key: str) -> SharedMapping:
+        return SharedMapping(self._store, f"{self._name}/{key}")
+
+    def setdefault(self, key: str, default=None):
+        if isinstance(default, dict):
+            mapping = self._mapping(key)
+            if default and not len(mapping):
+                mapping.update(default)
+            return mapping
+        return super().setdefault(key, default)
+
+    def __getitem__(self, key: str):
+        value = self._store.kv_get(self._name, key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value):
+        if isinstance(value, dict):
+            mapping = self._mapping(key)
+            mapping.clear()
+            mapping.update(value)
+        else:
+            self._store.kv_put(self._name, key, value)
+
+    def __delitem__(self, key: str):
+        if not self._store.kv_delete(self._name, key):
+            raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._store.kv_keys(self._name))
+
+    def __len__(self) -> int:
+        return self._store.kv_count(self._name)
+
+
+class SharedState:
+    """Aceeași interfață ca PersistentState (`data`, `mark_dirty`), dar în SharedStore; scrierile sunt imediate."""
+
+    def __init__(self, store: SharedStore, name: str):
+        self.path = f"{store.path}#{name}"
+        self.data = _SharedRoot(store, name)
+
+    def mark_dirty(self):
+        pass
+
+
+# ----------------- Ciclu de viață comenzi -----------------
+
+ORDER_TRANSITIONS: Dict[str, tuple] = {
+    "new": ("accepted", "paid", "cancelled"),
+    "accepted": ("paid", "in_delivery", "cancelled"),
+    "paid": ("in_delivery", "cancelled"),
+    "in_delivery": ("done", "cancelled"),
+    "done": (),
+    "cancelled": (),
+}
+ORDER_OPEN_STATUSES = ("new", "accepted", "paid", "in_delivery")
+ORDER_STATUS_LABELS = {
+    "new": "🆕 nouă",
+    "accepted": "✅ acceptată",
+    "paid": "💳 plătită",
+    "in_delivery": "🚚 în livrare",
+    "done": "🏁 livrată",
+    "cancelled": "❌ anulată",
+}
+# butoanele de admin: acțiune -> (status nou, etichetă)
+ORDER_ACTIONS = {
+    "accept": ("accepted", "✅ Acceptă"),
+    "deliver": ("in_delivery", "🚚 În livrare"),
+    "done": ("done", "🏁 Livrată"),
+    "cancel": ("cancelled", "❌ Anulează"),
+}
+
+
+class OrderTransitionError(ValueError):
+    """Schimbare de status nepermisă (ex. o comandă livrată nu mai poate fi anulată)."""
+
+
+class OrderJournal:
+    """Jurnal JSONL append-only al comenzilor: o linie per creare / schimbare.
+
+    Are interfața PersistentState și e scris tot de state_flush_loop, dar `write`
+    adaugă la fișier în loc să-l rescrie, deci un flush nu crește cu istoricul.
+    """
+
+    def __init__(self, name: str, directory: str = STATE_DIR):
+        self.path = os.path.join(directory, f"{name}.jsonl")
+        self._pending: List[str] = []
+        self._in_flight: List[str] = []
+        STATE_STORES.append(self)
+
+    def read(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # ultima linie poate fi ruptă dacă procesul a murit în timpul scrierii
+                    logger.warning("Skipping corrupt line in %s", self.path)
+
+    def append(self, record: Dict[str, Any]):
+        self._pending.append(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def mark_dirty(self):
+        # scrierea a eșuat: liniile se reiau la următorul flush
+        self._pending[:0] = self._in_flight
+        self._in_flight = []
+
+    def dump(self) -> str | None:
+        if not self._pending:
+            return None
+        self._in_flight, self._pending = self._pending, []
+        return "".join(self._in_flight)
+
+    def write(self, text: str):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(text)
+        self._in_flight = []
+
+    def flush(self):
+        text = self.dump()
+        if text is not None:
+            self.write(text)
+
+
+class SortedIds:
+    """ID-uri de comenzi sortate; ID-urile cresc în timp, deci `add` e aproape mereu un append."""
+
+    def __init__(self):
+        self._ids: List[int] = []
+
+    def add(self, order_id: int):
+        if not self._ids or order_id > self._ids[-1]:
+            self._ids.append(order_id)
+            return
+        i = bisect.bisect_left(self._ids, order_id)
+        if i == len(self._ids) or self._ids[i] != order_id:
+            self._ids.insert(i, order_id)
+
+    def remove(self, order_id: int):
+        i = bisect.bisect_left(self._ids, order_id)
+        if i < len(self._ids) and self._ids[i] == order_id:
+            del self._ids[i]
+
+    def page(self, after: int, limit: int) -> List[int]:
+        i = bisect.bisect_right(self._ids, after)
+        return self._ids[i:i + limit]
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+class SharedSortedIds:
+    """Același index într-un namespace din SharedStore (cheile au lățime fixă, deci se sortează ca numerele)."""
+
+    def __init__(self, store: SharedStore, ns: str):
+        self._store = store
+        self._ns = ns
+
+    def add(self, order_id: int):
+        self._store.kv_put(self._ns, f"{order_id:015d}", 1)
+
+    def remove(self, order_id: int):
+        self._store.kv_delete(self._ns, f"{order_id:015d}")
+
+    def page(self, after: int, limit: int) -> List[int]:
+        return [int(key) for key in self._store.kv_page(self._ns, f"{after:015d}", limit)]
+
+    def __len__(self) -> int:
+        return self._store.kv_count(self._ns)
+
+
+class OrderBook:
+    """Comenzile magazinului, cu status, istoricul schimbărilor și indexuri.
+
+    Indexurile țin doar ID-uri sortate: câte unul per status, unul cu toate
+    comenzile deschise și unul per dată de livrare (doar pentru cele deschise).
+    O pagină din /pending costă O(log n + pagină), oricât de mare ar fi istoricul.
+    Starea se reface la pornire din jurnal.
+    """
+
+    def __init__(self, journal: OrderJournal | None = None):
+        self._journal = journal
+        self.orders: Dict[int, Dict[str, Any]] = {}
+        self.by_status = {status: SortedIds() for status in ORDER_TRANSITIONS}
+        self.open = SortedIds()
+        self.by_date: Dict[str, SortedIds] = {}
+        if journal is not None:
+            for record in journal.read():
+                self._apply(record)
+
+    # --- stocare (suprascrisă de SharedOrderBook) ---
+
+    def _transaction(self):
+        return contextlib.nullcontext()
+
+    def get(self, order_id: int) -> Dict[str, Any] | None:
+        return self.orders.get(order_id)
+
+    def _save(self, order: Dict[str, Any]):
+        self.orders[order["order_id"]] = order
+
+    def _date_index(self, day: str, create: bool = False) -> SortedIds:
+        if create:
+            return self.by_date.setdefault(day, SortedIds())
+        return self.by_date.get(day) or SortedIds()
+
+    def _drop_date_index(self, day: str):
+        if not len(self.by_date.get(day, ())):
+            self.by_date.pop(day, None)
+
+    def _log(self, record: Dict[str, Any]):
+        if self._journal is not None:
+            self._journal.append(record)
+
+    # --- indexuri ---
+
+    def _index(self, order: Dict[str, Any]):
+        order_id, status = order["order_id"], order["status"]
+        self.by_status[status].add(order_id)
+        if status in ORDER_OPEN_STATUSES:
+            self.open.add(order_id)
+            if order.get("delivery_date"):
+                self._date_index(order["delivery_date"], create=True).add(order_id)
+
+    def _unindex(self, order: Dict[str, Any]):
+        order_id = order["order_id"]
+        self.by_status[order["status"]].remove(order_id)
+        self.open.remove(order_id)
+        if order.get("delivery_date"):
+            self._date_index(order["delivery_date"]).remove(order_id)
+            self._drop_date_index(order["delivery_date"])
+
+    def _apply(self, record: Dict[str, Any]) -> Dict[str, Any] | None:
+        """Aplică un eveniment din jurnal (aceeași cale la pornire și la runtime)."""
+        if record["op"] == "create":
+            order = dict(record["order"])
+            if isinstance(order.get("timestamp"), str):
+                order["timestamp"] = datetime.fromisoformat(order["timestamp"])
+            self._save(order)
+            self._index(order)
+            return order
+        order = self.get(record["order_id"])
+        if order is None:
+            return None
+        if record["op"] == "status":
+            self._unindex(order)
+            order["status"] = record["status"]
+            order["history"].append([record["status"], record["at"], record.get("by")])
+            self._index(order)
+        elif record["op"] == "update":
+            order.update(record["fields"])
+        self._save(order)
+        return order
+
+    # --- API ---
+
+    def create(self, order: Dict[str, Any]) -> Dict[str, Any]:
+        at = order["timestamp"].isoformat()
+        record = {
+            "op": "create",
+            "order": {**order, "status": "new", "history": [["new", at, order.get("user_id")]]},
+        }
+        with self._transaction():
+            order = self._apply(record)
+        self._log(record)
+        return order
+
+    def transition(self, order_id: int, status: str, by: int | str | None = None) -> Dict[str, Any]:
+        """Mută comanda în `status`; OrderTransitionError dacă nu există sau tranziția nu e permisă."""
+        record = {
+            "op": "status",
+            "order_id": order_id,
+            "status": status,
+            "at": datetime.now(timezone.utc).isoformat(),
+            "by": by,
+        }
+        with self._transaction():
+            order = self.get(order_id)
+            if order is None:
+                raise OrderTransitionError(f"Comanda #{order_id} nu există.")
+            if status not in ORDER_TRANSITIONS[order["status"]]:
+                raise OrderTransitionError(
+                    f"Comanda #{order_id} e {ORDER_STATUS_LABELS[order['status']]}, "
+                    f"nu poate deveni {ORDER_STATUS_LABELS[status]}."
+                )
+            order = self._apply(record)
+        self._log(record)
+        return order
+
+    def update(self, order_id: int, **fields) -> Dict[str, Any] | None:
+        record = {"op": "update", "order_id": order_id, "fields": fields}
+        with self._transaction():
+            order = self._apply(record)
+        if order is not None:
+            self._log(record)
+        return order
+
+    def view_index(self, view: str) -> SortedIds | SharedSortedIds | None:
+        """`open`, un status sau o dată YYYY-MM-DD (comenzile deschise cu livrare în ziua aceea)."""
+        if view == "open":
+            return self.open
+        if view in self.by_status:
+            return self.by_status[view]
+        if re.fullmatch(r"\d{4}-\d{2}-\d{2}", view):
+            return self._date_index(view)
+        return None
+
+    def page(self, view: str, after: int = 0, limit: int = 10) -> tuple:
+        """(comenzi, mai_sunt) după ID-ul `after` în ordinea creării."""
+        index = self.view_index(view)
+        if index is None:
+            return [], False
+        ids = index.page(after, limit + 1)
+        orders = [order for order in (self.get(i) for i in ids[:limit]) if order is not None]
+        return orders, len(ids) > limit
+
+    def counts(self) -> Dict[str, int]:
+        return {status: len(index) for status, index in self.by_status.items()}
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+
+class SharedOrderBook(OrderBook):
+    """OrderBook cu comenzile și indexurile în SharedStore, comun worker-ilor.
+
+    Verificarea tranziției și scrierea sunt în aceeași tranzacție, deci o plată
+    procesată de un worker și un click de admin în altul nu se suprascriu.
+    """
+
+    def __init__(self, store: SharedStore, ns: str):
+        super().__init__()
+        self._store = store
+        self._ns = ns
+        self.orders = SharedMapping(store, ns)
+        self.by_status = {
+            status: SharedSortedIds(store, f"{ns}/status/{status}") for status in ORDER_TRANSITIONS
+        }
+        self.open = SharedSortedIds(store, f"{ns}/open")
+
+    def _transaction(self):
+        return self._store.transaction()
+
+    def get(self, order_id: int) -> Dict[str, Any] | None:
+        order = self.orders.get(str(order_id))
+        if order is not None:
+            order["timestamp"] = datetime.fromisoformat(order["timestamp"])
+        return order
+
+    def _save(self, order: Dict[str, Any]):
+        self.orders[str(order["order_id"])] = order
+
+    def _date_index(self, day: str, create: bool = False) -> SharedSortedIds:
+        return SharedSortedIds(self._store, f"{self._ns}/date/{day}")
+
+    def _drop_date_index(self, day: str):
+        pass
+
+
+# ----------------- Oprire controlată -----------------
+
+
+class ShutdownCoordinator:
+    """Coordonează oprirea la SIGTERM: nu mai luăm update-uri, golim ce e în lucru.
+
+    Ordinea: semnal → updater-ele oprite (PTB procesează update-urile deja primite) →
+    `drain()` din run_bots: task-urile urmărite (notificări), apoi hook-urile
+    (coada de sincronizare, broadcast) și la final stările persistente.
+    Tot ce nu se termină până la deadline e anulat și scris în log.
+    """
+
+    def __init__(self, deadline_seconds: float):
+        self.deadline_seconds = deadline_seconds
+        self.draining = False
+        self._deadline: float | None = None
+        self._tasks: set = set()
+        self._hooks: List[tuple] = []
+
+    def track(self, coro, name: str) -> asyncio.Task:
+        """Pornește un task de fundal pe care oprirea îl așteaptă (până la deadline)."""
+        task = asyncio.create_task(coro, name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def on_drain(self, name: str, hook, describe=None):
+        """`hook` – corutină de golire; `describe()` – ce se pierde dacă expiră timpul."""
+        self._hooks.append((name, hook, describe))
+
+    def request(self, stop):
+        """`stop()` – oprește primirea de update-uri (toți boții)."""
+        if self.draining:
+            logger.warning("Shutdown already in progress")
+            return
+        self.draining = True
+        self._deadline = time.monotonic() + self.deadline_seconds
+        logger.info("Stop signal received, draining (deadline %.0fs)", self.deadline_seconds)
+        stop()
+
+    def _remaining(self) -> float:
+        return max(0.0, self._deadline - time.monotonic())
+
+    async def drain(self):
+        if self._deadline is None:
+            self.draining = True
+            self._deadline = time.monotonic() + self.deadline_seconds
+        if self._tasks:
+            logger.info("Waiting for %s background tasks", len(self._tasks))
+            _, pending = await asyncio.wait(set(self._tasks), timeout=self._remaining())
+            for task in pending:
+                logger.error("Shutdown deadline: abandoning task %s", task.get_name())
+                task.cancel()
+        for name, hook, describe in self._hooks:
+            try:
+                await asyncio.wait_for(hook(), timeout=self._remaining())
+            except asyncio.TimeoutError:
+                lost = describe() if describe else None
+                logger.error("Shutdown deadline: abandoned %s (%s)", name, lost)
+            except Exception as e:
+                logger.exception("Shutdown hook %s failed: %s", name, e)
+        flush_state_stores()
+        logger.info("Shutdown drain complete")
+
+
+shutdown = ShutdownCoordinator(SHUTDOWN_DEADLINE_SECONDS)
+
+
+# ----------------- Notificări admin (rezumate sub încărcare) -----------------
+
+
+class AdminNotifier:
+    """Mesajele către chatul de admin: imediat când e liniște, rezumate în rafale.
+
+    Cât timp în ultima fereastră (`window` secunde) au plecat mai puțin de
+    `instant_max` mesaje, fiecare notificare se trimite imediat. Peste prag se
+    strâng și pleacă la finalul ferestrei într-un singur mesaj (câte `digest_max`
+    intrări), așa că o rafală de comenzi nu mai umple limita per chat înaintea
+    răspunsurilor către clienți. Butoanele fiecărei comenzi rămân în rezumat,
+    după statusul de la momentul trimiterii.
+    """
+
+    def __init__(self, window: float, instant_max: int, digest_max: int):
+        self.window = window
+        self.instant_max = max(1, instant_max)
+        self.digest_max = max(1, digest_max)
+        self._sent: deque = deque()
+        self._pending: List[tuple] = []
+        self._flush_task: asyncio.Task | None = None
+        self._flushing = False
+        self._bot = None
+        self._chat_id: int | None = None
+        self._tenant = None
+        self.instant = 0
+        self.coalesced = 0
+        self.digests = 0
+
+    def notify(self, bot, chat_id: int | None, text: str, order_id: int | None = None):
+        """Nu blochează handler-ul: trimiterea rulează în fundal."""
+        if not chat_id:
+            return
+        now = time.monotonic()
+        while self._sent and self._sent[0] <= now - self.window:
+            self._sent.popleft()
+        if self.window <= 0 or (not self._pending and len(self._sent) < self.instant_max):
+            self._sent.append(now)
+            self.instant += 1
+            shutdown.track(self._send_one(bot, chat_id, text, order_id), name=f"admin-notify-{order_id}")
+            return
+        self._bot, self._chat_id, self._tenant = bot, chat_id, tenant()
+        self._pending.append((text, order_id))
+        self.coalesced += 1
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later(), name="admin-digest")
+
+    async def _send_one(self, bot, chat_id: int, text: str, order_id: int | None):
+        order = tenant().order_book.get(order_id) if order_id else None
+        try:
+            await bot.send_message(
+                chat_id, text, reply_markup=order_admin_keyboard(order) if order else None
+            )
+        except Exception as e:
+            logger.exception("Failed to notify admin (order #%s): %s", order_id, e)
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        self._flushing = True
+        try:
+            await self.flush()
+        finally:
+            self._flushing = False
+
+    async def flush(self):
+        """Trimite acum tot ce e strâns (și la oprire, din drain)."""
+        items, self._pending = self._pending, []
+        for start in range(0, len(items), self.digest_max):
+            chunk = items[start:start + self.digest_max]
+            # limita Telegram e 4096 de caractere pe mesaj
+            budget = 3900 // len(chunk)
+            parts = [text if len(text) <= budget else text[:budget - 1] + "…" for text, _ in chunk]
+            rows = []
+            for _, order_id in chunk:
+                order = tenant().order_book.get(order_id) if order_id else None
+                buttons = order_action_buttons(order, ":d") if order else []
+                if buttons:
+                    rows.append(buttons)
+            self._sent.append(time.monotonic())
+            self.digests += 1
+            try:
+                await self._bot.send_message(
+                    self._chat_id,
+                    f"📬 Rezumat: {len(chunk)} notificări\n\n" + "\n\n— — —\n\n".join(parts),
+                    reply_markup=InlineKeyboardMarkup(rows) if rows else None,
+                )
+            except Exception as e:
+                logger.exception("Failed to send admin digest (%s items): %s", len(chunk), e)
+
+    async def drain(self):
+        task = self._flush_task
+        if task is not None and not task.done():
+            if self._flushing:
+                # a scos deja rezumatul din _pending; anulat, l-ar pierde
+                await task
+            else:
+                task.cancel()
+        if self._pending:
+            # hook-urile de oprire rulează fără tenant activ
+            with self._tenant.active():
+                await self.flush()
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "instant": self.instant,
+            "coalesced": self.coalesced,
+            "digests": self.digests,
+            "pending": len(self._pending),
+        }
+
+
+# ----------------- Limitare abuz (per utilizator) -----------------
+
+
+class UserThrottle:
+    """Token bucket per (funcție, utilizator), ținut ca un singur float (GCRA).
+
+    Pentru fiecare utilizator activ reținem doar momentul la care bucket-ul lui
+    ar fi din nou plin (`tat`). O cerere trece dacă depășirea față de acum e sub
+    `(burst - 1) * period`; fiecare cerere acceptată adaugă `period`. Un bucket
+    plin nu mai are nevoie de intrare, deci intrările expirate se scot din fața
+    dict-ului (ordonat după ultima cerere acceptată), amortizat O(1) per apel.
+    Cu worker-i limita e per proces; update-urile unui utilizator ajung oricum la același worker.
+    """
+
+    def __init__(self, limits: Dict[str, tuple], offenders_max: int = 1000):
+        self.limits = {feature: (max(1, int(burst)), float(period)) for feature, (burst, period) in limits.items()}
+        self.offenders_max = offenders_max
+        self._tat: Dict[str, Dict[int, float]] = {feature: {} for feature in self.limits}
+        self.allowed = dict.fromkeys(self.limits, 0)
+        self.throttled = dict.fromkeys(self.limits, 0)
+        self.offenders: Dict[int, Dict[str, int]] = {}
+
+    @staticmethod
+    def _evict(bucket: Dict[int, float], now: float):
+        for user_id, tat in list(itertools.islice(bucket.items(), 64)):
+            if tat > now:
+                break
+            del bucket[user_id]
+
+    def hit(self, feature: str, user_id: int | None) -> float:
+        """0 dacă cererea trece, altfel câte secunde mai are de așteptat."""
+        if feature not in self.limits or user_id is None:
+            return 0.0
+        burst, period = self.limits[feature]
+        now = time.monotonic()
+        bucket = self._tat[feature]
+        self._evict(bucket, now)
+        tat = max(bucket.get(user_id, now), now)
+        wait = tat - now - (burst - 1) * period
+        if wait > 0:
+            self.throttled[feature] += 1
+            counts = self.offenders.setdefault(user_id, {})
+            counts[feature] = counts.get(feature, 0) + 1
+            if len(self.offenders) > self.offenders_max:
+                # păstrăm doar cei mai insistenți
+                keep = sorted(self.offenders.items(), key=lambda item: -sum(item[1].values()))
+                self.offenders = dict(keep[: self.offenders_max // 10])
+            return wait
+        bucket.pop(user_id, None)
+        bucket[user_id] = tat + period
+        self.allowed[feature] += 1
+        return 0.0
+
+    def snapshot(self, top: int = 10) -> Dict[str, Any]:
+        offenders = sorted(self.offenders.items(), key=lambda item: -sum(item[1].values()))[:top]
+        return {
+            "features": {
+                feature: {
+                    "allowed": self.allowed[feature],
+                    "throttled": self.throttled[feature],
+                    "tracked_users": len(self._tat[feature]),
+                }
+                for feature in self.limits
+            },
+            "offenders": [{"user_id": user_id, **counts} for user_id, counts in offenders],
+        }
+
+
+async def throttled(update: Update, context: ContextTypes.DEFAULT_TYPE, feature: str) -> bool:
+    """True dacă utilizatorul a depășit limita pentru `feature` (și a primit deja mesajul)."""
+    user = update.effective_user
+    wait = tenant().throttle.hit(feature, user.id if user else None)
+    if not wait:
+        return False
+    logger.info("Throttled %s for user %s (%.0fs left)", feature, user.id, wait)
+    text = tr(get_lang(context), "throttled").format(seconds=math.ceil(wait))
+    if update.callback_query:
+        await update.callback_query.answer(text, show_alert=True)
+    else:
+        await send_text(update, context, text)
+    return True
+
+
+# ----------------- Ledger plăți -----------------
+
+
+class PaymentLedger:
+    """Leagă invoice_payload (`order-{order_id}`) de comandă și de plăți.
+
+    Toate căutările sunt O(1): payload → factură, charge_id → payload.
+    """
+
+    def __init__(self, state: PersistentState):
+        self._state = state
+        self.invoices: Dict[str, Dict[str, Any]] = state.data.setdefault("invoices", {})
+        self.charges: Dict[str, str] = state.data.setdefault("charges", {})
+
+    def register_invoice(
+        self, payload: str, order_id: int, user_id: int, amount: int, currency: str
+    ):
+        self.invoices[payload] = {
+            "order_id": order_id,
+            "user_id": user_id,
+            "amount": amount,
+            "currency": currency,
+            "status": "pending",
+        }
+        self._state.mark_dirty()
+
+    def validate(self, payload: str, total_amount: int, currency: str) -> str | None:
+        """Întoarce motivul respingerii sau None dacă factura poate fi plătită."""
+        invoice = self.invoices.get(payload)
+        if invoice is None:
+            return "unknown payload"
+        if invoice["status"] == "paid":
+            return "already paid"
+        if invoice["amount"] != total_amount or invoice["currency"] != currency:
+            return (
+                f"amount mismatch: expected {invoice['amount']} {invoice['currency']}, "
+                f"got {total_amount} {currency}"
+            )
+        return None
+
+    def record_payment(self, payment, user_id: int) -> tuple[Dict[str, Any] | None, bool]:
+        """Marchează factura plătită. Al doilea element e False pentru update-uri duplicate."""
+        charge_id = payment.telegram_payment_charge_id
+        if charge_id in self.charges:
+            return self.invoices.get(self.charges[charge_id]), False
+        self.charges[charge_id] = payment.invoice_payload
+        invoice = self.invoices.get(payment.invoice_payload)
+        if invoice is not None:
+            invoice.update(
+                status="paid",
+                paid_at=datetime.now(timezone.utc).isoformat(),
+                paid_amount=payment.total_amount,
+                paid_by=user_id,
+                telegram_charge_id=charge_id,
+                provider_charge_id=payment.provider_payment_charge_id,
+            )
+        self._state.mark_dirty()
+        return invoice, True
+
+
+def mark_order_paid(order_id: int, charge_id: str) -> Dict[str, Any] | None:
+    """Datele plății în comandă și statusul `paid`, dacă e încă permis (ex. nu și pentru una în livrare)."""
+    book = tenant().order_book
+    order = book.update(
+        order_id,
+        paid=True,
+        paid_at=datetime.now(timezone.utc).isoformat(),
+        payment_charge_id=charge_id,
+    )
+    if order is not None and "paid" in ORDER_TRANSITIONS[order["status"]]:
+        try:
+            order = book.transition(order_id, "paid", by="payment")
+        except OrderTransitionError:
+            # alt worker a schimbat statusul între timp
+            pass
+    return order
+
+
+# ----------------- Agregate rapoarte -----------------
+
+
+class ReportAggregates:
+    """Contoare pe zi, actualizate incremental la fiecare comandă / consultație AI.
+
+    Un raport însumează doar câteva buckete zilnice, indiferent câte comenzi există.
+    """
+
+    def __init__(self, state: PersistentState, tz: str, retention_days: int):
+        self._state = state
+        self.tz = ZoneInfo(tz)
+        self.retention_days = retention_days
+        self.days: Dict[str, Dict[str, Any]] = state.data.setdefault("days", {})
+
+    def today(self) -> date:
+        return datetime.now(self.tz).date()
+
+    @staticmethod
+    def _new_bucket() -> Dict[str, Any]:
+        return {
+            "orders": 0,
+            "revenue": 0,
+            "products": {},
+            "ai_consultations": 0,
+            "ai_orders": 0,
+        }
+
+    def _update_bucket(self, day: date, fn):
+        key = day.isoformat()
+        if key not in self.days:
+            self._purge(day)
+        update_entry(self.days, key, self._new_bucket, fn)
+        self._state.mark_dirty()
+
+    def _purge(self, today: date):
+        cutoff = (today - timedelta(days=self.retention_days)).isoformat()
+        for key in [k for k in self.days if k < cutoff]:
+            del self.days[key]
+
+    def record_order(self, order: Dict[str, Any]):
+        def add(bucket):
+            bucket["orders"] += 1
+            bucket["revenue"] += order.get("price") or 0
+            name = order.get("product_name") or "—"
+            bucket["products"][name] = bucket["products"].get(name, 0) + 1
+            if order.get("via_ai"):
+                bucket["ai_orders"] += 1
+
+        self._update_bucket(order["timestamp"].astimezone(self.tz).date(), add)
+
+    def record_ai_consultation(self):
+        def add(bucket):
+            bucket["ai_consultations"] += 1
+
+        self._update_bucket(self.today(), add)
+
+    def summary(self, first: date, last: date) -> Dict[str, Any]:
+        total = {"orders": 0, "revenue": 0, "products": {}, "ai_consultations": 0, "ai_orders": 0}
+        day = first
+        while day <= last:
+            bucket = self.days.get(day.isoformat())
+            if bucket:
+                for key in ("orders", "revenue", "ai_consultations", "ai_orders"):
+                    total[key] += bucket[key]
+                for name, count in bucket["products"].items():
+                    total["products"][name] = total["products"].get(name, 0) + count
+            day += timedelta(days=1)
+        return total
+
+
+def format_report(title: str, summary: Dict[str, Any]) -> str:
+    top = sorted(summary["products"].items(), key=lambda x: x[1], reverse=True)[:3]
+    top_str = "\n".join(f"• {name}: {cnt} comenzi" for name, cnt in top)
+    consultations = summary["ai_consultations"]
+    conversion = (
+        f"{summary['ai_orders']}/{consultations} ({summary['ai_orders'] / consultations:.0%})"
+        if consultations
+        else "—"
+    )
+    return (
+        f"{title}\n\n"
+        f"🧾 Număr comenzi: {summary['orders']}\n"
+        f"💰 Total estimat: {summary['revenue']} MDL\n"
+        f"🤖 Consultant AI → comandă: {conversion}\n\n"
+        f"🏆 Top produse:\n{top_str if top_str else '—'}"
+    )
+
+
+# ----------------- Stocuri & rezervări -----------------
+
+
+class Inventory:
+    """Stoc per produs cu rezervări atomice la confirmarea comenzii.
+
+    Rezervarea e o verificare + decrement fără niciun `await` între ele, deci pe
+    event loop e atomică – fără lock global, fără vânzare peste stoc.
+    Produsele fără intrare în `stock` au stoc nelimitat.
+    Rezervare: held → committed (acceptată / plătită). Una respinsă / expirată se
+    eliberează și se șterge, la fel una livrată, ca fișierul să nu crească la
+    nesfârșit; o comandă cu rezervarea expirată o reface la plată / acceptare.
+    """
+
+    def __init__(self, state: PersistentState, ttl_seconds: float):
+        self._state = state
+        self.ttl_seconds = ttl_seconds
+        self.stock: Dict[str, int] = state.data.setdefault("stock", {})
+        self.reservations: Dict[str, Dict[str, Any]] = state.data.setdefault("reservations", {})
+        self._prune_released()
+        self._expiry_heap: List[tuple] = [
+            (r["expires_at"], oid) for oid, r in self.reservations.items() if r["status"] == "held"
+        ]
+        heapq.heapify(self._expiry_heap)
+        self.on_availability_change = None  # callback(product_id)
+
+    def _prune_released(self):
+        """Rezervări „released” rămase de la versiunea care nu le ștergea."""
+        released = [oid for oid, r in self.reservations.items() if r["status"] == "released"]
+        for oid in released:
+            del self.reservations[oid]
+        if released:
+            self._state.mark_dirty()
+
+    def seed(self, products: List[Dict[str, Any]]):
+        """Stocul inițial din PRODUCTS[...]["stock"], doar pentru produsele încă necunoscute."""
+        for p in products:
+            if "stock" in p and p["id"] not in self.stock:
+                self.stock[p["id"]] = int(p["stock"])
+                self._state.mark_dirty()
+
+    def refresh(self):
+        """Un singur proces – stocul local e mereu la zi."""
+
+    def is_available(self, product_id: str) -> bool:
+        left = self.stock.get(product_id)
+        return left is None or left > 0
+
+    def _changed(self, product_id: str, before: int, after: int):
+        self._state.mark_dirty()
+        if (before > 0) != (after > 0) and self.on_availability_change:
+            self.on_availability_change(product_id)
+
+    def set_stock(self, product_id: str, quantity: int):
+        before = self.stock.get(product_id, 1)
+        self.stock[product_id] = max(0, quantity)
+        self._changed(product_id, before, self.stock[product_id])
+
+    def reserve(self, product_id: str, order_id: int, quantity: int = 1) -> bool:
+        left = self.stock.get(product_id)
+        if left is None:
+            return True
+        if left < quantity:
+            return False
+        self.stock[product_id] = left - quantity
+        expires_at = time.time() + self.ttl_seconds
+        self.reservations[str(order_id)] = {
+            "product_id": product_id,
+            "quantity": quantity,
+            "expires_at": expires_at,
+            "status": "held",
+        }
+        heapq.heappush(self._expiry_heap, (expires_at, str(order_id)))
+        self._changed(product_id, left, left - quantity)
+        return True
+
+    def hold(self, order_id: int, product_id: str | None) -> bool:
+        """Rezervarea comenzii rămâne sau, dacă a expirat între timp, se reface; False = epuizat."""
+        if not product_id or str(order_id) in self.reservations:
+            return True
+        return self.reserve(product_id, order_id)
+
+    def commit(self, order_id: int, product_id: str | None) -> bool:
+        """held → committed, refăcând întâi rezervarea expirată; False dacă nu mai e stoc."""
+        if not self.hold(order_id, product_id):
+            return False
+        reservation = self.reservations.get(str(order_id))
+        if reservation and reservation["status"] == "held":
+            reservation["status"] = "committed"
+            self._state.mark_dirty()
+        return True
+
+    def forget(self, order_id: int):
+        """Comanda livrată: stocul rămâne consumat, rezervarea nu mai trebuie ținută."""
+        if self.reservations.pop(str(order_id), None) is not None:
+            self._state.mark_dirty()
+
+    def release(self, order_id: int) -> bool:
+        reservation = self.reservations.pop(str(order_id), None)
+        if not reservation:
+            return False
+        product_id = reservation["product_id"]
+        before = self.stock.get(product_id, 0)
+        self.stock[product_id] = before + reservation["quantity"]
+        self._changed(product_id, before, self.stock[product_id])
+        return True
+
+    def expire(self, now: float | None = None) -> List[str]:
+        """Eliberează rezervările „held” expirate; O(k log n) pentru k expirate."""
+        now = now or time.time()
+        expired = []
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            _, order_id = heapq.heappop(self._expiry_heap)
+            reservation = self.reservations.get(order_id)
+            if reservation and reservation["status"] == "held" and self.release(int(order_id)):
+                expired.append(order_id)
+        return expired
+
+
+class SharedInventory(Inventory):
+    """Inventory pentru modul cu worker-i: stocul (contoare) și rezervările stau în SharedStore.
+
+    reserve / release sunt tranzacții SQLite, deci atomice și între procese.
+    `is_available` citește o copie locală a stocului reîmprospătată cel mult o dată
+    pe secundă (catalogul nu interoghează baza pentru fiecare produs). Handler-ele
+    de catalog citesc doar paginile precalculate, așa că apelează `refresh()` înainte:
+    trecerile în/din „epuizat” făcute de alți worker-i declanșează atunci
+    `on_availability_change` și paginile se reconstruiesc.
+    """
+
+    REFRESH_SECONDS = 1.0
+
+    def __init__(self, store: SharedStore, ns: str, ttl_seconds: float):
+        self._store = store
+        self._stock_ns = f"{ns}/stock"
+        self._state = SharedState(store, ns)
+        self.ttl_seconds = ttl_seconds
+        self.reservations = self._state.data.setdefault("reservations", {})
+        self._prune_released()
+        self.stock = store.counters(self._stock_ns)
+        self._refreshed_at = time.monotonic()
+        # rezervările „held” ale tuturor worker-ilor; release e idempotent între procese
+        self._expiry_heap = [
+            (r["expires_at"], oid) for oid, r in self.reservations.items() if r["status"] == "held"
+        ]
+        heapq.heapify(self._expiry_heap)
+        self.on_availability_change = None
+
+    def _refresh(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._refreshed_at < self.REFRESH_SECONDS:
+            return
+        self._refreshed_at = now
+        before, self.stock = self.stock, self._store.counters(self._stock_ns)
+        if self.on_availability_change:
+            for product_id in set(before) | set(self.stock):
+                if (before.get(product_id, 1) > 0) != (self.stock.get(product_id, 1) > 0):
+                    self.on_availability_change(product_id)
+
+    def refresh(self):
+        self._refresh()
+
+    def seed(self, products: List[Dict[str, Any]]):
+        for p in products:
+            if "stock" in p:
+                self._store.set_counter(self._stock_ns, p["id"], int(p["stock"]), only_if_missing=True)
+        self._refresh(force=True)
+
+    def is_available(self, product_id: str) -> bool:
+        self._refresh()
+        return super().is_available(product_id)
+
+    def set_stock(self, product_id: str, quantity: int):
+        self._store.set_counter(self._stock_ns, product_id, max(0, quantity))
+        self._refresh(force=True)
+
+    def reserve(self, product_id: str, order_id: int, quantity: int = 1) -> bool:
+        with self._store.transaction():
+            if self._store.add(self._stock_ns, product_id, -quantity) is None:
+                # fără contor = stoc nelimitat; altfel nu mai e destul
+                return self._store.counter(self._stock_ns, product_id) is None
+            expires_at = time.time() + self.ttl_seconds
+            self.reservations[str(order_id)] = {
+                "product_id": product_id,
+                "quantity": quantity,
+                "expires_at": expires_at,
+                "status": "held",
+            }
+        heapq.heappush(self._expiry_heap, (expires_at, str(order_id)))
+        self._refresh(force=True)
+        return True
+
+    def hold(self, order_id: int, product_id: str | None) -> bool:
+        with self._store.transaction():
+            return super().hold(order_id, product_id)
+
+    def commit(self, order_id: int, product_id: str | None) -> bool:
+        with self._store.transaction():
+            if not super().hold(order_id, product_id):
+                return False
+            reservation = self.reservations.get(str(order_id))
+            if reservation and reservation["status"] == "held":
+                self.reservations[str(order_id)] = {**reservation, "status": "committed"}
+        return True
+
+    def release(self, order_id: int) -> bool:
+        with self._store.transaction():
+            reservation = self.reservations.pop(str(order_id), None)
+            if not reservation:
+                return False
+            self._store.add(self._stock_ns, reservation["product_id"], reservation["quantity"])
+        self._refresh(force=True)
+        return True
+
+
+async def reservation_expiry_loop():
+    while True:
+        await asyncio.sleep(60)
+        expired = tenant().inventory.expire()
+        if expired:
+            logger.info("Released expired reservations: %s", expired)
+
+
+# ----------------- Sloturi de livrare -----------------
+
+WEEKDAYS = {
+    LANG_RO: ["Lu", "Ma", "Mi", "Jo", "Vi", "Sâ", "Du"],
+    LANG_RU: ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"],
+}
+
+
+class SlotScheduler:
+    """Capacitate per (zi, interval, oraș) cu index în memorie al locurilor ocupate.
+
+    Verificarea și rezervarea unui slot sunt O(1) (un lookup în dict);
+    ocupările se persistă, ca să supraviețuiască restartului.
+    """
+
+    def __init__(self, state: PersistentState, windows: List[str], days_ahead: int, tz: str):
+        self._state = state
+        self.windows = windows
+        self.days_ahead = days_ahead
+        self.tz = ZoneInfo(tz)
+        self.booked: Dict[str, int] = state.data.setdefault("booked", {})
+        self.orders: Dict[str, str] = state.data.setdefault("orders", {})
+
+    @staticmethod
+    def _city_key(city: str | None) -> str:
+        return _normalize_search_text(city or "").strip() or "-"
+
+    @staticmethod
+    def capacity(city_key: str) -> int:
+        return int(SLOT_CITY_CAPACITY.get(city_key, SLOT_CAPACITY))
+
+    def _key(self, day: str, window: int, city: str | None) -> str:
+        return f"{day}|{window}|{self._city_key(city)}"
+
+    def remaining(self, day: str, window: int, city: str | None) -> int:
+        key = self._key(day, window, city)
+        return self.capacity(self._city_key(city)) - self.booked.get(key, 0)
+
+    def _window_start(self, day: date, window: int) -> datetime:
+        hour, minute = self.windows[window].split("-")[0].split(":")
+        return datetime(day.year, day.month, day.day, int(hour), int(minute), tzinfo=self.tz)
+
+    def available(self, city: str | None, limit: int) -> List[tuple]:
+        """Următoarele sloturi libere: [(zi ISO, index interval)]."""
+        now = datetime.now(self.tz)
+        result = []
+        for offset in range(self.days_ahead + 1):
+            day = now.date() + timedelta(days=offset)
+            for window in range(len(self.windows)):
+                if self._window_start(day, window) <= now:
+                    continue
+                if self.remaining(day.isoformat(), window, city) > 0:
+                    result.append((day.isoformat(), window))
+                    if len(result) >= limit:
+                        return result
+        return result
+
+    def is_offered(self, day: str, window: int) -> bool:
+        """Doar sloturile pe care le-am putea afișa ca butoane (callback_data vine de la client)."""
+        try:
+            d = date.fromisoformat(day)
+        except ValueError:
+            return False
+        if window not in range(len(self.windows)):
+            return False
+        now = datetime.now(self.tz)
+        if not now.date() <= d <= now.date() + timedelta(days=self.days_ahead):
+            return False
+        return self._window_start(d, window) > now
+
+    def label(self, day: str, window: int, lang: str) -> str:
+        d = date.fromisoformat(day)
+        return f"{WEEKDAYS[lang][d.weekday()]} {d.strftime('%d.%m')} · {self.windows[window]}"
+
+    def book(self, day: str, window: int, city: str | None, order_id: int) -> bool:
+        """Verificare + ocupare fără `await` între ele – atomic pe event loop."""
+        if self.remaining(day, window, city) <= 0:
+            return False
+        key = self._key(day, window, city)
+        self.booked[key] = self.booked.get(key, 0) + 1
+        self.orders[str(order_id)] = key
+        self._state.mark_dirty()
+        return True
+
+    def release(self, order_id: int):
+        key = self.orders.pop(str(order_id), None)
+        if key and self.booked.get(key, 0) > 0:
+            self.booked[key] -= 1
+            self._state.mark_dirty()
+
+    def purge_past(self):
+        today = datetime.now(self.tz).date().isoformat()
+        for key in [k for k in self.booked if k.split("|", 1)[0] < today]:
+            del self.booked[key]
+        for order_id in [o for o, k in self.orders.items() if k.split("|", 1)[0] < today]:
+            del self.orders[order_id]
+        self._state.mark_dirty()
+
+
+class SharedSlotScheduler(SlotScheduler):
+    """SlotScheduler pentru worker-i: ocupările sunt contoare SharedStore, rezervarea e atomică între procese."""
+
+    def __init__(self, store: SharedStore, ns: str, windows: List[str], days_ahead: int, tz: str):
+        self._store = store
+        self._booked_ns = f"{ns}/booked"
+        self._state = SharedState(store, ns)
+        self.windows = windows
+        self.days_ahead = days_ahead
+        self.tz = ZoneInfo(tz)
+        self.orders = self._state.data.setdefault("orders", {})
+
+    @property
+    def booked(self) -> Dict[str, int]:
+        return self._store.counters(self._booked_ns)
+
+    def remaining(self, day: str, window: int, city: str | None) -> int:
+        booked = self._store.counter(self._booked_ns, self._key(day, window, city)) or 0
+        return self.capacity(self._city_key(city)) - booked
+
+    def book(self, day: str, window: int, city: str | None, order_id: int) -> bool:
+        key = self._key(day, window, city)
+        with self._store.transaction():
+            capacity = self.capacity(self._city_key(city))
+            if self._store.add(self._booked_ns, key, 1, maximum=capacity, default=0) is None:
+                return False
+            self.orders[str(order_id)] = key
+        return True
+
+    def release(self, order_id: int):
+        with self._store.transaction():
+            key = self.orders.pop(str(order_id), None)
+            if key:
+                self._store.add(self._booked_ns, key, -1)
+
+    def purge_past(self):
+        today = datetime.now(self.tz).date().isoformat()
+        self._store.delete_counters(
+            self._booked_ns, [k for k in self.booked if k.split("|", 1)[0] < today]
+        )
+        for order_id, key in self.orders.items():
+            if key.split("|", 1)[0] < today:
+                del self.orders[order_id]
+
+
+_last_order_id = 0
+
+
+def next_order_id() -> int:
+    """ID bazat pe timp, dar unic și crescător și la mai multe comenzi în aceeași secundă."""
+    global _last_order_id
+    if shared_store is not None:
+        # worker-i: aceeași secvență pentru toate procesele
+        return shared_store.next_value("order_id", int(time.time()))
+    _last_order_id = max(int(time.time()), _last_order_id + 1)
+    return _last_order_id
+
+
+# ----------------- Deduplicare update-uri -----------------
+
+
+class SeenUpdates:
+    """Cache LRU mărginit cu update_id / callback_query.id deja văzute.
+
+    `high_water` (cel mai mare update_id procesat) se persistă, ca după restart
+    să respingem și update-urile livrate din nou de Telegram. Pragul contează
+    doar `guard_seconds` după pornire (redelivery-ul vine imediat); apoi decide
+    doar cache-ul. Telegram poate reîncepe numerotarea mai jos, așa că un salt
+    în jos mai mare decât cache-ul anulează pragul și mută `high_water`.
+    """
+
+    def __init__(self, max_size: int, state: PersistentState, guard_seconds: float):
+        self.max_size = max(1, max_size)
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._state = state
+        self.high_water = int(state.data.get("high_water", 0))
+        self._restart_high_water = self.high_water
+        self._guard_until = time.monotonic() + guard_seconds
+        self.dropped = 0
+
+    def _remember(self, key: str) -> bool:
+        if key in self._seen:
+            self._seen.move_to_end(key)
+            return False
+        self._seen[key] = None
+        if len(self._seen) > self.max_size:
+            self._seen.popitem(last=False)
+        return True
+
+    def _far_below(self, update_id: int, mark: int) -> bool:
+        return update_id < mark - self.max_size
+
+    def is_replay(self, update: Update) -> bool:
+        if update.update_id <= self._restart_high_water:
+            if time.monotonic() < self._guard_until and not self._far_below(
+                update.update_id, self._restart_high_water
+            ):
+                self.dropped += 1
+                return True
+            self._restart_high_water = 0
+        keys = [f"u:{update.update_id}"]
+        if update.callback_query:
+            keys.append(f"cq:{update.callback_query.id}")
+        fresh = [self._remember(key) for key in keys]
+        if not all(fresh):
+            self.dropped += 1
+            return True
+        if update.update_id > self.high_water or self._far_below(update.update_id, self.high_water):
+            self.high_water = update.update_id
+            self._state.data["high_water"] = self.high_water
+            self._state.mark_dirty()
+        return False
+
+
+async def drop_replayed_updates(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Rulează înaintea oricărui handler; oprește update-urile deja procesate."""
+    if tenant().seen_updates.is_replay(update):
+        logger.info("Dropping replayed update %s", update.update_id)
+        raise ApplicationHandlerStop
+
+
+# ----------------- Înregistrare trafic (replay offline) -----------------
+
+_PERSON_KEYS = {"from", "chat", "user", "sender_chat", "forward_from", "forward_from_chat"}
+# date personale care nu contează pentru rutarea handler-elor
+_DROP_KEYS = {"contact", "location", "venue", "order_info", "shipping_address"}
+# câmpurile din callback_data care sunt ID-uri Telegram (butoanele vechi de admin);
+# ID-urile de comenzi, paginile și intervalele rămân, ca replay-ul să le rezolve la fel
+_CALLBACK_ID_FIELDS = {"admin_accept": (1,), "admin_reject": (1,)}
+
+
+def _mask_text(text: str) -> str:
+    """Literele devin `x`, telefoanele zerouri; lungimea (deci și offset-urile entităților) rămâne."""
+    text = _PHONE_RE.sub(lambda m: re.sub(r"\d", "0", m.group(0)), text)
+    return re.sub(r"[^\W\d_]", "x", text)
+
+
+class TrafficRecorder:
+    """Scrie update-urile primite, fără PII, în fișiere JSONL gzip rotite (RECORD_DIR).
+
+    Pe event loop doar punem update-ul într-o coadă mărginită; curățarea,
+    serializarea și compresia se fac într-un thread. Dacă thread-ul rămâne în
+    urmă, update-urile se pierd (numărate în `dropped`), botul nu așteaptă.
+
+    ID-urile de user/chat devin pseudonime stabile în cadrul procesului (conversațiile
+    rămân coerente la replay), cu excepția chaturilor de admin/suport. Textele
+    libere sunt mascate; comenzile, butoanele din TEXTS și numele de produse rămân,
+    ca replay-ul să treacă prin aceleași handler-e. Eșantionarea se face per chat.
+    ID-urile comenzilor create se scriu și ele (`record_order`): replay-ul le refolosește,
+    ca plățile și butoanele de admin înregistrate să găsească aceleași comenzi.
+    """
+
+    def __init__(self, directory: str, sample_rate: float, rotate_bytes: int):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.rotate_bytes = max(1, rotate_bytes)
+        self.dropped = 0
+        self._salt = os.urandom(16)
+        self._queue: queue.Queue = queue.Queue(maxsize=10000)
+        self._thread: threading.Thread | None = None
+        self._keep_texts: Dict[str, set] = {}
+
+    def _digest(self, value: int) -> int:
+        return int.from_bytes(hashlib.sha256(self._salt + str(value).encode()).digest()[:5], "big")
+
+    def _sampled(self, update: Update) -> bool:
+        chat = update.effective_chat
+        return not chat or self._digest(chat.id) % 10000 < self.sample_rate * 10000
+
+    def record(self, t, update: Update):
+        if not self._sampled(update):
+            return
+        if t.name not in self._keep_texts:
+            keep = {v.strip() for texts in t.texts.values() for v in texts.values() if isinstance(v, str)}
+            keep.update(p[key].strip() for p in t.products for key in ("name_ro", "name_ru"))
+            self._keep_texts[t.name] = keep
+        keep_ids = {t.admin_chat_id, t.support_chat_id}
+        try:
+            self._queue.put_nowait((time.time(), t.name, keep_ids, update))
+        except queue.Full:
+            self.dropped += 1
+
+    def record_order(self, t, update: Update, order_id: int):
+        """Comanda creată de `update` (ID-ul bazat pe timp nu se poate regenera la replay)."""
+        if not self._sampled(update):
+            return
+        try:
+            self._queue.put_nowait(
+                (time.time(), t.name, None, {"update_id": update.update_id, "order_id": order_id})
+            )
+        except queue.Full:
+            self.dropped += 1
+
+    def _pseudonym(self, value: int, keep_ids: set) -> int:
+        if value in keep_ids:
+            return value
+        return (1 if value > 0 else -1) * (self._digest(value) + 1)
+
+    def _scrub_person(self, person: Dict[str, Any], keep_ids: set) -> Dict[str, Any]:
+        out = {k: v for k, v in person.items() if k in ("id", "is_bot", "type", "language_code")}
+        if "id" in out:
+            out["id"] = self._pseudonym(out["id"], keep_ids)
+        if "first_name" in person:
+            out["first_name"] = "User"
+        if "title" in person:
+            out["title"] = "Chat"
+        return out
+
+    def _scrub_callback_data(self, data: str, keep_ids: set) -> str:
+        parts = data.split(":")
+        for i in _CALLBACK_ID_FIELDS.get(parts[0], ()):
+            if i < len(parts) and parts[i].lstrip("-").isdigit():
+                parts[i] = str(self._pseudonym(int(parts[i]), keep_ids))
+        return ":".join(parts)
+
+    def _scrub(self, value, keep_texts: set, keep_ids: set):
+        if isinstance(value, list):
+            return [self._scrub(v, keep_texts, keep_ids) for v in value]
+        if not isinstance(value, dict):
+            return value
+        out = {}
+        for key, v in value.items():
+            if key in _DROP_KEYS:
+                continue
+            if key in _PERSON_KEYS and isinstance(v, dict):
+                out[key] = self._scrub_person(v, keep_ids)
+            elif key in ("text", "caption") and isinstance(v, str):
+                out[key] = v if v.startswith("/") or v.strip() in keep_texts else _mask_text(v)
+            elif key == "query" and isinstance(v, str):
+                out[key] = redact_pii(v)
+            elif key == "data" and isinstance(v, str):
+                out[key] = self._scrub_callback_data(v, keep_ids)
+            else:
+                out[key] = self._scrub(v, keep_texts, keep_ids)
+        return out
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._writer, name="traffic-recorder", daemon=True)
+        self._thread.start()
+
+    async def close(self):
+        if self._thread:
+            self._queue.put(None)
+            await asyncio.to_thread(self._thread.join)
+            logger.info("Traffic recorder closed (%s updates dropped)", self.dropped)
+
+    def _open_next(self, seq: int):
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.directory, f"updates-{stamp}-{seq:04d}.jsonl.gz")
+        return gzip.open(path, "wt", encoding="utf-8")
+
+    def _writer(self):
+        out = None
+        seq = written = 0
+        last_flush = time.monotonic()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            ts, tenant_name, keep_ids, update = item
+            update_id = update["update_id"] if isinstance(update, dict) else update.update_id
+            try:
+                entry = {"ts": ts, "tenant": tenant_name}
+                if isinstance(update, dict):
+                    entry["order"] = update
+                else:
+                    entry["update"] = self._scrub(update.to_dict(), self._keep_texts[tenant_name], keep_ids)
+                line = json.dumps(entry, ensure_ascii=False)
+                if out is None or written >= self.rotate_bytes:
+                    if out:
+                        out.close()
+                    seq += 1
+                    out = self._open_next(seq)
+                    written = 0
+                out.write(line + "\n")
+                written += len(line) + 1
+                # flush rar: fiecare flush strică puțin compresia
+                if self._queue.empty() and time.monotonic() - last_flush > 5:
+                    out.flush()
+                    last_flush = time.monotonic()
+            except Exception as e:
+                logger.exception("Traffic recorder failed on update %s: %s", update_id, e)
+        if out:
+            out.close()
+
+
+traffic_recorder = (
+    TrafficRecorder(RECORD_DIR, RECORD_SAMPLE_RATE, int(RECORD_ROTATE_MB * 1024 * 1024))
+    if RECORD_DIR
+    else None
+)
+
+
+async def record_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Înaintea deduplicării: înregistrăm exact ce a trimis Telegram."""
+    traffic_recorder.record(context.application.bot_data["tenant"], update)
+
+
+# ----------------- Clienți & rate limiting -----------------
+
+
+class CustomerRegistry:
+    """Toți userii care au comandat vreodată (pentru broadcast), persistat."""
+
+    def __init__(self, state: PersistentState):
+        self._state = state
+        self.users: Dict[str, Dict[str, Any]] = state.data.setdefault("users", {})
+
+    def register(self, user_id: int, lang: str):
+        entry = self.users.get(str(user_id)) or {}
+        if entry.get("lang") != lang or entry.get("blocked") is not False:
+            self.users[str(user_id)] = {**entry, "lang": lang, "blocked": False}
+            self._state.mark_dirty()
+
+    def mark_blocked(self, user_id: int):
+        entry = self.users.get(str(user_id))
+        if entry is not None and not entry.get("blocked"):
+            self.users[str(user_id)] = {**entry, "blocked": True}
+            self._state.mark_dirty()
+
+    def active_ids(self) -> List[int]:
+        return sorted(int(uid) for uid, u in self.users.items() if not u.get("blocked"))
+
+
+class AsyncRateLimiter:
+    """Token bucket asincron: în medie `rate` operații pe secundă, rafale de max `burst`."""
+
+    def __init__(self, rate: float, burst: int | None = None):
+        self.rate = max(rate, 0.001)
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class BotRateLimiter(BaseRateLimiter):
+    """Rate limiter PTB pentru un bot: bucket-ul propriu (limita Telegram per bot)
+    plus `shared`, comun tuturor boților din proces. La RetryAfter scurt așteaptă
+    și reîncearcă o dată."""
+
+    # long polling-ul și răspunsurile la query-uri nu consumă din limită
+    EXEMPT = {"getUpdates", "answerCallbackQuery", "answerInlineQuery", "answerPreCheckoutQuery"}
+    MAX_RETRY_AFTER = 30
+
+    def __init__(self, shared: AsyncRateLimiter, rate: float, metrics=None):
+        self.shared = shared
+        self.own = AsyncRateLimiter(rate)
+        self.metrics = metrics
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        if endpoint not in self.EXEMPT:
+            await self.own.acquire()
+            await self.shared.acquire()
+        if self.metrics:
+            self.metrics.api_calls += 1
+        try:
+            return await callback(*args, **kwargs)
+        except RetryAfter as e:
+            if self.metrics:
+                self.metrics.retry_after += 1
+            if e.retry_after > self.MAX_RETRY_AFTER:
+                raise
+            logger.warning("Bot API %s: retry after %ss", endpoint, e.retry_after)
+            await asyncio.sleep(e.retry_after)
+            return await callback(*args, **kwargs)
+
+
+# comun pentru toți tenanții: limita de ieșire a întregului proces
+outbound_limiter = AsyncRateLimiter(OUTBOUND_RATE)
+
+
+# ----------------- Sincronizare comenzi în fundal -----------------
+
+
+def _order_to_sync_record(order: Dict[str, Any]) -> Dict[str, Any]:
+    record = {}
+    for key, value in order.items():
+        record[key] = value.isoformat() if isinstance(value, datetime) else value
+    record["idempotency_key"] = f"order-{order['order_id']}"
+    return record
+
+
+class OrderSink:
+    """Destinație externă pentru loturi de comenzi.
+
+    `write_batch` poate fi reapelată cu același lot (retry), deci implementările
+    trebuie să fie idempotente pe `idempotency_key`.
+    """
+
+    name = "sink"
+
+    async def write_batch(self, records: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class FileOrderSink(OrderSink):
+    """Sink local JSONL – pentru teste și pentru rulare fără CRM."""
+
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._seen_keys = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self._seen_keys.add(json.loads(line)["idempotency_key"])
+                    except (ValueError, KeyError):
+                        continue
+
+    def _append(self, lines: List[str]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+
+    async def write_batch(self, records: List[Dict[str, Any]]) -> None:
+        fresh = [r for r in records if r["idempotency_key"] not in self._seen_keys]
+        if not fresh:
+            return
+        lines = [json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in fresh]
+        await asyncio.to_thread(self._append, lines)
+        self._seen_keys.update(r["idempotency_key"] for r in fresh)
+
+
+class WebhookOrderSink(OrderSink):
+    """Trimite loturile prin POST (ex. Google Apps Script care scrie în Sheets)."""
+
+    name = "webhook"
+
+    def __init__(self, url: str, timeout: float = 15.0):
+        self.url = url
+        self._client = httpx.AsyncClient(timeout=timeout)
+
+    async def write_batch(self, records: List[Dict[str, Any]]) -> None:
+        keys = ",".join(r["idempotency_key"] for r in records)
+        response = await self._client.post(
+            self.url,
+            json={"records": records},
+            headers={"Idempotency-Key": keys},
+        )
+        response.raise_for_status()
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class OrderSyncPipeline:
+    """Coadă asincronă care trimite comenzile în loturi (după mărime sau timp), cu retry.
+
+    Confirmarea comenzii doar pune înregistrarea în coadă, deci latența clientului
+    nu depinde de sistemul extern.
+    """
+
+    def __init__(
+        self,
+        sink: OrderSink,
+        batch_size: int = 20,
+        flush_seconds: float = 10.0,
+        max_retries: int = 5,
+    ):
+        self.sink = sink
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self.max_retries = max_retries
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+        self._inflight: List[Dict[str, Any]] = []
+        self._queued_keys: deque = deque()  # aceeași ordine ca în _queue
+        self._stopping = False
+        self.synced = 0
+        self.failed = 0
+
+    def submit(self, order: Dict[str, Any]):
+        record = _order_to_sync_record(order)
+        self._queued_keys.append(record["idempotency_key"])
+        self._queue.put_nowait(record)
+
+    async def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run(), name="order-sync")
+            logger.info("Order sync started (sink=%s)", self.sink.name)
+
+    async def stop(self):
+        """Oprește bucla și trimite tot ce a rămas în coadă."""
+        if self._task:
+            # wait_for înghite anularea dacă get() s-a terminat chiar atunci; bucla se
+            # oprește oricum după lotul curent
+            self._stopping = True
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._inflight:
+            # lotul întrerupt se retrimite; sink-ul ignoră cheile deja scrise
+            await self._write_with_retry(self._inflight)
+            self._inflight = []
+        while not self._queue.empty():
+            await self._write_with_retry(self._drain(self.batch_size))
+        await self.sink.close()
+
+    def pending_keys(self) -> List[str]:
+        return [r["idempotency_key"] for r in self._inflight] + list(self._queued_keys)
+
+    def _take(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        self._queued_keys.popleft()
+        return record
+
+    def _drain(self, limit: int) -> List[Dict[str, Any]]:
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._take(self._queue.get_nowait()))
+        return batch
+
+    async def _fill_inflight(self):
+        """Adună lotul direct în _inflight: dacă stop() anulează bucla în fereastra
+        de așteptare, înregistrările deja scoase din coadă nu se pierd."""
+        batch = self._inflight
+        batch.append(self._take(await self._queue.get()))
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            batch.extend(self._drain(self.batch_size - len(batch)))
+            remaining = deadline - loop.time()
+            if len(batch) >= self.batch_size or remaining <= 0:
+                break
+            try:
+                batch.append(self._take(await asyncio.wait_for(self._queue.get(), remaining)))
+            except asyncio.TimeoutError:
+                break
+            if self._stopping:
+                break
+
+    async def _write_with_retry(self, batch: List[Dict[str, Any]]):
+        delay = 1.0
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await self.sink.write_batch(batch)
+                self.synced += len(batch)
+                return
+            except Exception as e:
+                logger.warning(
+                    "Order sync attempt %s/%s failed (%s records): %r",
+                    attempt, self.max_retries, len(batch), e,
+                )
+                if attempt < self.max_retries:
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 60.0)
+        self.failed += len(batch)
+        logger.error(
+            "Order sync gave up on batch: %s",
+            [r["idempotency_key"] for r in batch],
+        )
+
+    async def _run(self):
+        while not self._stopping:
+            await self._fill_inflight()
+            await self._write_with_retry(self._inflight)
+            self._inflight = []
+
+
+def _build_order_sync(url: str | None, path: str | None) -> OrderSyncPipeline | None:
+    if url:
+        sink: OrderSink = WebhookOrderSink(url)
+    elif path:
+        sink = FileOrderSink(path)
+    else:
+        return None
+    return OrderSyncPipeline(
+        sink,
+        batch_size=ORDER_SYNC_BATCH_SIZE,
+        flush_seconds=ORDER_SYNC_FLUSH_SECONDS,
+        max_retries=ORDER_SYNC_MAX_RETRIES,
+    )
+
+
+# ----------------- Index căutare produse -----------------
+
+
+def _normalize_search_text(text: str) -> str:
+    """Lowercase fără diacritice (ș→s, ă→a, ё→е), ca să găsim și textul tastat fără ele."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def _search_tokens(text: str) -> List[str]:
+    return re.findall(r"\w+", _normalize_search_text(text))
+
+
+class ProductSearchIndex:
+    """Index inversat token/prefix → produse, construit o dată pe catalog.
+
+    O căutare = câteva lookup-uri în dict + intersecție de seturi mici.
+    """
+
+    MIN_PREFIX = 2
+
+    def __init__(self, products: List[Dict[str, Any]]):
+        self.products = products
+        self._index: Dict[str, set] = {}
+        for pos, p in enumerate(products):
+            text = " ".join(
+                str(p.get(field, ""))
+                for field in ("id", "name_ro", "name_ru", "description_ro", "description_ru")
+            )
+            for token in _search_tokens(text.replace("_", " ")):
+                for end in range(self.MIN_PREFIX, len(token) + 1):
+                    self._index.setdefault(token[:end], set()).add(pos)
+
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        # o literă singură nu e în index (prefixele încep de la MIN_PREFIX): o ignorăm
+        tokens = [t for t in _search_tokens(query) if len(t) >= self.MIN_PREFIX]
+        if not tokens:
+            return list(self.products)
+        matches = None
+        for token in sorted(tokens, key=len, reverse=True):
+            found = self._index.get(token, set())
+            matches = found if matches is None else matches & found
+            if not matches:
+                return []
+        return [self.products[pos] for pos in sorted(matches)]
+
+
+# ----------------- Poze produse (cache file_id) -----------------
+
+
+class PhotoCache:
+    """Cache persistent sha256(conținut poză) → file_id Telegram.
+
+    Poza se urcă o singură dată; după aceea trimitem doar file_id-ul.
+    Hash-ul se recalculează doar dacă fișierul s-a schimbat (mtime/mărime).
+    """
+
+    def __init__(self, state: PersistentState):
+        self._state = state
+        self.file_ids: Dict[str, str] = state.data.setdefault("file_ids", {})
+        self._digests: Dict[str, tuple] = {}
+
+    def digest(self, path: str) -> str | None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        cached = self._digests.get(path)
+        if cached and cached[0] == (st.st_mtime_ns, st.st_size):
+            return cached[1]
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        self._digests[path] = ((st.st_mtime_ns, st.st_size), digest)
+        return digest
+
+    def remember(self, digest: str, file_id: str):
+        if self.file_ids.get(digest) != file_id:
+            self.file_ids[digest] = file_id
+            self._state.mark_dirty()
+
+    def forget(self, digest: str):
+        if self.file_ids.pop(digest, None) is not None:
+            self._state.mark_dirty()
+
+
+def _product_image_path(product: Dict[str, Any]) -> str | None:
+    image = product.get("image")
+    return os.path.join(tenant().images_dir, image) if image else None
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def _build_photo_media(products: List[Dict[str, Any]], lang: str, use_cache: bool = True):
+    """Întoarce [(digest, InputMediaPhoto)] pentru produsele care au poză pe disc."""
+    t = tenant()
+    media = []
+    for p in products:
+        path = _product_image_path(p)
+        if not path:
+            continue
+        digest = await asyncio.to_thread(t.photo_cache.digest, path)
+        if not digest:
+            logger.debug("Missing product image: %s", path)
+            continue
+        name = p["name_ro"] if lang == LANG_RO else p["name_ru"]
+        file_id = t.photo_cache.file_ids.get(digest) if use_cache else None
+        photo = file_id or await asyncio.to_thread(_read_file, path)
+        media.append((digest, InputMediaPhoto(photo, caption=f"{name} — {p['price']} MDL")))
+    return media
+
+
+async def send_product_photos(bot, chat_id: int, products: List[Dict[str, Any]], lang: str):
+    """Trimite pozele ca albume (max 10 / album) și memorează file_id-urile noi."""
+    t = tenant()
+    media = await _build_photo_media(products, lang)
+    for start in range(0, len(media), 10):
+        chunk = media[start:start + 10]
+        try:
+            messages = await _send_photo_chunk(bot, chat_id, chunk)
+        except BadRequest as e:
+            # file_id invalidat (ex. alt bot token) – uităm cache-ul și urcăm din nou
+            logger.warning("Cached photo rejected, re-uploading: %r", e)
+            for digest, _ in chunk:
+                t.photo_cache.forget(digest)
+            fresh = await _build_photo_media(products, lang, use_cache=False)
+            chunk = [item for item in fresh if item[0] in {d for d, _ in chunk}]
+            messages = await _send_photo_chunk(bot, chat_id, chunk)
+        for (digest, _), message in zip(chunk, messages):
+            if message.photo:
+                t.photo_cache.remember(digest, message.photo[-1].file_id)
+
+
+async def _send_photo_chunk(bot, chat_id: int, chunk):
+    if len(chunk) == 1:
+        item = chunk[0][1]
+        return [await bot.send_photo(chat_id, item.media, caption=item.caption)]
+    return list(await bot.send_media_group(chat_id, [item for _, item in chunk]))
 
 
 # ----------------- Start & meniu -----------------
@@ -360,6 +3002,9 @@ async def set_language(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def back_to_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     lang = get_lang(context)
+    if update.effective_user:
+        # ieșire din orice conversație – inclusiv o comandă începută
+        tenant().order_reminders.cancel(str(update.effective_user.id))
     await send_text(
         update, context, tr(lang, "back_to_menu"), reply_markup=get_menu_keyboard(lang)
     )
@@ -375,38 +3020,656 @@ async def info_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await send_text(update, context, text, reply_markup=get_menu_keyboard(lang))
 
 
-async def show_catalog(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    lang = get_lang(context)
-    lines = []
-    keyboard_buttons = []
-    for p in PRODUCTS:
-        if lang == LANG_RO:
-            name = p["name_ro"]
-            desc = p["description_ro"]
-        else:
-            name = p["name_ru"]
-            desc = p["description_ru"]
-        lines.append(f"• {name} — {p['price']} MDL\n   {desc}")
-        keyboard_buttons.append(
-            [
+class CatalogPages:
+    """Paginile catalogului, precalculate pe (limbă, filtru).
+
+    O apăsare pe ◀️/▶️ sau pe un filtru = un lookup în dict + o editare de mesaj.
+    Callback-uri: `cat:<filtru>:<pagină>`, unde filtrul e `all`, `b-<bandă>` sau `c-<categorie>`.
+    """
+
+    def __init__(self, products: List[Dict[str, Any]], page_size: int):
+        self.page_size = max(1, page_size)
+        self.pages: Dict[tuple, List[tuple]] = {}
+        self.rebuild(products)
+
+    @staticmethod
+    def _band_label(low: int, high: int | None) -> str:
+        return f"{low}+ MDL" if high is None else f"{low}–{high} MDL"
+
+    def _filters(self, products: List[Dict[str, Any]]) -> List[tuple]:
+        """[(cheie filtru, etichetă RO/RU, produse)] – doar filtrele care au produse."""
+        result = [("all", None, products)]
+        for key, low, high in PRICE_BANDS:
+            items = [p for p in products if p["price"] >= low and (high is None or p["price"] < high)]
+            if items:
+                label = self._band_label(low, high)
+                result.append((f"b-{key}", {LANG_RO: label, LANG_RU: label}, items))
+        for key, labels in CATALOG_CATEGORIES.items():
+            items = [p for p in products if p.get("category") == key]
+            if items:
+                result.append((f"c-{key}", labels, items))
+        return result
+
+    def rebuild(self, products: List[Dict[str, Any]]):
+        filters_ = self._filters(products)
+        pages: Dict[tuple, List[tuple]] = {}
+        for lang in (LANG_RO, LANG_RU):
+            for key, _, items in filters_:
+                chunks = [
+                    items[i: i + self.page_size] for i in range(0, len(items), self.page_size)
+                ] or [[]]
+                pages[(lang, key)] = [
+                    self._render(lang, key, n, len(chunks), chunk, filters_)
+                    for n, chunk in enumerate(chunks)
+                ]
+        self.pages = pages
+
+    def _render(self, lang, filter_key, page_no, page_count, chunk, filters_) -> tuple:
+        lines = []
+        keyboard_buttons = []
+        for p in chunk:
+            if lang == LANG_RO:
+                name = p["name_ro"]
+                desc = p["description_ro"]
+            else:
+                name = p["name_ru"]
+                desc = p["description_ru"]
+            if not tenant().inventory.is_available(p["id"]):
+                lines.append(f"• {name} — {p['price']} MDL ({tr(lang, 'catalog_sold_out')})\n   {desc}")
+                continue
+            lines.append(f"• {name} — {p['price']} MDL\n   {desc}")
+            keyboard_buttons.append(
+                [
+                    InlineKeyboardButton(
+                        f"📦 {name} ({p['price']} MDL)",
+                        callback_data=f"order:{p['id']}",
+                    )
+                ]
+            )
+        if not lines:
+            lines.append(tr(lang, "catalog_empty"))
+        if page_count > 1:
+            lines.append(tr(lang, "catalog_page").format(page=page_no + 1, pages=page_count))
+
+        nav = []
+        if page_no > 0:
+            nav.append(InlineKeyboardButton("◀️", callback_data=f"cat:{filter_key}:{page_no - 1}"))
+        if any(os.path.exists(_product_image_path(p) or "") for p in chunk):
+            nav.append(
                 InlineKeyboardButton(
-                    f"📦 {name} ({p['price']} MDL)",
-                    callback_data=f"order:{p['id']}",
+                    tr(lang, "catalog_photos_btn"), callback_data=f"catphoto:{filter_key}:{page_no}"
                 )
-            ]
-        )
-    text = "\n\n".join(lines)
-    keyboard = InlineKeyboardMarkup(keyboard_buttons)
-    await send_text(update, context, text, reply_markup=keyboard)
-
+            )
+        if page_no < page_count - 1:
+            nav.append(InlineKeyboardButton("▶️", callback_data=f"cat:{filter_key}:{page_no + 1}"))
+        if nav:
+            keyboard_buttons.append(nav)
+
+        filter_buttons = []
+        for key, labels, _ in filters_:
+            label = tr(lang, "catalog_all") if labels is None else labels[lang]
+            if key == filter_key:
+                label = f"• {label}"
+            filter_buttons.append(InlineKeyboardButton(label, callback_data=f"cat:{key}:0"))
+        if len(filter_buttons) > 1:
+            for i in range(0, len(filter_buttons), 3):
+                keyboard_buttons.append(filter_buttons[i: i + 3])
+
+        return "\n\n".join(lines), InlineKeyboardMarkup(keyboard_buttons), chunk
+
+    def get(self, lang: str, filter_key: str, page_no: int) -> tuple:
+        pages = self.pages.get((lang, filter_key)) or self.pages[(lang, "all")]
+        return pages[min(max(page_no, 0), len(pages) - 1)]
+
+
+def _parse_catalog_callback(data: str) -> tuple:
+    _, filter_key, page_str = data.split(":", maxsplit=2)
+    try:
+        return filter_key, int(page_str)
+    except ValueError:
+        return filter_key, 0
 
-async def show_catalog_from_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    query = update.callback_query
-    await query.answer()
-    await show_catalog(update, context)
 
+def _catalog_page(lang: str, filter_key: str, page_no: int):
+    """Pagina precalculată, după ce stocul vândut de alți worker-i a ajuns în pagini."""
+    t = tenant()
+    t.inventory.refresh()
+    return t.catalog_pages.get(lang, filter_key, page_no)
 
-# ----------------- Consultant AI cadouri -----------------
+
+async def show_catalog(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    lang = get_lang(context)
+    text, keyboard, products = _catalog_page(lang, "all", 0)
+    chat = update.effective_chat
+    if chat:
+        try:
+            await send_product_photos(context.bot, chat.id, products, lang)
+        except Exception as e:
+            logger.exception("Failed to send catalog photos: %s", e)
+    await send_text(update, context, text, reply_markup=keyboard)
+
+
+async def catalog_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Navigare / filtrare: editează mesajul existent în loc să trimită unul nou."""
+    query = update.callback_query
+    await query.answer()
+    filter_key, page_no = _parse_catalog_callback(query.data)
+    text, keyboard, _ = _catalog_page(get_lang(context), filter_key, page_no)
+    try:
+        await query.edit_message_text(text, reply_markup=keyboard)
+    except BadRequest as e:
+        # apăsare dublă pe același buton – mesajul e deja identic
+        if "not modified" not in str(e):
+            raise
+
+
+async def catalog_photos_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    lang = get_lang(context)
+    filter_key, page_no = _parse_catalog_callback(query.data)
+    _, _, products = _catalog_page(lang, filter_key, page_no)
+    await send_product_photos(context.bot, update.effective_chat.id, products, lang)
+
+
+async def show_catalog_from_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    await show_catalog(update, context)
+
+
+# ----------------- Căutare inline -----------------
+
+
+async def inline_product_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """@bot <text>: caută în catalog și întoarce boxe de trimis în orice chat.
+
+    Limba se deduce din textul căutat (chirilic → RU), așa că rezultatul depinde
+    doar de query și Telegram îl poate cache-ui global (`cache_time`).
+    """
+    query = update.inline_query
+    lang = LANG_RU if re.search("[а-яё]", query.query.lower()) else LANG_RO
+    try:
+        offset = max(0, int(query.offset or 0))
+    except ValueError:
+        offset = 0
+    found = tenant().product_index.search(query.query)
+    page = found[offset: offset + INLINE_PAGE_SIZE]
+    next_offset = str(offset + INLINE_PAGE_SIZE) if offset + INLINE_PAGE_SIZE < len(found) else ""
+
+    results = []
+    for p in page:
+        name = p["name_ro"] if lang == LANG_RO else p["name_ru"]
+        desc = p["description_ro"] if lang == LANG_RO else p["description_ru"]
+        keyboard = InlineKeyboardMarkup(
+            [
+                [
+                    InlineKeyboardButton(
+                        tr(lang, "inline_order_btn"),
+                        url=f"https://t.me/{context.bot.username}?start=order-{p['id']}",
+                    )
+                ]
+            ]
+        )
+        results.append(
+            InlineQueryResultArticle(
+                id=p["id"],
+                title=f"{name} — {p['price']} MDL",
+                description=desc,
+                input_message_content=InputTextMessageContent(
+                    f"🎁 {name} — {p['price']} MDL\n{desc}"
+                ),
+                reply_markup=keyboard,
+            )
+        )
+    await query.answer(
+        results,
+        cache_time=INLINE_CACHE_TIME,
+        is_personal=False,
+        next_offset=next_offset,
+    )
+
+
+# ----------------- Router Groq (mai multe chei / modele) -----------------
+
+
+class GroqSaturated(Exception):
+    """Toate cheile sunt ocupate / limitate și coada de așteptare e plină sau a expirat."""
+
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def _parse_duration(value: str | None) -> float:
+    """Formatul Groq din x-ratelimit-reset-*: „2m59.56s”, „7.66s”, „120ms”."""
+    if not value:
+        return 0.0
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(n) * scale[unit] for n, unit in _DURATION_RE.findall(value))
+
+
+class GroqLane:
+    """O pereche (cheie, model): latență EWMA, limite din headere, cereri în zbor."""
+
+    def __init__(self, key_index: int, client, model: str):
+        self.key_index = key_index
+        self.client = client
+        self.model = model
+        self.ewma_latency: float | None = None
+        self.inflight = 0
+        self.remaining_requests: int | None = None
+        self.remaining_tokens: int | None = None
+        self.blocked_until = 0.0
+        self.errors = 0
+
+    def observe_latency(self, seconds: float, alpha: float = 0.3):
+        if self.ewma_latency is None:
+            self.ewma_latency = seconds
+        else:
+            self.ewma_latency = alpha * seconds + (1 - alpha) * self.ewma_latency
+
+    def observe_headers(self, headers, wanted_tokens: int):
+        def header_int(name):
+            try:
+                return int(headers.get(name))
+            except (TypeError, ValueError):
+                return None
+
+        self.remaining_requests = header_int("x-ratelimit-remaining-requests")
+        self.remaining_tokens = header_int("x-ratelimit-remaining-tokens")
+        now = time.monotonic()
+        if self.remaining_requests == 0:
+            reset = _parse_duration(headers.get("x-ratelimit-reset-requests"))
+            self.blocked_until = max(self.blocked_until, now + reset)
+        if self.remaining_tokens is not None and self.remaining_tokens < wanted_tokens:
+            reset = _parse_duration(headers.get("x-ratelimit-reset-tokens"))
+            self.blocked_until = max(self.blocked_until, now + reset)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "key": self.key_index,
+            "model": self.model,
+            "ewma_ms": round(self.ewma_latency * 1000) if self.ewma_latency is not None else None,
+            "inflight": self.inflight,
+            "remaining_requests": self.remaining_requests,
+            "remaining_tokens": self.remaining_tokens,
+            "blocked_for_s": round(max(0.0, self.blocked_until - time.monotonic()), 1),
+            "errors": self.errors,
+        }
+
+
+class GroqRouter:
+    """Trimite fiecare cerere pe cea mai sănătoasă pereche (cheie, model).
+
+    Scor = latența EWMA × (cereri în zbor + 1) + penalizare după preferința
+    modelului; perechile limitate (headere x-ratelimit-*, 429) sunt sărite până la
+    reset. Când toate sunt ocupate, cererea așteaptă (max `queue_max` în coadă,
+    max `queue_timeout` secunde), apoi GroqSaturated – imediat, dacă nicio pereche
+    neîncercată nu se poate elibera până atunci. Erorile 429 / de rețea / 5xx
+    se reîncearcă pe altă pereche.
+    """
+
+    MODEL_PREFERENCE_PENALTY = 0.5  # secunde per poziție în lista de modele
+    UNKNOWN_LATENCY = 1.0
+
+    def __init__(self, clients: List[Any], max_inflight: int, queue_max: int, queue_timeout: float):
+        self.clients = clients
+        self.max_inflight = max(1, max_inflight)
+        self.queue_max = queue_max
+        self.queue_timeout = queue_timeout
+        self.lanes: Dict[tuple, GroqLane] = {}
+        self.waiting = 0
+        self.rejected = 0
+        self._cond = asyncio.Condition()
+
+    def _candidates(self, models: List[str]) -> List[tuple]:
+        result = []
+        for preference, model in enumerate(models):
+            for key_index, client in enumerate(self.clients):
+                lane = self.lanes.get((key_index, model))
+                if lane is None:
+                    lane = self.lanes[(key_index, model)] = GroqLane(key_index, client, model)
+                result.append((preference, lane))
+        return result
+
+    def _pick(self, models: List[str], exclude: set) -> GroqLane | None:
+        now = time.monotonic()
+        best, best_score = None, None
+        for preference, lane in self._candidates(models):
+            if lane in exclude or lane.blocked_until > now or lane.inflight >= self.max_inflight:
+                continue
+            latency = lane.ewma_latency if lane.ewma_latency is not None else self.UNKNOWN_LATENCY
+            score = latency * (lane.inflight + 1) + preference * self.MODEL_PREFERENCE_PENALTY
+            if best_score is None or score < best_score:
+                best, best_score = lane, score
+        return best
+
+    def _reachable(self, models: List[str], exclude: set, deadline: float) -> bool:
+        """Există o pereche neîncercată care nu e blocată dincolo de `deadline`?"""
+        return any(
+            lane not in exclude and lane.blocked_until < deadline for _, lane in self._candidates(models)
+        )
+
+    async def _acquire(self, models: List[str], exclude: set) -> GroqLane:
+        async with self._cond:
+            lane = self._pick(models, exclude)
+            if lane is None:
+                deadline = time.monotonic() + self.queue_timeout
+                if not self._reachable(models, exclude, deadline):
+                    # n-are rost să așteptăm: toate perechile rămase sunt încercate sau blocate
+                    self.rejected += 1
+                    raise GroqSaturated("no untried lane")
+                if self.waiting >= self.queue_max:
+                    self.rejected += 1
+                    raise GroqSaturated("queue full")
+                self.waiting += 1
+                try:
+                    while lane is None:
+                        now = time.monotonic()
+                        if now >= deadline or not self._reachable(models, exclude, deadline):
+                            self.rejected += 1
+                            raise GroqSaturated("queue timeout")
+                        # ne trezim la eliberarea unei perechi sau la primul reset de limită
+                        unblocks = [
+                            l.blocked_until for _, l in self._candidates(models) if l.blocked_until > now
+                        ]
+                        try:
+                            await asyncio.wait_for(self._cond.wait(), min(unblocks + [deadline]) - now)
+                        except asyncio.TimeoutError:
+                            pass
+                        lane = self._pick(models, exclude)
+                finally:
+                    self.waiting -= 1
+            lane.inflight += 1
+            return lane
+
+    async def _release(self, lane: GroqLane):
+        async with self._cond:
+            lane.inflight -= 1
+            self._cond.notify_all()
+
+    @staticmethod
+    def _call(lane: GroqLane, kwargs: Dict[str, Any]):
+        raw = lane.client.chat.completions.with_raw_response.create(model=lane.model, **kwargs)
+        return raw.headers, raw.parse()
+
+    async def complete(self, models: List[str], **kwargs):
+        """Echivalentul `chat.completions.create(**kwargs)`, cu modelul ales de router."""
+        tried: set = set()
+        attempts = min(3, len(self.clients) * len(models))
+        if not attempts:
+            raise GroqSaturated("no Groq keys or models configured")
+        wanted_tokens = kwargs.get("max_tokens") or 0
+        for attempt in range(attempts):
+            lane = await self._acquire(models, tried)
+            started = time.monotonic()
+            try:
+                headers, completion = await asyncio.to_thread(self._call, lane, kwargs)
+            except groq.RateLimitError as e:
+                retry_after = _parse_duration(e.response.headers.get("retry-after")) or 5.0
+                lane.blocked_until = time.monotonic() + retry_after
+                lane.errors += 1
+                error = e
+            except (groq.APIConnectionError, groq.InternalServerError) as e:
+                lane.observe_latency(time.monotonic() - started)
+                lane.blocked_until = time.monotonic() + 5.0
+                lane.errors += 1
+                error = e
+            except groq.NotFoundError as e:
+                # model retras sau indisponibil pentru cheie
+                lane.blocked_until = time.monotonic() + 600.0
+                lane.errors += 1
+                error = e
+            else:
+                lane.observe_latency(time.monotonic() - started)
+                lane.observe_headers(headers, wanted_tokens)
+                return completion
+            finally:
+                await self._release(lane)
+            tried.add(lane)
+            logger.warning(
+                "Groq key #%s / %s failed (attempt %s/%s): %r",
+                lane.key_index, lane.model, attempt + 1, attempts, error,
+            )
+        raise error
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "lanes": [lane.snapshot() for lane in self.lanes.values()],
+        }
+
+
+# un client (și pool de conexiuni) per cheie, comun tuturor tenanților;
+# reîncercările le face routerul, pe altă cheie
+groq_router = GroqRouter(
+    [Groq(api_key=key, max_retries=0, base_url=GROQ_BASE_URL) for key in GROQ_API_KEYS],
+    GROQ_MAX_INFLIGHT,
+    GROQ_QUEUE_MAX,
+    GROQ_QUEUE_TIMEOUT,
+)
+
+
+def check_groq_config():
+    """La pornire: fără chei sau cu o listă de modele goală, fiecare apel AI ar eșua."""
+    if not GROQ_API_KEYS:
+        raise RuntimeError("GROQ_API_KEY / GROQ_API_KEYS is missing")
+    for name, models in (
+        ("GROQ_CONSULT_MODELS", GROQ_CONSULT_MODELS),
+        ("GROQ_CARD_MODELS", GROQ_CARD_MODELS),
+        ("GROQ_LEAN_MODELS", GROQ_LEAN_MODELS),
+    ):
+        if not models:
+            raise RuntimeError(f"{name} is empty")
+
+
+# ----------------- Cost AI (tokeni, buget zilnic) -----------------
+
+AI_MODE_NORMAL = "normal"
+AI_MODE_LEAN = "lean"  # prompt scurt + model mic
+AI_MODE_CACHED = "cached"  # fără apeluri noi: cache sau recomandare din catalog
+
+
+def _ai_call_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    # model fără preț cunoscut: îl socotim la cel mai scump, ca bugetul să nu fie depășit pe ascuns
+    price_in, price_out = GROQ_PRICES.get(model) or max(GROQ_PRICES.values(), default=[0, 0])
+    return (prompt_tokens * price_in + completion_tokens * price_out) / 1_000_000
+
+
+def _empty_ai_counter() -> Dict[str, Any]:
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0, "latency": 0.0}
+
+
+def _add_ai_call(counter: Dict[str, Any], prompt_tokens: int, completion_tokens: int, cost: float, latency: float):
+    counter["calls"] += 1
+    counter["prompt_tokens"] += prompt_tokens
+    counter["completion_tokens"] += completion_tokens
+    counter["cost"] += cost
+    counter["latency"] += latency
+
+
+class AiUsage:
+    """Tokeni, cost și latență pentru fiecare apel Groq, pe zi / flow / model / user.
+
+    Ca ReportAggregates: bucket-e zilnice actualizate incremental. Detaliul per
+    user se păstrează `user_days` zile, totalurile `retention_days`.
+    """
+
+    def __init__(
+        self,
+        state: PersistentState,
+        tz: str,
+        retention_days: int,
+        user_days: int,
+        daily_budget: float,
+        degrade_at: float,
+    ):
+        self._state = state
+        self.tz = ZoneInfo(tz)
+        self.retention_days = retention_days
+        self.user_days = user_days
+        self.daily_budget = daily_budget
+        self.degrade_at = degrade_at
+        self.days: Dict[str, Dict[str, Any]] = state.data.setdefault("days", {})
+
+    def today(self) -> date:
+        return datetime.now(self.tz).date()
+
+    @staticmethod
+    def _new_bucket() -> Dict[str, Any]:
+        return {**_empty_ai_counter(), "flows": {}, "models": {}, "users": {}, "degraded": {}}
+
+    def _update_bucket(self, day: date, fn):
+        key = day.isoformat()
+        if key not in self.days:
+            self._purge(day)
+        update_entry(self.days, key, self._new_bucket, fn)
+        self._state.mark_dirty()
+
+    def _purge(self, today: date):
+        cutoff = (today - timedelta(days=self.retention_days)).isoformat()
+        users_cutoff = (today - timedelta(days=self.user_days)).isoformat()
+        for key in list(self.days):
+            if key < cutoff:
+                del self.days[key]
+            elif key < users_cutoff:
+                update_entry(self.days, key, self._new_bucket, lambda bucket: bucket.update(users={}))
+
+    def record(
+        self,
+        flow: str,
+        user_id: int | None,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        latency: float,
+    ) -> float:
+        cost = _ai_call_cost(model, prompt_tokens, completion_tokens)
+
+        def add(bucket):
+            counters = [
+                bucket,
+                bucket["flows"].setdefault(flow, _empty_ai_counter()),
+                bucket["models"].setdefault(model, _empty_ai_counter()),
+            ]
+            if user_id is not None:
+                counters.append(bucket["users"].setdefault(str(user_id), _empty_ai_counter()))
+            for counter in counters:
+                _add_ai_call(counter, prompt_tokens, completion_tokens, cost, latency)
+
+        self._update_bucket(self.today(), add)
+        return cost
+
+    def record_degraded(self, flow: str, how: str):
+        key = f"{flow}:{how}"
+
+        def add(bucket):
+            bucket["degraded"][key] = bucket["degraded"].get(key, 0) + 1
+
+        self._update_bucket(self.today(), add)
+
+    def spent_today(self) -> float:
+        bucket = self.days.get(self.today().isoformat())
+        return bucket["cost"] if bucket else 0.0
+
+    def mode(self) -> str:
+        if self.daily_budget <= 0:
+            return AI_MODE_NORMAL
+        spent = self.spent_today()
+        if spent >= self.daily_budget:
+            return AI_MODE_CACHED
+        if spent >= self.daily_budget * self.degrade_at:
+            return AI_MODE_LEAN
+        return AI_MODE_NORMAL
+
+
+class AiAnswerCache:
+    """Ultimele răspunsuri AI per profil (flow, limbă, hash-ul tuturor datelor din prompt), LRU persistent."""
+
+    def __init__(self, state: PersistentState, max_size: int):
+        self._state = state
+        self.max_size = max_size
+        self.answers: Dict[str, str] = state.data.setdefault("answers", {})
+
+    def get(self, key: str) -> str | None:
+        answer = self.answers.pop(key, None)
+        if answer is not None:
+            self.answers[key] = answer  # mutat la coada LRU
+            self._state.mark_dirty()
+        return answer
+
+    def put(self, key: str, answer: str):
+        self.answers.pop(key, None)
+        self.answers[key] = answer
+        while len(self.answers) > self.max_size:
+            del self.answers[next(iter(self.answers))]
+        self._state.mark_dirty()
+
+
+def _budget_band(budget_text: str | None) -> str:
+    """Banda de preț (PRICE_BANDS) pentru primul număr din răspunsul la „buget”."""
+    match = re.search(r"\d+", (budget_text or "").replace(" ", ""))
+    if not match:
+        return "any"
+    amount = int(match.group())
+    for key, low, high in PRICE_BANDS:
+        if amount >= low and (high is None or amount < high):
+            return key
+    return "any"
+
+
+# câmpurile care intră în prompt, pe flow: cheia de cache le acoperă pe toate, ca un
+# răspuns să nu ajungă la alt profil (aceeași ocazie, dar alte preferințe sau altă vârstă)
+_AI_PROMPT_FIELDS = {
+    "consult": ("who", "occasion", "age", "relation", "budget", "interests"),
+    "card": ("who", "occasion", "relation", "interests"),
+}
+
+
+def _ai_profile_key(flow: str, lang: str, data: Dict[str, Any]) -> str:
+    inputs = "\x1f".join(
+        " ".join(_search_tokens(str(data.get(field) or ""))) for field in _AI_PROMPT_FIELDS[flow]
+    )
+    return f"{flow}|{lang}|{hashlib.sha256(inputs.encode()).hexdigest()[:20]}"
+
+
+def _fallback_recommendation(lang: str, budget_text: str | None) -> str:
+    """Fără AI: cele mai scumpe 2 boxe disponibile în buget (altfel cele mai ieftine)."""
+    t = tenant()
+    available = [p for p in t.products if t.inventory.is_available(p["id"])] or list(t.products)
+    match = re.search(r"\d+", (budget_text or "").replace(" ", ""))
+    within = [p for p in available if match and p["price"] <= int(match.group())]
+    if within:
+        picks = sorted(within, key=lambda p: p["price"], reverse=True)[:2]
+    else:
+        picks = sorted(available, key=lambda p: p["price"])[:2]
+    name_key = "name_ro" if lang == LANG_RO else "name_ru"
+    lines = [f"• {p[name_key]} (ID: {p['id']}) — {p['price']} MDL" for p in picks]
+    return tr(lang, "ai_fallback") + "\n" + "\n".join(lines)
+
+
+async def ai_complete(flow: str, user_id: int | None, models: List[str], **kwargs) -> str:
+    """Un apel Groq prin router, contabilizat pe tenantul curent (latența include coada)."""
+    started = time.monotonic()
+    completion = await groq_router.complete(models, **kwargs)
+    usage = getattr(completion, "usage", None)
+    tenant().ai_usage.record(
+        flow,
+        user_id,
+        completion.model,
+        getattr(usage, "prompt_tokens", 0) or 0,
+        getattr(usage, "completion_tokens", 0) or 0,
+        time.monotonic() - started,
+    )
+    return completion.choices[0].message.content.strip()
+
+
+# ----------------- Consultant AI cadouri -----------------
 
 
 async def gift_ai_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -451,24 +3714,24 @@ async def gift_ai_budget(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return GIFT_INTERESTS
 
 
-async def gift_ai_interests(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    lang = get_lang(context)
-    context.user_data["gift_ai"]["interests"] = update.message.text.strip()
-    await send_text(update, context, tr(lang, "ai_thinking"))
-
-    data = context.user_data["gift_ai"]
-
+def _consult_messages(lang: str, data: Dict[str, Any], lean: bool = False) -> List[Dict[str, str]]:
+    """Promptul consultantului; `lean` (aproape de buget): fără descrieri și fără boxele epuizate."""
+    t = tenant()
     products_text_parts = []
-    for p in PRODUCTS:
+    for p in t.products:
         if lang == LANG_RO:
             name = p["name_ro"]
             desc = p["description_ro"]
         else:
             name = p["name_ru"]
             desc = p["description_ru"]
-        products_text_parts.append(
-            f"- ID: {p['id']}, nume: {name}, pret: {p['price']} MDL, descriere: {desc}"
-        )
+        if lean:
+            if t.inventory.is_available(p["id"]):
+                products_text_parts.append(f"- {p['id']}: {name}, {p['price']} MDL")
+        else:
+            products_text_parts.append(
+                f"- ID: {p['id']}, nume: {name}, pret: {p['price']} MDL, descriere: {desc}"
+            )
     products_text = "\n".join(products_text_parts)
 
     if lang == LANG_RO:
@@ -497,30 +3760,64 @@ async def gift_ai_interests(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"Lista boxe disponibile:\n{products_text}\n\n"
         "Răspunde în limba utilizatorului, fă o recomandare clară și menționează ID-ul sau numele boxei."
     )
+    if lean:
+        user_prompt += " Maxim 3 propoziții."
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
 
-    try:
-        response = await asyncio.to_thread(
-            groq_client.chat.completions.create,
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.7,
-            max_tokens=700,
-        )
-        ai_text = response.choices[0].message.content.strip()
-    except Exception as e:
-        logger.exception("Groq error: %s", e)
-        if ADMIN_CHAT_ID:
-            try:
-                await context.bot.send_message(
-                    ADMIN_CHAT_ID, f"[AI ERROR] {e!r}"
-                )
-            except Exception:
-                pass
-        await send_text(update, context, tr(lang, "ai_error"))
-        return ConversationHandler.END
+
+async def gift_ai_interests(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    t = tenant()
+    lang = get_lang(context)
+    if await throttled(update, context, "ai"):
+        # răspunsurile de până acum rămân; poate retrimite interesele mai târziu
+        return GIFT_INTERESTS
+    context.user_data["gift_ai"]["interests"] = update.message.text.strip()
+    await send_text(update, context, tr(lang, "ai_thinking"))
+
+    data = context.user_data["gift_ai"]
+    user_id = update.effective_user.id if update.effective_user else None
+    cache_key = _ai_profile_key("consult", lang, data)
+    mode = t.ai_usage.mode()
+    precomputed = t.ai_precomputed.lookup(lang, data)
+
+    if precomputed is not None:
+        # profil frecvent: răspuns din tabelul precalculat, fără apel Groq
+        ai_text = precomputed
+    elif mode == AI_MODE_CACHED:
+        # buget zilnic atins: răspuns pentru același profil sau recomandare din catalog
+        ai_text = t.ai_answers.get(cache_key)
+        t.ai_usage.record_degraded("consult", "cache" if ai_text else "fallback")
+        if ai_text is None:
+            ai_text = _fallback_recommendation(lang, data.get("budget"))
+    else:
+        lean = mode == AI_MODE_LEAN
+        try:
+            ai_text = await ai_complete(
+                "consult",
+                user_id,
+                GROQ_LEAN_MODELS if lean else GROQ_CONSULT_MODELS,
+                messages=_consult_messages(lang, data, lean),
+                temperature=0.7,
+                max_tokens=AI_CONSULT_MAX_TOKENS // 2 if lean else AI_CONSULT_MAX_TOKENS,
+            )
+        except GroqSaturated as e:
+            logger.warning("Groq saturated: %s", e)
+            await send_text(update, context, tr(lang, "ai_busy"))
+            return ConversationHandler.END
+        except Exception as e:
+            logger.exception("Groq error: %s", e)
+            t.admin_notifier.notify(context.bot, t.admin_chat_id, f"[AI ERROR] {e!r}")
+            await send_text(update, context, tr(lang, "ai_error"))
+            return ConversationHandler.END
+        t.ai_answers.put(cache_key, ai_text)
+        if lean:
+            t.ai_usage.record_degraded("consult", "lean")
+
+    t.report_aggregates.record_ai_consultation()
+    context.user_data["ai_consulted"] = True
 
     final_text = f"{tr(lang, 'ai_done')}\n\n{ai_text}"
     keyboard = InlineKeyboardMarkup(
@@ -542,7 +3839,10 @@ async def gift_ai_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def ai_message_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    t = tenant()
     query = update.callback_query
+    if await throttled(update, context, "card"):
+        return
     await query.answer()
     lang = get_lang(context)
     data = context.user_data.get("gift_ai", {})
@@ -553,6 +3853,18 @@ async def ai_message_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
         )
         return
 
+    user_id = update.effective_user.id if update.effective_user else None
+    cache_key = _ai_profile_key("card", lang, data)
+    mode = t.ai_usage.mode()
+    if mode == AI_MODE_CACHED:
+        msg = t.ai_answers.get(cache_key)
+        t.ai_usage.record_degraded("card", "cache" if msg else "fallback")
+        await query.edit_message_text(
+            f"{tr(lang, 'ai_message_intro')}\n\n{msg or tr(lang, 'ai_card_fallback')}"
+        )
+        return
+    lean = mode == AI_MODE_LEAN
+
     if lang == LANG_RO:
         system_prompt = (
             "Ești un copywriter pentru mesaje de felicitare. Generă 2-3 mesaje scurte, calde, "
@@ -572,39 +3884,363 @@ async def ai_message_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
         "Te rugăm să scrii mesajele în limba utilizatorului."
     )
     try:
-        response = await asyncio.to_thread(
-            groq_client.chat.completions.create,
-            model="llama-3.1-70b-versatile",
+        msg = await ai_complete(
+            "card",
+            user_id,
+            GROQ_LEAN_MODELS if lean else GROQ_CARD_MODELS,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt},
             ],
             temperature=0.8,
-            max_tokens=400,
+            max_tokens=AI_CARD_MAX_TOKENS // 2 if lean else AI_CARD_MAX_TOKENS,
         )
-        msg = response.choices[0].message.content.strip()
+    except GroqSaturated as e:
+        logger.warning("Groq saturated (msg): %s", e)
+        await query.edit_message_text(tr(lang, "ai_busy"))
+        return
     except Exception as e:
         logger.exception("Groq error (msg): %s", e)
-        if ADMIN_CHAT_ID:
-            try:
-                await context.bot.send_message(
-                    ADMIN_CHAT_ID, f"[AI MSG ERROR] {e!r}"
-                )
-            except Exception:
-                pass
+        t.admin_notifier.notify(context.bot, t.admin_chat_id, f"[AI MSG ERROR] {e!r}")
         await query.edit_message_text(tr(lang, "ai_error"))
         return
+    t.ai_answers.put(cache_key, msg)
+    if lean:
+        t.ai_usage.record_degraded("card", "lean")
 
     text = f"{tr(lang, 'ai_message_intro')}\n\n{msg}"
     await query.edit_message_text(text)
 
 
+# ----------------- Recomandări precalculate (profiluri frecvente) -----------------
+
+# cheie: (etichetă RO, etichetă RU, [relația implicită,] rădăcini recunoscute – fără diacritice)
+AI_PROFILE_WHO = {
+    "partner": ("iubit / iubită", "любимый человек", "romantic",
+                ["iubit", "sot", "partener", "любим", "девушк", "парен", "муж", "жен"]),
+    "mother": ("mamă", "мама", "family", ["mam", "мам"]),
+    "father": ("tată", "папа", "family", ["tat", "пап", "отец", "отц"]),
+    "child": ("copil", "ребёнок", "family", ["copil", "fiu", "fiic", "baiat", "fetit", "ребен", "сын", "доч"]),
+    "friend": ("prieten / prietenă", "друг / подруга", "friend", ["prieten", "amic", "друг", "подруг"]),
+    "colleague": ("coleg / colegă", "коллега", "work", ["coleg", "sef", "коллег", "начальн", "босс"]),
+}
+# clasele specifice întâi, ziua de naștere la urmă; „ziua” singur nu spune nimic
+# („Ziua Îndrăgostiților”, „ziua femeii”), iar cifrele se potrivesc doar ca token întreg
+AI_PROFILE_OCCASIONS = {
+    "valentine": ("14 februarie", "14 февраля", ["14", "valentin", "dragobet", "indragost", "валентин", "влюблен"]),
+    "womens_day": ("8 martie", "8 марта", ["8", "martie", "femei", "марта", "женск"]),
+    "new_year": ("Anul Nou / Crăciun", "Новый год / Рождество", ["anul", "craciun", "новы", "рождеств"]),
+    "thanks": ("mulțumire", "благодарность", ["multumir", "recunost", "спасиб", "благодар"]),
+    "corporate": ("cadou corporate", "корпоративный подарок", ["corporat", "firma", "корпорат"]),
+    "birthday": ("zi de naștere", "день рождения", ["nastere", "aniversar", "рожден", "днюх", "юбиле"]),
+}
+AI_PROFILE_RELATIONS = {
+    "romantic": ("partener(ă)", "вторая половинка", ["iubit", "sot", "partener", "любим", "девушк", "парен", "муж", "жен"]),
+    "family": ("rudă", "родственник", ["mam", "tat", "frat", "sor", "bunic", "fiu", "fiic", "rud", "copil", "parint",
+                                       "мам", "пап", "брат", "сестр", "бабуш", "дедуш", "сын", "доч", "родств", "ребен"]),
+    "friend": ("prieten(ă)", "друг", ["prieten", "amic", "друг", "подруг", "приятел"]),
+    "work": ("coleg / partener de afaceri", "коллега / партнёр", ["coleg", "sef", "client", "afacer",
+                                                                  "коллег", "начальн", "босс", "клиент"]),
+}
+
+
+def _stem_matches(token: str, stem: str) -> bool:
+    return token == stem if stem.isdigit() else token.startswith(stem)
+
+
+def _match_profile(text: str | None, options: Dict[str, tuple]) -> str | None:
+    """Singura clasă potrivită; niciuna sau mai multe → None, și răspunde Groq în direct."""
+    tokens = _search_tokens(text or "")
+    matched = [
+        key
+        for key, option in options.items()
+        if any(_stem_matches(token, stem) for token in tokens for stem in option[-1])
+    ]
+    return matched[0] if len(matched) == 1 else None
+
+
+def _band_label(band: str, lang: str) -> str:
+    for key, low, high in PRICE_BANDS:
+        if key == band:
+            if high is None:
+                return f"peste {low} MDL" if lang == LANG_RO else f"от {low} MDL"
+            if not low:
+                return f"până la {high} MDL" if lang == LANG_RO else f"до {high} MDL"
+            return f"{low}–{high} MDL"
+    return "—"
+
+
+def catalog_version(products: List[Dict[str, Any]]) -> str:
+    """Amprenta câmpurilor care intră în prompt; stocul nu schimbă versiunea."""
+    fields = [
+        [p["id"], p.get("name_ro"), p.get("name_ru"), p.get("price"), p.get("description_ro"), p.get("description_ru")]
+        for p in products
+    ]
+    return hashlib.sha1(json.dumps(fields, ensure_ascii=False).encode()).hexdigest()[:12]
+
+
+class AiPrecomputed:
+    """Tabel compact: „ro|partner|birthday|romantic|low” → [recomandare, ID-uri boxe numite].
+
+    Legat de versiunea catalogului: la altă versiune se golește și se completează
+    în fundal (ai_precompute_loop). Un răspuns care numește o boxă epuizată nu se
+    folosește; consultația merge atunci la Groq ca de obicei.
+    """
+
+    def __init__(self, state: PersistentState, products: List[Dict[str, Any]], inventory: "Inventory"):
+        self._state = state
+        self.products = products
+        self.inventory = inventory
+        self.version = catalog_version(products)
+        self.entries: Dict[str, list] = state.data.setdefault("entries", {})
+        if state.data.get("version") != self.version:
+            self.entries.clear()
+            state.data["version"] = self.version
+            state.mark_dirty()
+        self.hits = 0
+        self.misses = 0
+        self.unmatched = 0
+
+    @staticmethod
+    def profile_key(lang: str, data: Dict[str, Any]) -> str | None:
+        who = _match_profile(data.get("who"), AI_PROFILE_WHO)
+        occasion = _match_profile(data.get("occasion"), AI_PROFILE_OCCASIONS)
+        relation = _match_profile(data.get("relation"), AI_PROFILE_RELATIONS)
+        band = _budget_band(data.get("budget"))
+        if not who or not occasion or band == "any" or relation != AI_PROFILE_WHO[who][2]:
+            return None
+        return f"{lang}|{who}|{occasion}|{relation}|{band}"
+
+    def profiles(self) -> List[tuple]:
+        """Toate profilurile: (cheie, limbă, date pentru prompt)."""
+        result = []
+        for lang in (LANG_RO, LANG_RU):
+            label = 0 if lang == LANG_RO else 1
+            for who, who_option in AI_PROFILE_WHO.items():
+                relation = who_option[2]
+                for occasion, occasion_option in AI_PROFILE_OCCASIONS.items():
+                    for band, _, _ in PRICE_BANDS:
+                        data = {
+                            "who": who_option[label],
+                            "occasion": occasion_option[label],
+                            "age": "—",
+                            "relation": AI_PROFILE_RELATIONS[relation][label],
+                            "budget": _band_label(band, lang),
+                            "interests": "—",
+                        }
+                        result.append((f"{lang}|{who}|{occasion}|{relation}|{band}", lang, data))
+        return result
+
+    def missing(self) -> List[tuple]:
+        return [profile for profile in self.profiles() if profile[0] not in self.entries]
+
+    def lookup(self, lang: str, data: Dict[str, Any]) -> str | None:
+        key = self.profile_key(lang, data)
+        if key is None:
+            self.unmatched += 1
+            return None
+        entry = self.entries.get(key)
+        if entry is None or not all(self.inventory.is_available(pid) for pid in entry[1]):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def store(self, key: str, text: str):
+        lowered = text.lower()
+        named = [
+            p["id"]
+            for p in self.products
+            if p["id"].lower() in lowered
+            or any(p.get(field) and p[field].lower() in lowered for field in ("name_ro", "name_ru"))
+        ]
+        self.entries[key] = [text, named]
+        self._state.mark_dirty()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "profiles": f"{len(self.entries)}/{len(AI_PROFILE_WHO) * len(AI_PROFILE_OCCASIONS) * len(PRICE_BANDS) * 2}",
+            "hits": self.hits,
+            "misses": self.misses,
+            "unmatched": self.unmatched,
+        }
+
+
+async def precompute_recommendations() -> int:
+    """Completează profilurile lipsă cu AI_PRECOMPUTE_CONCURRENCY apeluri simultane.
+
+    Se oprește când bugetul AI nu mai e în modul normal sau Groq e saturat
+    (traficul live are prioritate); restul profilurilor rămân pentru trecerea următoare.
+    """
+    t = tenant()
+    pending = t.ai_precomputed.missing()
+    if not pending:
+        return 0
+    done = 0
+
+    async def worker():
+        nonlocal done
+        while pending and t.ai_usage.mode() == AI_MODE_NORMAL:
+            key, lang, data = pending.pop()
+            try:
+                text = await ai_complete(
+                    "precompute",
+                    None,
+                    GROQ_CONSULT_MODELS,
+                    messages=_consult_messages(lang, data),
+                    temperature=0.4,
+                    max_tokens=AI_CONSULT_MAX_TOKENS,
+                )
+            except GroqSaturated:
+                pending.clear()
+                return
+            except Exception as e:
+                logger.warning("Precompute %s failed: %r", key, e)
+                continue
+            t.ai_precomputed.store(key, text)
+            done += 1
+
+    await asyncio.gather(*(worker() for _ in range(max(1, AI_PRECOMPUTE_CONCURRENCY))))
+    logger.info("Precomputed %s recommendation(s), table %s", done, t.ai_precomputed.snapshot()["profiles"])
+    return done
+
+
+async def ai_precompute_loop():
+    while True:
+        try:
+            await precompute_recommendations()
+        except Exception as e:
+            logger.exception("Recommendation precompute failed: %s", e)
+        await asyncio.sleep(AI_PRECOMPUTE_INTERVAL_MINUTES * 60)
+
+
+# ----------------- Reamintire comenzi abandonate -----------------
+
+
+class TimerWheel:
+    """Roată de timere hash-uită: arm/cancel O(1), un tick costă doar cât slotul curent.
+
+    Un timer stă în slotul (cursor + ticks) % len(slots) cu `rounds` ture complete
+    de așteptat. Termenele absolute se persistă, iar la pornire timerele se rearmează
+    cu `restored` în payload: starea din memorie de la armare nu mai există.
+    """
+
+    def __init__(self, state: PersistentState, tick_seconds: float = 1.0, slots: int = 512):
+        self._state = state
+        self.tick_seconds = tick_seconds
+        self.slots: List[Dict[str, list]] = [{} for _ in range(slots)]
+        self._slot_of: Dict[str, int] = {}
+        self._cursor = 0
+        self.timers: Dict[str, Dict[str, Any]] = state.data.setdefault("timers", {})
+        now = time.time()
+        for key, timer in self.timers.items():
+            timer["payload"]["restored"] = True
+            self._place(key, timer["deadline"] - now)
+
+    def _place(self, key: str, delay: float):
+        ticks = max(1, math.ceil(delay / self.tick_seconds))
+        slot = (self._cursor + ticks) % len(self.slots)
+        self.slots[slot][key] = [(ticks - 1) // len(self.slots)]
+        self._slot_of[key] = slot
+
+    def arm(self, key: str, delay: float, payload: Dict[str, Any]):
+        self.cancel(key)
+        self.timers[key] = {"deadline": time.time() + delay, "payload": payload}
+        self._place(key, delay)
+        self._state.mark_dirty()
+
+    def cancel(self, key: str):
+        slot = self._slot_of.pop(key, None)
+        if slot is not None:
+            self.slots[slot].pop(key, None)
+            self.timers.pop(key, None)
+            self._state.mark_dirty()
+
+    def advance(self) -> List[tuple]:
+        """Un tick: întoarce [(cheie, payload)] pentru timerele expirate."""
+        self._cursor = (self._cursor + 1) % len(self.slots)
+        bucket = self.slots[self._cursor]
+        expired = []
+        for key, entry in list(bucket.items()):
+            if entry[0] > 0:
+                entry[0] -= 1
+                continue
+            del bucket[key]
+            self._slot_of.pop(key, None)
+            timer = self.timers.pop(key, None)
+            expired.append((key, timer["payload"] if timer else {}))
+        if expired:
+            self._state.mark_dirty()
+        return expired
+
+    async def run(self, on_expire):
+        next_tick = time.monotonic()
+        while True:
+            next_tick += self.tick_seconds
+            await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+            for key, payload in self.advance():
+                try:
+                    await on_expire(key, payload)
+                except Exception as e:
+                    logger.exception("Timer %s failed: %s", key, e)
+
+
+ORDER_FLOW_STATES = set(range(ORDER_PRODUCT, ORDER_CONFIRM + 1))
+
+
+def order_step(handler):
+    """Decorator pentru pașii comenzii: fiecare pas rearmează timerul de inactivitate,
+    ieșirea din conversație îl anulează. Se trimite cel mult o reamintire per comandă."""
+
+    @functools.wraps(handler)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        result = await handler(update, context)
+        user = update.effective_user
+        if not user or ORDER_REMINDER_MINUTES <= 0:
+            return result
+        key = str(user.id)
+        reminders = tenant().order_reminders
+        if result in ORDER_FLOW_STATES:
+            if not context.user_data.get("order_reminded"):
+                reminders.arm(
+                    key,
+                    ORDER_REMINDER_MINUTES * 60,
+                    {"chat_id": update.effective_chat.id, "lang": get_lang(context)},
+                )
+        else:
+            reminders.cancel(key)
+            context.user_data.pop("order_reminded", None)
+        return result
+
+    return wrapper
+
+
+async def send_order_reminder(application, key: str, payload: Dict[str, Any]):
+    """Reamintirea unei comenzi abandonate. Un timer rearmat după restart aparține unei
+    conversații pe care botul n-o mai are, deci vine cu butonul care o pornește din nou."""
+    application.user_data[int(key)]["order_reminded"] = True
+    lang = payload.get("lang", LANG_RO)
+    text, keyboard = tr(lang, "order_reminder"), None
+    if payload.get("restored"):
+        text = tr(lang, "order_reminder_restored")
+        keyboard = InlineKeyboardMarkup(
+            [[InlineKeyboardButton(tr(lang, "btn_order_resume"), callback_data=f"order_resume:{lang}")]]
+        )
+    try:
+        await application.bot.send_message(payload["chat_id"], text, reply_markup=keyboard)
+    except TelegramError as e:
+        logger.warning("Order reminder to %s failed: %r", key, e)
+
+
 # ----------------- Flow comenzi -----------------
 
 
+@order_step
 async def order_from_menu_entry(update: Update, context: ContextTypes.DEFAULT_TYPE):
     lang = get_lang(context)
     context.user_data["order"] = {}
+    context.user_data.pop("order_reminded", None)
     last_order = context.user_data.get("last_order")
 
     if last_order:
@@ -630,6 +4266,7 @@ async def order_from_menu_entry(update: Update, context: ContextTypes.DEFAULT_TY
         return ORDER_PRODUCT
 
 
+@order_step
 async def order_reuse_yes(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -650,6 +4287,7 @@ async def order_reuse_yes(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ORDER_PRODUCT
 
 
+@order_step
 async def order_reuse_no(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -660,6 +4298,7 @@ async def order_reuse_no(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ORDER_PRODUCT
 
 
+@order_step
 async def order_set_product(update: Update, context: ContextTypes.DEFAULT_TYPE):
     lang = get_lang(context)
     text = update.message.text.strip()
@@ -676,15 +4315,11 @@ async def order_set_product(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return ORDER_NAME
     else:
         # avem date reutilizate, sărim direct la data livrării
-        await send_text(update, context, tr(lang, "order_ask_date"))
-        return ORDER_DATE
+        return await ask_delivery_slot(update, context)
 
 
-async def order_from_catalog_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    query = update.callback_query
-    await query.answer()
+async def _order_pick_product(update: Update, context: ContextTypes.DEFAULT_TYPE, product_id: str):
     lang = get_lang(context)
-    product_id = query.data.split(":", maxsplit=1)[1]
     context.user_data.setdefault("order", {})
     context.user_data["order"]["product_id"] = product_id
     context.user_data["order"]["product_custom"] = None
@@ -693,10 +4328,40 @@ async def order_from_catalog_callback(update: Update, context: ContextTypes.DEFA
         await send_text(update, context, tr(lang, "order_ask_name"))
         return ORDER_NAME
     else:
-        await send_text(update, context, tr(lang, "order_ask_date"))
-        return ORDER_DATE
+        return await ask_delivery_slot(update, context)
+
 
+async def order_resume_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Butonul din reamintirea trimisă după restart: `order_resume:<limbă>`."""
+    query = update.callback_query
+    await query.answer()
+    lang = query.data.split(":", maxsplit=1)[1]
+    if lang in (LANG_RO, LANG_RU):
+        context.user_data.setdefault("lang", lang)
+    await query.edit_message_reply_markup(reply_markup=None)
+    return await order_from_menu_entry(update, context)
+
+
+@order_step
+async def order_from_catalog_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    product_id = query.data.split(":", maxsplit=1)[1]
+    return await _order_pick_product(update, context, product_id)
 
+
+@order_step
+async def order_from_deep_link(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/start order-<ID> – butonul din rezultatele inline."""
+    context.user_data.setdefault("lang", LANG_RO)
+    product_id = context.args[0].split("-", maxsplit=1)[1]
+    if not _find_product_by_id(product_id):
+        await start(update, context)
+        return ConversationHandler.END
+    return await _order_pick_product(update, context, product_id)
+
+
+@order_step
 async def order_set_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
     lang = get_lang(context)
     context.user_data["order"]["name"] = update.message.text.strip()
@@ -704,6 +4369,7 @@ async def order_set_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ORDER_PHONE
 
 
+@order_step
 async def order_set_phone(update: Update, context: ContextTypes.DEFAULT_TYPE):
     lang = get_lang(context)
     context.user_data["order"]["phone"] = update.message.text.strip()
@@ -711,6 +4377,7 @@ async def order_set_phone(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ORDER_CITY
 
 
+@order_step
 async def order_set_city(update: Update, context: ContextTypes.DEFAULT_TYPE):
     lang = get_lang(context)
     context.user_data["order"]["city"] = update.message.text.strip()
@@ -726,6 +4393,7 @@ async def order_set_city(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ORDER_DELIVERY
 
 
+@order_step
 async def order_set_delivery(update: Update, context: ContextTypes.DEFAULT_TYPE):
     lang = get_lang(context)
     text = update.message.text.strip()
@@ -736,23 +4404,56 @@ async def order_set_delivery(update: Update, context: ContextTypes.DEFAULT_TYPE)
     elif text == tr(lang, "btn_delivery_pickup"):
         context.user_data["order"]["delivery_type"] = "pickup"
         context.user_data["order"]["address"] = "Ridicare personală"
-        await send_text(update, context, tr(lang, "order_ask_date"), reply_markup=get_menu_keyboard(lang))
-        return ORDER_DATE
+        await send_text(update, context, tr(lang, "order_pickup_selected"), reply_markup=get_menu_keyboard(lang))
+        return await ask_delivery_slot(update, context)
     else:
         await send_text(update, context, tr(lang, "order_ask_delivery"))
         return ORDER_DELIVERY
 
 
+@order_step
 async def order_set_address(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    lang = get_lang(context)
     context.user_data["order"]["address"] = update.message.text.strip()
-    await send_text(update, context, tr(lang, "order_ask_date"))
+    return await ask_delivery_slot(update, context)
+
+
+def _slot_keyboard(lang: str, city: str | None) -> InlineKeyboardMarkup | None:
+    t = tenant()
+    slots = t.slot_scheduler.available(city, SLOT_MAX_BUTTONS)
+    if not slots:
+        return None
+    buttons = [
+        InlineKeyboardButton(t.slot_scheduler.label(day, window, lang), callback_data=f"slot:{day}:{window}")
+        for day, window in slots
+    ]
+    return InlineKeyboardMarkup([buttons[i: i + 2] for i in range(0, len(buttons), 2)])
+
+
+async def ask_delivery_slot(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    text_key: str = "slot_ask",
+    back_to_confirm: bool = False,
+):
+    """Oferă sloturile libere ca butoane; dacă nu mai sunt, acceptăm data ca text.
+
+    `back_to_confirm`: slotul s-a ocupat la confirmare, după alegere revenim direct la rezumat.
+    """
+    lang = get_lang(context)
+    context.user_data["order"].pop("slot", None)
+    context.user_data["order"]["back_to_confirm"] = back_to_confirm
+    keyboard = _slot_keyboard(lang, context.user_data["order"].get("city"))
+    if keyboard is None:
+        await send_text(update, context, tr(lang, "slot_none"))
+    else:
+        await send_text(update, context, tr(lang, text_key), reply_markup=keyboard)
     return ORDER_DATE
 
 
-async def order_set_date(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def _after_delivery_date(update: Update, context: ContextTypes.DEFAULT_TYPE):
     lang = get_lang(context)
-    context.user_data["order"]["date"] = update.message.text.strip()
+    if context.user_data["order"].pop("back_to_confirm", False):
+        return await send_order_summary(update, context)
     if not context.user_data["order"].get("payment"):
         await send_text(update, context, tr(lang, "order_ask_payment"))
         return ORDER_PAYMENT
@@ -761,6 +4462,43 @@ async def order_set_date(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return ORDER_COMMENTS
 
 
+@order_step
+async def order_pick_slot(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    t = tenant()
+    query = update.callback_query
+    await query.answer()
+    lang = get_lang(context)
+    order = context.user_data["order"]
+    try:
+        _, day, window_str = query.data.split(":")
+        window = int(window_str)
+    except ValueError:
+        day, window = "", -1
+    offered = t.slot_scheduler.is_offered(day, window)
+    if not offered or t.slot_scheduler.remaining(day, window, order.get("city")) <= 0:
+        keyboard = _slot_keyboard(lang, order.get("city"))
+        if keyboard is None:
+            await query.edit_message_text(tr(lang, "slot_none"))
+        else:
+            text_key = "slot_full" if offered else "slot_ask"
+            await query.edit_message_text(tr(lang, text_key), reply_markup=keyboard)
+        return ORDER_DATE
+    order["slot"] = [day, window]
+    order["date"] = t.slot_scheduler.label(day, window, lang)
+    await query.edit_message_text(tr(lang, "slot_chosen").format(slot=order["date"]))
+    return await _after_delivery_date(update, context)
+
+
+@order_step
+async def order_set_date(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Text liber doar când nu mai sunt sloturi; altfel re-afișăm butoanele."""
+    if _slot_keyboard(get_lang(context), context.user_data["order"].get("city")) is not None:
+        return await ask_delivery_slot(update, context)
+    context.user_data["order"]["date"] = update.message.text.strip()
+    return await _after_delivery_date(update, context)
+
+
+@order_step
 async def order_set_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
     lang = get_lang(context)
     context.user_data["order"]["payment"] = update.message.text.strip()
@@ -768,6 +4506,7 @@ async def order_set_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ORDER_COMMENTS
 
 
+@order_step
 async def order_set_comments(update: Update, context: ContextTypes.DEFAULT_TYPE):
     lang = get_lang(context)
     context.user_data["order"]["comments"] = update.message.text.strip()
@@ -775,6 +4514,7 @@ async def order_set_comments(update: Update, context: ContextTypes.DEFAULT_TYPE)
     return ORDER_OCCASION
 
 
+@order_step
 async def order_set_occasion(update: Update, context: ContextTypes.DEFAULT_TYPE):
     lang = get_lang(context)
     context.user_data["order"]["occasion"] = update.message.text.strip()
@@ -782,6 +4522,7 @@ async def order_set_occasion(update: Update, context: ContextTypes.DEFAULT_TYPE)
     return ORDER_SOURCE
 
 
+@order_step
 async def order_set_source(update: Update, context: ContextTypes.DEFAULT_TYPE):
     lang = get_lang(context)
     context.user_data["order"]["source"] = update.message.text.strip()
@@ -802,11 +4543,17 @@ async def order_set_source(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ORDER_UPSELL
 
 
+@order_step
 async def order_set_upsell(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    context.user_data["order"]["upsell"] = update.message.text.strip()
+    return await send_order_summary(update, context)
+
+
+async def send_order_summary(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Rezumatul comenzii cu butoanele de confirmare / editare / anulare."""
     lang = get_lang(context)
-    text = update.message.text.strip()
-    context.user_data["order"]["upsell"] = text
-    await send_text(update, context, "", reply_markup=get_menu_keyboard(lang))  # revenim la meniul principal de butoane
+    # revenim la meniul principal de butoane (Telegram nu acceptă mesaje goale)
+    await send_text(update, context, tr(lang, "order_summary_title"), reply_markup=get_menu_keyboard(lang))
 
     data = context.user_data["order"]
     product = _find_product_by_id(data.get("product_id"))
@@ -818,8 +4565,6 @@ async def order_set_upsell(update: Update, context: ContextTypes.DEFAULT_TYPE):
         price = "—"
 
     summary_lines = [
-        tr(lang, "order_summary_title"),
-        "",
         f"🎁 Box: {name} ({price} MDL)",
         f"👤 Nume: {data.get('name')}",
         f"📞 Telefon: {data.get('phone')}",
@@ -852,8 +4597,12 @@ async def order_set_upsell(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ORDER_CONFIRM
 
 
+@order_step
 async def order_confirm_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    t = tenant()
     query = update.callback_query
+    if await throttled(update, context, "order_confirm"):
+        return ORDER_CONFIRM
     await query.answer()
     lang = get_lang(context)
     data = context.user_data.get("order", {})
@@ -867,7 +4616,21 @@ async def order_confirm_callback(update: Update, context: ContextTypes.DEFAULT_T
 
     client = query.from_user
     now = datetime.now(timezone.utc)
-    order_id = int(now.timestamp())
+    order_id = next_order_id()
+    if traffic_recorder:
+        traffic_recorder.record_order(t, update, order_id)
+
+    if product and not t.inventory.reserve(product["id"], order_id):
+        await query.edit_message_text(tr(lang, "order_sold_out"))
+        return ConversationHandler.END
+
+    slot = data.get("slot")
+    if slot and not t.slot_scheduler.book(slot[0], slot[1], data.get("city"), order_id):
+        # slotul s-a umplut între alegere și confirmare
+        if product:
+            t.inventory.release(order_id)
+        await query.edit_message_text(tr(lang, "slot_full"))
+        return await ask_delivery_slot(update, context, text_key="slot_ask", back_to_confirm=True)
 
     order_text = (
         f"📥 Comandă nouă #{order_id}\n\n"
@@ -890,16 +4653,23 @@ async def order_confirm_callback(update: Update, context: ContextTypes.DEFAULT_T
     stats_record = {
         "order_id": order_id,
         "timestamp": now,
+        "user_id": client.id,
         "product_id": data.get("product_id"),
         "product_name": name,
         "price": price if isinstance(price, (int, float)) else 0,
         "name": data.get("name"),
         "city": data.get("city"),
+        "delivery_date": slot[0] if slot else None,
+        "delivery_window": t.slot_scheduler.windows[slot[1]] if slot else data.get("date"),
         "occasion": data.get("occasion"),
         "source": data.get("source"),
+        "via_ai": context.user_data.pop("ai_consulted", False),
+        "lang": lang,
     }
     save_order_for_stats(stats_record)
 
+    t.customers.register(client.id, lang)
+
     # reținem ca „ultima comandă” a userului (pentru quick reorder)
     context.user_data["last_order"] = {
         "name": data.get("name"),
@@ -910,25 +4680,9 @@ async def order_confirm_callback(update: Update, context: ContextTypes.DEFAULT_T
         "payment": data.get("payment"),
     }
 
-    if ADMIN_CHAT_ID:
-        admin_keyboard = InlineKeyboardMarkup(
-            [
-                [
-                    InlineKeyboardButton(
-                        "✅ Acceptă comanda", callback_data=f"admin_accept:{client.id}"
-                    ),
-                    InlineKeyboardButton(
-                        "❌ Anulează comanda", callback_data=f"admin_reject:{client.id}"
-                    ),
-                ]
-            ]
-        )
-        try:
-            await context.bot.send_message(
-                chat_id=ADMIN_CHAT_ID, text=order_text, reply_markup=admin_keyboard
-            )
-        except Exception as e:
-            logger.exception("Failed to send order to admin: %s", e)
+    # trimis în fundal, ca răspunsul clientului să nu aștepte după el;
+    # în rafale ajunge în rezumatul adminului
+    t.admin_notifier.notify(context.bot, t.admin_chat_id, order_text, order_id=order_id)
 
     # Mesaj pentru client (comanda a fost înregistrată)
     await query.edit_message_text(
@@ -936,16 +4690,21 @@ async def order_confirm_callback(update: Update, context: ContextTypes.DEFAULT_T
     )
 
     # Dacă avem provider de plată și preț numeric, trimitem invoice
-    if PAYMENT_PROVIDER_TOKEN and isinstance(price, (int, float)):
+    if t.payment_provider_token and isinstance(price, (int, float)):
         try:
-            prices = [LabeledPrice(label=name, amount=int(price * 100))]
+            amount = int(price * 100)
+            payload = f"order-{order_id}"
+            t.payment_ledger.register_invoice(
+                payload, order_id, client.id, amount, PAYMENT_CURRENCY
+            )
+            prices = [LabeledPrice(label=name, amount=amount)]
             await context.bot.send_invoice(
                 chat_id=client.id,
                 title=f"Plată comandă #{order_id}",
                 description=f"Plată pentru {name}",
-                payload=f"order-{order_id}",
-                provider_token=PAYMENT_PROVIDER_TOKEN,
-                currency="MDL",  # schimbă dacă providerul cere altă valută
+                payload=payload,
+                provider_token=t.payment_provider_token,
+                currency=PAYMENT_CURRENCY,
                 prices=prices,
                 need_name=False,
                 need_phone_number=False,
@@ -956,52 +4715,156 @@ async def order_confirm_callback(update: Update, context: ContextTypes.DEFAULT_T
             await context.bot.send_message(client.id, tr(lang, "payment_invoice_info"))
         except Exception as e:
             logger.exception("Failed to send invoice: %s", e)
-            if ADMIN_CHAT_ID:
-                try:
-                    await context.bot.send_message(
-                        ADMIN_CHAT_ID,
-                        f"[PAYMENT ERROR] Nu am putut trimite invoice pentru comanda #{order_id}: {e!r}",
-                    )
-                except Exception:
-                    pass
+            t.admin_notifier.notify(
+                context.bot,
+                t.admin_chat_id,
+                f"[PAYMENT ERROR] Nu am putut trimite invoice pentru comanda #{order_id}: {e!r}",
+                order_id=order_id,
+            )
 
     return ConversationHandler.END
 
 
-async def order_admin_decision(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    query = update.callback_query
+def order_action_buttons(order: Dict[str, Any], suffix: str = "") -> List[InlineKeyboardButton]:
+    """Butoane scurte (`✅ #123`) pentru listele cu mai multe comenzi: /pending și rezumatele."""
+    return [
+        InlineKeyboardButton(
+            f"{label.split()[0]} #{order['order_id']}",
+            callback_data=f"ord:{order['order_id']}:{action}{suffix}",
+        )
+        for action, (status, label) in ORDER_ACTIONS.items()
+        if status in ORDER_TRANSITIONS[order["status"]]
+    ]
+
+
+def _replace_order_row(markup: InlineKeyboardMarkup | None, order: Dict[str, Any]) -> InlineKeyboardMarkup | None:
+    """Într-un rezumat schimbă doar rândul comenzii apăsate, celelalte rămân."""
+    rows = []
+    for row in markup.inline_keyboard if markup else ():
+        if row and row[0].callback_data.split(":")[1] == str(order["order_id"]):
+            row = order_action_buttons(order, ":d")
+        if row:
+            rows.append(row)
+    return InlineKeyboardMarkup(rows) if rows else None
+
+
+def order_admin_keyboard(order: Dict[str, Any]) -> InlineKeyboardMarkup | None:
+    """Butoanele pentru pașii permiși din statusul curent; callback `ord:<order_id>:<acțiune>`."""
+    allowed = ORDER_TRANSITIONS[order["status"]]
+    buttons = [
+        InlineKeyboardButton(label, callback_data=f"ord:{order['order_id']}:{action}")
+        for action, (status, label) in ORDER_ACTIONS.items()
+        if status in allowed
+    ]
+    return InlineKeyboardMarkup([buttons]) if buttons else None
+
+
+async def apply_order_action(bot, order_id: int, action: str, by: int) -> Dict[str, Any]:
+    """Schimbă statusul, ajustează stocul / slotul și anunță clientul; OrderTransitionError dacă nu se poate."""
+    t = tenant()
+    status = ORDER_ACTIONS[action][0]
+    if status == "accepted":
+        current = t.order_book.get(order_id)
+        if current is not None and status in ORDER_TRANSITIONS[current["status"]]:
+            if not t.inventory.commit(order_id, current.get("product_id")):
+                raise OrderTransitionError(
+                    f"Comanda #{order_id}: rezervarea a expirat și produsul s-a epuizat între timp."
+                )
+    order = t.order_book.transition(order_id, status, by=by)
+    if status == "cancelled":
+        t.inventory.release(order_id)
+        t.slot_scheduler.release(order_id)
+    elif status == "done":
+        t.inventory.forget(order_id)
+    try:
+        text = tr(order.get("lang") or LANG_RO, f"order_status_{status}")
+        await bot.send_message(order["user_id"], text.format(order_id=order_id))
+    except Exception:
+        pass
+    return order
+
+
+async def _legacy_admin_decision(query, bot, action: str, user_id_str: str):
+    """Butoanele de dinainte de OrderBook (`admin_accept|admin_reject:<user_id>`): nu au
+    numărul comenzii, deci doar anunță clientul, ca atunci, și scot butoanele."""
     await query.answer()
-    data = query.data
-    if ":" not in data:
-        return
-    action, user_id_str = data.split(":", maxsplit=1)
     try:
         user_id = int(user_id_str)
     except ValueError:
         return
+    lang = tenant().customers.users.get(str(user_id), {}).get("lang") or LANG_RO
+    status = "accepted" if action == "accept" else "cancelled"
+    try:
+        await bot.send_message(user_id, tr(lang, f"order_legacy_{status}"))
+    except Exception:
+        pass
+    await query.edit_message_reply_markup(reply_markup=None)
 
-    if not ADMIN_CHAT_ID or query.from_user.id != ADMIN_CHAT_ID:
+
+async def order_admin_decision(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Butoanele de admin pe comenzi: `ord:<order_id>:<acțiune>[:<vizualizare>:<după> | :d]`.
+
+    Cele din /pending au și pagina, care se redesenează după acțiune; cele din
+    rezumate (`:d`) schimbă doar rândul comenzii lor. Butoanele vechi din mesajele
+    deja trimise merg în continuare: `admin_accept|admin_reject:<user_id>:<order_id>`
+    trec prin OrderBook, cele fără `<order_id>` doar anunță clientul.
+    """
+    t = tenant()
+    query = update.callback_query
+    if not t.admin_chat_id or query.from_user.id != t.admin_chat_id:
+        await query.answer()
         await query.edit_message_reply_markup(reply_markup=None)
         return
 
-    if action == "admin_accept":
-        try:
-            await context.bot.send_message(
-                user_id, "✅ Comanda ta a fost confirmată de operator. Mulțumim!"
-            )
-        except Exception:
-            pass
-        await query.edit_message_reply_markup(reply_markup=None)
-    elif action == "admin_reject":
-        try:
-            await context.bot.send_message(
-                user_id, "❌ Comanda ta a fost marcată ca anulată de operator."
+    parts = query.data.split(":")
+    if parts[0] in ("admin_accept", "admin_reject"):
+        action = "accept" if parts[0] == "admin_accept" else "cancel"
+        if len(parts) == 2:
+            await _legacy_admin_decision(query, context.bot, action, parts[1])
+            return
+        parts = ["ord", parts[2], action]
+    try:
+        order_id = int(parts[1])
+        action = parts[2]
+        page = (parts[3], int(parts[4])) if len(parts) == 5 else None
+        digest = parts[3:] == ["d"]
+    except (IndexError, ValueError):
+        await query.answer()
+        return
+    if action not in ORDER_ACTIONS:
+        await query.answer()
+        return
+
+    try:
+        order = await apply_order_action(context.bot, order_id, action, query.from_user.id)
+    except OrderTransitionError as e:
+        await query.answer(str(e), show_alert=True)
+        order = t.order_book.get(order_id)
+    else:
+        note = f"#{order_id}: {ORDER_STATUS_LABELS[order['status']]}"
+        if order["status"] == "cancelled" and order.get("paid"):
+            note += " – era plătită, rambursarea se face manual"
+        await query.answer(note, show_alert=order["status"] == "cancelled" and bool(order.get("paid")))
+
+    try:
+        if page:
+            text, keyboard = pending_page(*page)
+            await query.edit_message_text(text, reply_markup=keyboard)
+        elif digest:
+            if order:
+                await query.edit_message_reply_markup(
+                    reply_markup=_replace_order_row(query.message.reply_markup, order)
+                )
+        else:
+            await query.edit_message_reply_markup(
+                reply_markup=order_admin_keyboard(order) if order else None
             )
-        except Exception:
-            pass
-        await query.edit_message_reply_markup(reply_markup=None)
+    except BadRequest as e:
+        if "not modified" not in str(e):
+            raise
 
 
+@order_step
 async def order_edit_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -1012,6 +4875,7 @@ async def order_edit_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
     return ORDER_PRODUCT
 
 
+@order_step
 async def order_cancel_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -1022,6 +4886,7 @@ async def order_cancel_callback(update: Update, context: ContextTypes.DEFAULT_TY
     return ConversationHandler.END
 
 
+@order_step
 async def order_cancel_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     lang = get_lang(context)
     await send_text(
@@ -1034,9 +4899,28 @@ async def order_cancel_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def precheckout_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Verifică și aprobă pre-checkout-ul Telegram Payments."""
+    """Verifică factura în ledger (sumă, valută, neplătită) și aprobă pre-checkout-ul."""
+    t = tenant()
     query = update.pre_checkout_query
+    reason = t.payment_ledger.validate(query.invoice_payload, query.total_amount, query.currency)
+    error_key = "payment_invalid"
+    if reason is None:
+        order_id = t.payment_ledger.invoices[query.invoice_payload]["order_id"]
+        order = t.order_book.get(order_id)
+        if order is not None and order["status"] == "cancelled":
+            reason = "order cancelled"
+        elif order is not None and not t.inventory.hold(order_id, order.get("product_id")):
+            # rezervarea a expirat înainte de plată și între timp s-a vândut tot
+            reason, error_key = "out of stock", "order_sold_out"
     try:
+        if reason:
+            logger.warning(
+                "PreCheckout rejected for %s: %s", query.invoice_payload, reason
+            )
+            await query.answer(
+                ok=False, error_message=tr(get_lang(context), error_key)
+            )
+            return
         await query.answer(ok=True)
     except Exception as e:
         logger.exception("PreCheckout error: %s", e)
@@ -1045,23 +4929,42 @@ async def precheckout_callback(update: Update, context: ContextTypes.DEFAULT_TYP
 
 async def successful_payment_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handler apelat când plata a fost făcută cu succes."""
+    t = tenant()
     lang = get_lang(context)
     payment = update.message.successful_payment
-    logger.info("Successful payment: %s", payment.to_dict())
+    invoice, is_new = t.payment_ledger.record_payment(payment, update.effective_user.id)
+    if not is_new:
+        logger.info(
+            "Duplicate payment update ignored: %s", payment.telegram_payment_charge_id
+        )
+        return
+    logger.info(
+        "Successful payment: %s %s %s (charge %s)",
+        payment.invoice_payload, payment.total_amount, payment.currency,
+        payment.telegram_payment_charge_id,
+    )
+    order = None
+    stock_note = ""
+    if invoice is not None:
+        order = mark_order_paid(invoice["order_id"], payment.telegram_payment_charge_id)
+        if order is not None and not t.inventory.commit(invoice["order_id"], order.get("product_id")):
+            # banii sunt deja încasați: anunțăm adminul, nu refuzăm comanda
+            logger.warning("Paid order #%s has no stock left", invoice["order_id"])
+            stock_note = "\n⚠️ Stocul s-a epuizat după expirarea rezervării – verifică manual."
+    else:
+        logger.warning("Payment for unknown payload: %s", payment.invoice_payload)
     await update.message.reply_text(tr(lang, "payment_ok"))
 
-    # poți trimite aici un mesaj și adminului dacă vrei
-    if ADMIN_CHAT_ID:
-        try:
-            await update.get_bot().send_message(
-                ADMIN_CHAT_ID,
-                f"✅ Payment received:\n\n"
-                f"Payload: {payment.invoice_payload}\n"
-                f"Total: {payment.total_amount} {payment.currency}\n"
-                f"From user: {update.effective_user.id}",
-            )
-        except Exception as e:
-            logger.exception("Failed to notify admin about payment: %s", e)
+    t.admin_notifier.notify(
+        update.get_bot(),
+        t.admin_chat_id,
+        f"✅ Payment received:\n\n"
+        f"Payload: {payment.invoice_payload}\n"
+        f"Order: #{invoice['order_id'] if invoice else '—'}\n"
+        f"Total: {payment.total_amount} {payment.currency}\n"
+        f"From user: {update.effective_user.id}{stock_note}",
+        order_id=order["order_id"] if order else None,
+    )
 
 
 # ----------------- Contact operator -----------------
@@ -1073,23 +4976,114 @@ async def support_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return SUPPORT_MESSAGE
 
 
+class SupportRelay:
+    """Index mesaj din chatul de suport → client, pentru rutarea reply-urilor în O(1).
+
+    Și invers: răspunsurile operatorului livrate clienților (`user_id:message_id`),
+    ca reply-ul clientului să se întoarcă în suport și după restart sau pe alt worker.
+    Mărginit la `max_size` fire pe fiecare sens (cele mai vechi sunt eliminate) și persistat.
+    """
+
+    def __init__(self, max_size: int, state: PersistentState):
+        self.max_size = max(1, max_size)
+        self._state = state
+        # ordinea de inserare = vechime (și în SharedMapping)
+        self.routes: Dict[str, List[Any]] = state.data.setdefault("routes", {})
+        self.replies: Dict[str, str] = state.data.setdefault("replies", {})
+
+    def _put(self, mapping, key: str, value):
+        # cu worker-i, operatorul (chatul de suport) și clientul pot fi pe procese diferite
+        shared = isinstance(mapping, SharedMapping)
+        with mapping.transaction() if shared else contextlib.nullcontext():
+            mapping.pop(key, None)
+            mapping[key] = value
+            while len(mapping) > self.max_size:
+                del mapping[next(iter(mapping))]
+        self._state.mark_dirty()
+
+    def record(self, message_id: int, user_id: int, lang: str):
+        self._put(self.routes, str(message_id), [user_id, lang])
+
+    def lookup(self, message_id: int) -> List[Any] | None:
+        return self.routes.get(str(message_id))
+
+    def record_reply(self, user_id: int, message_id: int, lang: str):
+        self._put(self.replies, f"{user_id}:{message_id}", lang)
+
+    def is_reply(self, user_id: int, message_id: int) -> bool:
+        return f"{user_id}:{message_id}" in self.replies
+
+
+def get_support_chat_id() -> int | None:
+    t = tenant()
+    return t.support_chat_id or t.admin_chat_id
+
+
+async def _forward_to_support(bot, user, text: str, lang: str) -> bool:
+    chat_id = get_support_chat_id()
+    if not chat_id:
+        return False
+    payload = (
+        f"📩 Mesaj nou pentru operator de la @{user.username or 'fără_username'} (ID: {user.id}):\n\n{text}\n\n"
+        "↩️ Dă reply la acest mesaj ca să-i răspunzi clientului."
+    )
+    try:
+        msg = await bot.send_message(chat_id, payload)
+    except Exception as e:
+        logger.exception("Failed to forward support msg: %s", e)
+        return False
+    tenant().support_relay.record(msg.message_id, user.id, lang)
+    return True
+
+
 async def support_forward(update: Update, context: ContextTypes.DEFAULT_TYPE):
     lang = get_lang(context)
-    chat_id = SUPPORT_CHAT_ID or ADMIN_CHAT_ID
-    if chat_id:
-        user = update.effective_user
-        text = update.message.text
-        payload = (
-            f"📩 Mesaj nou pentru operator de la @{user.username or 'fără_username'} (ID: {user.id}):\n\n{text}"
-        )
-        try:
-            await update.get_bot().send_message(chat_id, payload)
-        except Exception as e:
-            logger.exception("Failed to forward support msg: %s", e)
+    if await throttled(update, context, "support"):
+        return SUPPORT_MESSAGE
+    await _forward_to_support(
+        update.get_bot(), update.effective_user, update.message.text, lang
+    )
     await send_text(update, context, tr(lang, "support_sent"), reply_markup=get_menu_keyboard(lang))
     return ConversationHandler.END
 
 
+async def support_operator_reply(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Reply al operatorului în chatul de suport → trimis clientului potrivit."""
+    t = tenant()
+    message = update.effective_message
+    route = t.support_relay.lookup(message.reply_to_message.message_id)
+    if not route:
+        return
+    user_id, lang = route
+    try:
+        if message.text:
+            sent = await context.bot.send_message(
+                user_id,
+                f"{tr(lang, 'support_reply_prefix')}\n\n{message.text}\n\n{tr(lang, 'support_reply_hint')}",
+            )
+        else:
+            sent = await context.bot.copy_message(user_id, message.chat_id, message.message_id)
+    except Exception as e:
+        logger.exception("Failed to relay operator reply to %s: %s", user_id, e)
+        await message.reply_text(f"⚠️ Nu am putut livra răspunsul clientului: {e!r}")
+        return
+    # reply-ul clientului la acest mesaj se întoarce în chatul de suport
+    t.support_relay.record(message.message_id, user_id, lang)
+    t.support_relay.record_reply(user_id, sent.message_id, lang)
+
+
+async def support_customer_reply(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Clientul dă reply la un răspuns al operatorului → continuăm firul în suport."""
+    message = update.effective_message
+    if not tenant().support_relay.is_reply(update.effective_user.id, message.reply_to_message.message_id):
+        return
+    lang = get_lang(context)
+    if await throttled(update, context, "support"):
+        return
+    if await _forward_to_support(context.bot, update.effective_user, message.text, lang):
+        await message.reply_text(tr(lang, "support_sent"))
+
+
 async def support_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     lang = get_lang(context)
     await send_text(update, context, tr(lang, "back_to_menu"), reply_markup=get_menu_keyboard(lang))
@@ -1100,59 +5094,1197 @@ async def support_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if ADMIN_CHAT_ID and update.effective_user and update.effective_user.id == ADMIN_CHAT_ID:
+    t = tenant()
+    if t.admin_chat_id and update.effective_user and update.effective_user.id == t.admin_chat_id:
         await update.message.reply_text(
             "👑 Panou admin simplu.\n\n"
             "• Primești comenzi direct în acest chat.\n"
-            "• Poți folosi /raport_azi pentru un mic rezumat."
+            "• Poți folosi /raport_azi pentru un mic rezumat; rapoartele zilnice și "
+            "săptămânale vin automat.\n"
+            "• /pending arată comenzile deschise pe pagini (filtre: status, azi, maine, "
+            "YYYY-MM-DD), cu butoane pentru acceptare, livrare și anulare.\n"
+            "• /stoc arată stocurile, /stoc <ID> <cantitate> le modifică.\n"
+            "• /profile [secunde] și /memsnap pentru diagnoza performanței, "
+            "/metrics pentru contoarele acestui bot.\n"
+            "• /ai_cost [zile] arată consumul AI (tokeni, cost, latență) și bugetul zilnic.\n"
+            "• /abuse arată cererile limitate per utilizator (AI, mesaje card, suport, confirmări).\n"
+            "• /broadcast <text> trimite un anunț tuturor clienților "
+            "(/broadcast_status, /broadcast_stop, /broadcast_resume)."
         )
     else:
         await update.message.reply_text("Această comandă este doar pentru admin.")
 
 
 async def raport_azi(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not ADMIN_CHAT_ID or update.effective_user.id != ADMIN_CHAT_ID:
+    t = tenant()
+    if not t.admin_chat_id or update.effective_user.id != t.admin_chat_id:
         await update.message.reply_text("Această comandă este doar pentru admin.")
         return
 
-    if not ORDERS:
-        await update.message.reply_text("Nu există comenzi salvate în această sesiune.")
+    today = t.report_aggregates.today()
+    summary = t.report_aggregates.summary(today, today)
+    if not summary["orders"] and not summary["ai_consultations"]:
+        await update.message.reply_text("Astăzi nu au fost comenzi.")
         return
+    await update.message.reply_text(
+        format_report(f"📊 Raport pentru azi ({today.isoformat()}):", summary)
+    )
+
 
-    today = datetime.now(timezone.utc).date()
-    todays = [o for o in ORDERS if o["timestamp"].date() == today]
-    if not todays:
-        await update.message.reply_text("Astăzi nu au fost comenzi (în această sesiune).")
+async def daily_report_job(context: ContextTypes.DEFAULT_TYPE):
+    t = bind_tenant(context.application)
+    today = t.report_aggregates.today()
+    text = format_report(
+        f"📊 Raport zilnic ({today.isoformat()}):", t.report_aggregates.summary(today, today)
+    )
+    await context.bot.send_message(t.admin_chat_id, text)
+
+
+async def weekly_report_job(context: ContextTypes.DEFAULT_TYPE):
+    t = bind_tenant(context.application)
+    last = t.report_aggregates.today() - timedelta(days=1)
+    first = last - timedelta(days=6)
+    text = format_report(
+        f"📈 Raport săptămânal ({first.isoformat()} – {last.isoformat()}):",
+        t.report_aggregates.summary(first, last),
+    )
+    await context.bot.send_message(t.admin_chat_id, text)
+
+
+def _parse_report_time(value: str) -> dtime:
+    hour, minute = value.split(":")
+    return dtime(int(hour), int(minute), tzinfo=ZoneInfo(REPORT_TIMEZONE))
+
+
+def schedule_reports(application):
+    if not tenant().admin_chat_id or not is_primary_worker():
         return
+    if application.job_queue is None:
+        logger.warning("JobQueue unavailable (install python-telegram-bot[job-queue]); no scheduled reports")
+        return
+    application.job_queue.run_daily(
+        daily_report_job, _parse_report_time(REPORT_DAILY_TIME), name="daily-report"
+    )
+    application.job_queue.run_daily(
+        weekly_report_job,
+        _parse_report_time(REPORT_WEEKLY_TIME),
+        days=(REPORT_WEEKLY_DAY,),
+        name="weekly-report",
+    )
 
-    total = sum(o["price"] for o in todays if isinstance(o["price"], (int, float)))
-    count = len(todays)
 
-    # top produse
-    freq: Dict[str, int] = {}
-    for o in todays:
-        name = o["product_name"]
-        freq[name] = freq.get(name, 0) + 1
-    top = sorted(freq.items(), key=lambda x: x[1], reverse=True)[:3]
-    top_str = "\n".join(f"• {name}: {cnt} comenzi" for name, cnt in top)
+async def stock_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/stoc – arată stocurile; /stoc <ID> <cantitate> – setează stocul unui produs."""
+    t = tenant()
+    if not is_admin(update):
+        await update.message.reply_text("Această comandă este doar pentru admin.")
+        return
+    if len(context.args) == 2:
+        product_id = context.args[0].upper()
+        if not _find_product_by_id(product_id):
+            await update.message.reply_text(f"Produs necunoscut: {product_id}")
+            return
+        try:
+            t.inventory.set_stock(product_id, int(context.args[1]))
+        except ValueError:
+            await update.message.reply_text("Folosire: /stoc <ID> <cantitate>")
+            return
+    held: Dict[str, int] = {}
+    for r in t.inventory.reservations.values():
+        if r["status"] == "held":
+            held[r["product_id"]] = held.get(r["product_id"], 0) + r["quantity"]
+    lines = ["📦 Stocuri:"]
+    for p in t.products:
+        left = t.inventory.stock.get(p["id"])
+        left_str = "nelimitat" if left is None else str(left)
+        lines.append(f"• {p['id']}: {left_str} (rezervate neconfirmate: {held.get(p['id'], 0)})")
+    await update.message.reply_text("\n".join(lines))
+
+
+async def abuse_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/abuse – cereri acceptate / limitate per funcție și utilizatorii limitați cel mai des."""
+    if not is_admin(update):
+        await update.message.reply_text("Această comandă este doar pentru admin.")
+        return
+    stats = tenant().throttle.snapshot()
+    lines = ["🛡️ Limitări per utilizator (de la pornire):"]
+    for feature, row in stats["features"].items():
+        burst, period = tenant().throttle.limits[feature]
+        lines.append(
+            f"• {feature} ({burst} rafală, 1 / {period:g}s): acceptate {row['allowed']}, "
+            f"limitate {row['throttled']}, utilizatori urmăriți {row['tracked_users']}"
+        )
+    if stats["offenders"]:
+        lines.append("\nCei mai limitați:")
+        for offender in stats["offenders"]:
+            counts = ", ".join(f"{k} ×{v}" for k, v in offender.items() if k != "user_id")
+            lines.append(f"• {offender['user_id']}: {counts}")
+    else:
+        lines.append("\nNiciun utilizator limitat.")
+    await update.message.reply_text("\n".join(lines))
+
 
+PENDING_VIEW_TITLES = {
+    "open": "Comenzi deschise",
+    **{status: f"Comenzi {label}" for status, label in ORDER_STATUS_LABELS.items()},
+}
+
+
+def _pending_view(arg: str | None) -> str | None:
+    """Argumentul lui /pending: nimic, un status, `azi` / `maine` sau o dată YYYY-MM-DD."""
+    if not arg:
+        return "open"
+    arg = arg.lower()
+    if arg in ORDER_TRANSITIONS:
+        return arg
+    today = datetime.now(tenant().slot_scheduler.tz).date()
+    if arg == "azi":
+        return today.isoformat()
+    if arg in ("maine", "mâine"):
+        return (today + timedelta(days=1)).isoformat()
+    try:
+        return date.fromisoformat(arg).isoformat()
+    except ValueError:
+        return None
+
+
+def pending_page(view: str, after: int = 0) -> tuple:
+    """Textul și butoanele unei pagini din /pending; citește doar comenzile din pagină."""
+    book = tenant().order_book
+    orders, more = book.page(view, after, PENDING_PAGE_SIZE)
+    title = PENDING_VIEW_TITLES.get(view) or f"Livrări deschise pe {view}"
+    lines = [f"📋 {title}: {len(book.view_index(view))}"]
+    if not orders:
+        lines.append("Nicio comandă." if not after else "Nu mai sunt comenzi.")
+    rows = []
+    for order in orders:
+        order_id = order["order_id"]
+        when = " ".join(str(v) for v in (order.get("delivery_date"), order.get("delivery_window")) if v)
+        lines.append(
+            f"\n#{order_id} · {ORDER_STATUS_LABELS[order['status']]} · "
+            f"{order.get('product_name')} ({order.get('price')} MDL)\n"
+            f"👤 {order.get('name')}, {order.get('city')}" + (f" · 📅 {when}" if when else "")
+        )
+        buttons = order_action_buttons(order, f":{view}:{after}")
+        if buttons:
+            rows.append(buttons)
+    nav = []
+    if after:
+        nav.append(InlineKeyboardButton("⏮ Început", callback_data=f"pend:{view}:0"))
+    if more:
+        nav.append(
+            InlineKeyboardButton("⏭ Următoarele", callback_data=f"pend:{view}:{orders[-1]['order_id']}")
+        )
+    if nav:
+        rows.append(nav)
+    return "\n".join(lines), InlineKeyboardMarkup(rows) if rows else None
+
+
+async def pending_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/pending [status|azi|maine|YYYY-MM-DD] – comenzile deschise, pe pagini, cu butoane de status."""
+    if not is_admin(update):
+        await update.message.reply_text("Această comandă este doar pentru admin.")
+        return
+    view = _pending_view(context.args[0] if context.args else None)
+    if view is None:
+        await update.message.reply_text(
+            "Folosire: /pending [new|accepted|paid|in_delivery|done|cancelled|azi|maine|YYYY-MM-DD]"
+        )
+        return
+    text, keyboard = pending_page(view)
+    await update.message.reply_text(text, reply_markup=keyboard)
+
+
+async def pending_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    if not is_admin(update):
+        return
+    _, view, after = query.data.split(":")
+    text, keyboard = pending_page(view, int(after))
+    try:
+        await query.edit_message_text(text, reply_markup=keyboard)
+    except BadRequest as e:
+        if "not modified" not in str(e):
+            raise
+
+
+async def metrics_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/metrics – contoarele botului curent (toți tenanții: GET /metrics pe serverul HTTP)."""
+    if not is_admin(update):
+        await update.message.reply_text("Această comandă este doar pentru admin.")
+        return
+    t = tenant()
+    lines = [f"📈 Metrici {t.name}:"]
+    lines += [f"• {key}: {value}" for key, value in t.metrics_snapshot().items()]
+    await update.message.reply_text("\n".join(lines))
+
+
+def _format_ai_counter(counter: Dict[str, Any]) -> str:
+    calls = counter["calls"]
+    if not calls:
+        return "0 apeluri"
+    tokens = (counter["prompt_tokens"] + counter["completion_tokens"]) / calls
+    return (
+        f"{calls} apeluri, ${counter['cost']:.4f}, {tokens:.0f} tok/apel, "
+        f"{counter['latency'] / calls * 1000:.0f} ms"
+    )
+
+
+async def ai_cost_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/ai_cost [zile] – consumul AI de azi (flow, model, top useri) și tendința pe ultimele zile."""
+    if not is_admin(update):
+        await update.message.reply_text("Această comandă este doar pentru admin.")
+        return
+    t = tenant()
+    usage = t.ai_usage
+    try:
+        days = max(1, min(int(context.args[0]), usage.retention_days)) if context.args else 7
+    except ValueError:
+        days = 7
+    today = usage.today()
+    bucket = usage.days.get(today.isoformat())
+
+    budget = (
+        f"${usage.spent_today():.4f} / ${usage.daily_budget:g} "
+        f"({usage.spent_today() / usage.daily_budget:.0%})"
+        if usage.daily_budget > 0
+        else f"${usage.spent_today():.4f} (fără buget)"
+    )
+    lines = [f"💸 Cost AI {t.name} — {today.isoformat()}", f"Buget azi: {budget}, mod: {usage.mode()}"]
+    if bucket and bucket["calls"]:
+        lines.append(f"Total: {_format_ai_counter(bucket)}")
+        lines.append("\nPe flow:")
+        lines += [f"• {flow}: {_format_ai_counter(c)}" for flow, c in sorted(bucket["flows"].items())]
+        lines.append("\nPe model:")
+        lines += [f"• {model}: {_format_ai_counter(c)}" for model, c in sorted(bucket["models"].items())]
+        top_users = sorted(bucket["users"].items(), key=lambda x: x[1]["cost"], reverse=True)[:5]
+        if top_users:
+            lines.append("\nTop utilizatori:")
+            lines += [f"• {user}: {_format_ai_counter(c)}" for user, c in top_users]
+    else:
+        lines.append("Astăzi nu au fost apeluri AI.")
+    table = t.ai_precomputed.snapshot()
+    lines.append(
+        f"Precalculate (catalog {table['version']}): {table['profiles']} profiluri, "
+        f"folosite {table['hits']}, lipsă {table['misses']}, nerecunoscute {table['unmatched']}"
+    )
+    if bucket and bucket["degraded"]:
+        lines.append("\nEconomii (buget): " + ", ".join(f"{k} ×{v}" for k, v in sorted(bucket["degraded"].items())))
+
+    # tendința: cost per consultație și tokeni per apel, zi cu zi
+    lines.append(f"\n📉 Ultimele {days} zile:")
+    for offset in range(days - 1, -1, -1):
+        day = today - timedelta(days=offset)
+        day_bucket = usage.days.get(day.isoformat())
+        if not day_bucket or not day_bucket["calls"]:
+            lines.append(f"• {day.isoformat()}: —")
+            continue
+        consultations = t.report_aggregates.summary(day, day)["ai_consultations"]
+        per_consultation = (
+            f", ${day_bucket['cost'] / consultations:.4f}/consultație" if consultations else ""
+        )
+        lines.append(f"• {day.isoformat()}: {_format_ai_counter(day_bucket)}{per_consultation}")
+    await update.message.reply_text("\n".join(lines))
+
+
+# ----------------- Diagnoză: profiler & memorie -----------------
+
+
+class SamplingProfiler:
+    """Profiler statistic: un thread citește periodic stiva event loop-ului.
+
+    Nu instrumentează nimic, deci în afara unei sesiuni /profile costul e zero,
+    iar în timpul ei e un `sys._current_frames()` la fiecare `interval` secunde.
+    """
+
+    IDLE_FUNCTIONS = {"select", "poll", "epoll", "_run_once", "run_forever"}
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._lock = threading.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    def run(self, thread_id: int, seconds: float) -> str:
+        if not self._lock.acquire(blocking=False):
+            return "Un profil rulează deja."
+        # cu switch interval mic, thread-ul de eșantionare primește GIL-ul și în
+        # mijlocul callback-urilor scurte, nu doar când loop-ul stă în select()
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(switch_interval, self.interval / 5))
+        try:
+            return self._sample(thread_id, seconds)
+        finally:
+            sys.setswitchinterval(switch_interval)
+            self._lock.release()
+
+    def _sample(self, thread_id: int, seconds: float) -> str:
+        own: Dict[str, int] = {}
+        inclusive: Dict[str, int] = {}
+        samples = idle = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                samples += 1
+                if frame.f_code.co_name in self.IDLE_FUNCTIONS:
+                    idle += 1
+                else:
+                    top = self._label(frame)
+                    own[top] = own.get(top, 0) + 1
+                    seen = set()
+                    while frame is not None:
+                        label = self._label(frame)
+                        if label not in seen:
+                            seen.add(label)
+                            inclusive[label] = inclusive.get(label, 0) + 1
+                        frame = frame.f_back
+            time.sleep(self.interval)
+        return self._report(samples, idle, own, inclusive)
+
+    @staticmethod
+    def _label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    @staticmethod
+    def _report(samples: int, idle: int, own: Dict[str, int], inclusive: Dict[str, int]) -> str:
+        if not samples:
+            return "Nu am prins niciun eșantion."
+
+        def top(counts: Dict[str, int]) -> str:
+            rows = sorted(counts.items(), key=lambda x: x[1], reverse=True)[:10]
+            return "\n".join(f"{cnt / samples:6.1%}  {label}" for label, cnt in rows) or "—"
+
+        return (
+            f"🔥 Profil: {samples} eșantioane, event loop liber {idle / samples:.0%}\n\n"
+            f"Top funcții (timp propriu):\n{top(own)}\n\n"
+            f"Top funcții (inclusiv apelurile):\n{top(inclusive)}"
+        )
+
+
+profiler = SamplingProfiler()
+
+
+async def _run_profile(bot, chat_id: int, thread_id: int, seconds: float):
+    report = await asyncio.to_thread(profiler.run, thread_id, seconds)
+    await bot.send_message(chat_id, report[:4000])
+
+
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/profile [secunde] – eșantionează event loop-ul și trimite funcțiile fierbinți."""
+    if not is_admin(update):
+        await update.message.reply_text("Această comandă este doar pentru admin.")
+        return
+    if profiler.busy:
+        await update.message.reply_text("Un profil rulează deja.")
+        return
+    try:
+        seconds = min(max(float(context.args[0]), 1), 120) if context.args else 10
+    except ValueError:
+        seconds = 10
+    await update.message.reply_text(f"⏱ Profilez event loop-ul {seconds:.0f}s...")
+    # handler-ul se termină imediat; eșantionarea rulează în fundal
+    shutdown.track(
+        _run_profile(context.bot, update.effective_chat.id, threading.get_ident(), seconds),
+        name="profile",
+    )
+
+
+_memsnap_baseline: Dict[str, Any] = {}
+
+
+def _tracked_structures(application) -> Dict[str, int]:
+    """Mărimea structurilor care pot crește nelimitat (număr de elemente)."""
+    t = tenant()
+    return {
+        "orders": len(t.order_book),
+        "user_data": len(application.user_data),
+        "chat_data": len(application.chat_data),
+        "seen_updates": len(t.seen_updates._seen),
+        "support_relay": len(t.support_relay.routes),
+        "photo_cache": len(t.photo_cache.file_ids),
+        "payment_invoices": len(t.payment_ledger.invoices),
+        "reservations": len(t.inventory.reservations),
+        "customers": len(t.customers.users),
+    }
+
+
+def _memory_diff(previous, structures_before: Dict[str, int], structures_now: Dict[str, int]) -> tuple:
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__)]
+    )
+    lines = []
+    for stat in snapshot.compare_to(previous, "lineno")[:10]:
+        frame = stat.traceback[0]
+        lines.append(
+            f"{stat.size_diff / 1024:+8.1f} KiB ({stat.count_diff:+d})  "
+            f"{os.path.basename(frame.filename)}:{frame.lineno}"
+        )
+    current, peak = tracemalloc.get_traced_memory()
+    struct_lines = [
+        f"• {name}: {count} ({count - structures_before.get(name, count):+d})"
+        for name, count in structures_now.items()
+    ]
     text = (
-        f"📊 Raport pentru azi ({today.isoformat()}):\n\n"
-        f"🧾 Număr comenzi: {count}\n"
-        f"💰 Total estimat: {total} MDL\n\n"
-        f"🏆 Top produse:\n{top_str if top_str else '—'}"
+        f"🧠 Memorie urmărită: {current / 1048576:.1f} MiB (peak {peak / 1048576:.1f} MiB)\n\n"
+        "Cele mai mari creșteri de la snapshot-ul anterior:\n"
+        + ("\n".join(lines) or "—")
+        + "\n\nStructuri:\n"
+        + "\n".join(struct_lines)
     )
-    await update.message.reply_text(text)
+    return snapshot, text
+
+
+async def memsnap_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/memsnap – pornește tracemalloc / arată diferența față de snapshot-ul anterior;
+    /memsnap stop – oprește tracemalloc (overhead-ul există doar cât e pornit)."""
+    if not is_admin(update):
+        await update.message.reply_text("Această comandă este doar pentru admin.")
+        return
+    if context.args and context.args[0] == "stop":
+        tracemalloc.stop()
+        _memsnap_baseline.clear()
+        await update.message.reply_text("tracemalloc oprit.")
+        return
+    structures = _tracked_structures(context.application)
+    # tracemalloc poate fi deja pornit de PYTHONTRACEMALLOC=1, dar fără snapshot de bază
+    if "snapshot" not in _memsnap_baseline or not tracemalloc.is_tracing():
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _memsnap_baseline["snapshot"] = await asyncio.to_thread(tracemalloc.take_snapshot)
+        _memsnap_baseline["structures"] = structures
+        await update.message.reply_text(
+            "tracemalloc pornit. Rulează din nou /memsnap peste câteva minute pentru diferență; "
+            "/memsnap stop îl oprește."
+        )
+        return
+    snapshot, text = await asyncio.to_thread(
+        _memory_diff, _memsnap_baseline["snapshot"], _memsnap_baseline["structures"], structures
+    )
+    _memsnap_baseline.update(snapshot=snapshot, structures=structures)
+    await update.message.reply_text(text[:4000])
+
+
+# ----------------- Broadcast -----------------
+
+
+class Broadcaster:
+    """Trimite un mesaj tuturor clienților, cu rată limitată și checkpoint persistat.
+
+    Lista de destinatari se fixează la pornire; `cursor` arată până unde s-a ajuns,
+    așa că după crash/restart trimiterea continuă de unde a rămas.
+    """
+
+    def __init__(
+        self, state: PersistentState, customers: CustomerRegistry, rate: float, concurrency: int
+    ):
+        self._state = state
+        self.customers = customers
+        self.limiter = AsyncRateLimiter(rate, burst=max(1, concurrency))
+        self.concurrency = max(1, concurrency)
+        self._task: asyncio.Task | None = None
+        self._pausing = False
+
+    @property
+    def job(self) -> Dict[str, Any] | None:
+        return self._state.data.get("job")
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def create_job(self, text: str | None, from_chat_id: int | None, message_id: int | None):
+        self._state.data["job"] = {
+            "text": text,
+            "from_chat_id": from_chat_id,
+            "message_id": message_id,
+            "recipients": self.customers.active_ids(),
+            "cursor": 0,
+            "sent": 0,
+            "failed": 0,
+            "blocked": 0,
+            "status": "running",
+            "started_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self._checkpoint()
+
+    def _checkpoint(self):
+        self._state.mark_dirty()
+        self._state.flush()
+
+    def start(self, bot, report_chat_id: int | None):
+        if self.running or not self.job:
+            return
+        self.job["status"] = "running"
+        self._task = asyncio.create_task(self._run(bot, report_chat_id), name="broadcast")
+
+    async def stop(self, pause: bool = True):
+        """pause=False (oprire proces) lasă job-ul „running”, ca să fie reluat la pornire."""
+        self._pausing = pause
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _send_one(self, bot, user_id: int) -> str:
+        job = self.job
+        while True:
+            await self.limiter.acquire()
+            try:
+                if job["message_id"]:
+                    await bot.copy_message(user_id, job["from_chat_id"], job["message_id"])
+                else:
+                    await bot.send_message(user_id, job["text"])
+                return "sent"
+            except RetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+            except Forbidden:
+                self.customers.mark_blocked(user_id)
+                return "blocked"
+            except TelegramError as e:
+                logger.warning("Broadcast to %s failed: %r", user_id, e)
+                return "failed"
+
+    def stats_text(self, title: str = "📣 Broadcast") -> str:
+        job = self.job
+        if not job:
+            return "Nu există niciun broadcast."
+        total = len(job["recipients"])
+        done = job["cursor"]
+        elapsed = max(
+            1e-6,
+            (datetime.now(timezone.utc) - datetime.fromisoformat(job["started_at"])).total_seconds(),
+        )
+        return (
+            f"{title} — {job['status']}\n\n"
+            f"Progres: {done}/{total}\n"
+            f"✅ Trimise: {job['sent']}\n"
+            f"⛔ Blocat botul: {job['blocked']}\n"
+            f"⚠️ Erori: {job['failed']}\n"
+            f"⏱ Viteză medie: {job['sent'] / elapsed:.1f} msg/s"
+        )
+
+    async def _report(self, bot, chat_id: int | None, message_id: int | None) -> int | None:
+        if not chat_id:
+            return None
+        try:
+            if message_id:
+                await bot.edit_message_text(self.stats_text(), chat_id, message_id)
+                return message_id
+            msg = await bot.send_message(chat_id, self.stats_text())
+            return msg.message_id
+        except TelegramError as e:
+            logger.warning("Broadcast report failed: %r", e)
+            return message_id
+
+    async def _run(self, bot, report_chat_id: int | None):
+        job = self.job
+        recipients = job["recipients"]
+        report_msg_id = await self._report(bot, report_chat_id, None)
+        last_report = time.monotonic()
+        try:
+            while job["cursor"] < len(recipients):
+                chunk = recipients[job["cursor"]: job["cursor"] + self.concurrency]
+                results = await asyncio.gather(*(self._send_one(bot, uid) for uid in chunk))
+                for result in results:
+                    job[result] += 1
+                job["cursor"] += len(chunk)
+                self._state.mark_dirty()
+                if time.monotonic() - last_report >= BROADCAST_REPORT_SECONDS:
+                    await asyncio.to_thread(self._state.flush)
+                    report_msg_id = await self._report(bot, report_chat_id, report_msg_id)
+                    last_report = time.monotonic()
+            job["status"] = "done"
+        except asyncio.CancelledError:
+            job["status"] = "paused" if self._pausing else "running"
+            raise
+        finally:
+            self._checkpoint()
+            logger.info("Broadcast %s: %s/%s", job["status"], job["cursor"], len(recipients))
+            if job["status"] == "done":
+                await self._report(bot, report_chat_id, report_msg_id)
+
+
+async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/broadcast <text> sau /broadcast ca reply la mesajul (inclusiv foto) de trimis."""
+    t = tenant()
+    if not is_admin(update):
+        await update.message.reply_text("Această comandă este doar pentru admin.")
+        return
+    if t.broadcaster.running:
+        await update.message.reply_text("Un broadcast rulează deja. /broadcast_stop pentru pauză.")
+        return
+    reply = update.message.reply_to_message
+    parts = update.message.text.split(maxsplit=1)
+    if reply:
+        t.broadcaster.create_job(None, reply.chat_id, reply.message_id)
+    elif len(parts) == 2:
+        t.broadcaster.create_job(parts[1], None, None)
+    else:
+        await update.message.reply_text(
+            "Folosire: /broadcast <text> sau răspunde cu /broadcast la mesajul de trimis."
+        )
+        return
+    t.broadcaster.start(context.bot, update.effective_chat.id)
+
+
+async def broadcast_stop(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    t = tenant()
+    if not is_admin(update):
+        await update.message.reply_text("Această comandă este doar pentru admin.")
+        return
+    await t.broadcaster.stop()
+    await update.message.reply_text(t.broadcaster.stats_text())
+
+
+async def broadcast_resume(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    t = tenant()
+    if not is_admin(update):
+        await update.message.reply_text("Această comandă este doar pentru admin.")
+        return
+    job = t.broadcaster.job
+    if not job or job["status"] == "done":
+        await update.message.reply_text("Nu există niciun broadcast de reluat.")
+        return
+    t.broadcaster.start(context.bot, update.effective_chat.id)
+
+
+async def broadcast_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update):
+        await update.message.reply_text("Această comandă este doar pentru admin.")
+        return
+    await update.message.reply_text(tenant().broadcaster.stats_text())
+
+
+# ----------------- Tenanți (mai multe magazine într-un proces) -----------------
+
+# tenantul update-ului / task-ului curent; task-urile create îl moștenesc
+_CURRENT_TENANT: contextvars.ContextVar["Tenant"] = contextvars.ContextVar("tenant")
+_UPDATE_STARTED: contextvars.ContextVar[float] = contextvars.ContextVar(
+    "update_started", default=0.0
+)
+
+TENANTS: List["Tenant"] = []
+
+
+def tenant() -> "Tenant":
+    return _CURRENT_TENANT.get()
+
+
+def bind_tenant(application) -> "Tenant":
+    """Pentru codul care nu vine dintr-un update (joburi programate)."""
+    t = application.bot_data["tenant"]
+    _CURRENT_TENANT.set(t)
+    return t
+
+
+class TenantMetrics:
+    """Contoare per tenant; citite și din thread-ul HTTP, deci doar numere simple."""
+
+    def __init__(self):
+        self.updates = 0
+        self.errors = 0
+        self.handler_seconds = 0.0
+        self.slowest_update = 0.0
+        self.api_calls = 0
+        self.retry_after = 0
+
+    def record_update(self, seconds: float):
+        self.updates += 1
+        self.handler_seconds += seconds
+        self.slowest_update = max(self.slowest_update, seconds)
+
+
+class Tenant:
+    """Un magazin: bot, admin, catalog, texte și toate stările lui.
+
+    Fiecare tenant își persistă starea separat (`state_dir`); clientul Groq,
+    serverul HTTP, limiter-ul de ieșire și event loop-ul sunt comune.
+    `texts` suprascrie TEXTS cheie cu cheie; butoanele de meniu trebuie să
+    păstreze cuvintele după care le recunosc filtrele din build_application.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        token: str,
+        admin_chat_id: int | None = None,
+        support_chat_id: int | None = None,
+        payment_provider_token: str | None = None,
+        products: List[Dict[str, Any]] | None = None,
+        texts: Dict[str, Dict[str, str]] | None = None,
+        images_dir: str = IMAGES_DIR,
+        state_dir: str = STATE_DIR,
+        order_sync_url: str | None = None,
+        order_sync_file: str | None = None,
+        ai_daily_budget: float = AI_DAILY_BUDGET_USD,
+    ):
+        self.name = name
+        self.token = token
+        self.admin_chat_id = admin_chat_id
+        self.support_chat_id = support_chat_id
+        self.payment_provider_token = payment_provider_token
+        self.products = PRODUCTS if products is None else products
+        self.texts = {
+            lang: {**base, **(texts or {}).get(lang, {})} for lang, base in TEXTS.items()
+        }
+        self.images_dir = images_dir
+        self.metrics = TenantMetrics()
+        self.throttle = UserThrottle(THROTTLE_LIMITS)
+        self.admin_notifier = AdminNotifier(
+            ADMIN_DIGEST_WINDOW_SECONDS, ADMIN_INSTANT_MAX, ADMIN_DIGEST_MAX_ITEMS
+        )
+
+        if shared_store is not None:
+            # worker-i: conversațiile, reamintirile, plățile chatului etc. per proces,
+            # starea comună magazinului (comenzi, stoc, sloturi, agregate, cache-uri) în SQLite
+            state_dir = os.path.join(state_dir, f"worker-{WORKER_INDEX}")
+
+        def state(store: str) -> PersistentState:
+            return PersistentState(store, state_dir)
+
+        def shared(store: str) -> PersistentState | SharedState:
+            return state(store) if shared_store is None else SharedState(shared_store, f"{name}:{store}")
+
+        if shared_store is None:
+            self.order_book = OrderBook(OrderJournal("orders", state_dir))
+        else:
+            self.order_book = SharedOrderBook(shared_store, f"{name}:orders")
+        self.payment_ledger = PaymentLedger(state("payments"))
+        self.report_aggregates = ReportAggregates(
+            shared("report_aggregates"), REPORT_TIMEZONE, REPORT_RETENTION_DAYS
+        )
+        self.ai_usage = AiUsage(
+            shared("ai_usage"),
+            REPORT_TIMEZONE,
+            REPORT_RETENTION_DAYS,
+            AI_USER_STATS_DAYS,
+            ai_daily_budget,
+            AI_DEGRADE_AT,
+        )
+        self.ai_answers = AiAnswerCache(shared("ai_answers"), AI_ANSWER_CACHE_MAX)
+        if shared_store is None:
+            self.inventory = Inventory(state("inventory"), RESERVATION_TTL_MINUTES * 60)
+        else:
+            self.inventory = SharedInventory(shared_store, f"{name}:inventory", RESERVATION_TTL_MINUTES * 60)
+        self.inventory.seed(self.products)
+        # se golește singur când se schimbă catalogul (altă versiune)
+        self.ai_precomputed = AiPrecomputed(shared("ai_precomputed"), self.products, self.inventory)
+        windows = [w.strip() for w in SLOT_WINDOWS.split(",") if w.strip()]
+        if shared_store is None:
+            self.slot_scheduler = SlotScheduler(
+                state("delivery_slots"), windows, SLOT_DAYS_AHEAD, SLOT_TIMEZONE
+            )
+        else:
+            self.slot_scheduler = SharedSlotScheduler(
+                shared_store, f"{name}:delivery_slots", windows, SLOT_DAYS_AHEAD, SLOT_TIMEZONE
+            )
+        self.slot_scheduler.purge_past()
+        self.seen_updates = SeenUpdates(
+            SEEN_UPDATES_MAX, state("seen_updates"), SEEN_UPDATES_GUARD_SECONDS
+        )
+        self.customers = CustomerRegistry(shared("customers"))
+        self.order_sync = _build_order_sync(order_sync_url, order_sync_file)
+        self.product_index = ProductSearchIndex(self.products)
+        # file_id-urile sunt valabile doar pentru botul care a urcat poza
+        self.photo_cache = PhotoCache(shared("photo_cache"))
+        self.order_reminders = TimerWheel(state("order_reminders"))
+        # mesajul ajunge la suport din worker-ul clientului, reply-ul operatorului în al chatului de suport
+        self.support_relay = SupportRelay(SUPPORT_RELAY_MAX, shared("support_relay"))
+        self.broadcaster = Broadcaster(
+            state("broadcast"), self.customers, BROADCAST_RATE, BROADCAST_CONCURRENCY
+        )
+        with self.active():
+            self.catalog_pages = CatalogPages(self.products, CATALOG_PAGE_SIZE)
+        # paginile se recalculează doar când un produs trece din/în „epuizat”
+        self.inventory.on_availability_change = (
+            lambda product_id: self.catalog_pages.rebuild(self.products)
+        )
+
+    @contextlib.contextmanager
+    def active(self):
+        token = _CURRENT_TENANT.set(self)
+        try:
+            yield self
+        finally:
+            _CURRENT_TENANT.reset(token)
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        m = self.metrics
+        return {
+            "updates": m.updates,
+            "avg_update_ms": round(m.handler_seconds / m.updates * 1000, 1) if m.updates else 0.0,
+            "slowest_update_ms": round(m.slowest_update * 1000, 1),
+            "errors": m.errors,
+            "api_calls": m.api_calls,
+            "retry_after": m.retry_after,
+            "replays_dropped": self.seen_updates.dropped,
+            "orders": len(self.order_book),
+            "orders_open": len(self.order_book.open),
+            "admin_notifications": self.admin_notifier.snapshot(),
+            "throttled": sum(self.throttle.throttled.values()),
+            "customers": len(self.customers.users),
+            "ai_cost_today_usd": round(self.ai_usage.spent_today(), 4),
+            "ai_mode": self.ai_usage.mode(),
+            "ai_precomputed": self.ai_precomputed.snapshot(),
+        }
+
+
+def _parse_chat_id(value) -> int | None:
+    try:
+        return int(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def load_tenant_configs() -> List[Dict[str, Any]]:
+    """Argumentele pentru Tenant(...), câte unul per magazin.
+
+    Fără TENANTS_FILE: un singur magazin din variabilele de mediu, starea direct în STATE_DIR.
+    TENANTS_FILE e o listă JSON, de ex.:
+    [{"name": "cadolab", "token_env": "CADOLAB_TOKEN", "admin_chat_id": 123,
+      "payment_provider_token_env": "CADOLAB_PAY", "products_file": "cadolab.json",
+      "texts": {"ro": {"info": "..."}}, "images_dir": "images/cadolab", "ai_daily_budget_usd": 2}]
+    Tokenurile pot sta direct în fișier ("token") sau în env ("token_env").
+    Ingress-ul (WORKERS > 1) are nevoie doar de nume și token, worker-ii construiesc tenanții.
+    """
+    if not TENANTS_FILE:
+        if not TELEGRAM_TOKEN:
+            raise RuntimeError("TELEGRAM_TOKEN is missing")
+        return [
+            dict(
+                name="default",
+                token=TELEGRAM_TOKEN,
+                admin_chat_id=ADMIN_CHAT_ID,
+                support_chat_id=SUPPORT_CHAT_ID,
+                payment_provider_token=PAYMENT_PROVIDER_TOKEN,
+                order_sync_url=ORDER_SYNC_URL,
+                order_sync_file=ORDER_SYNC_FILE,
+            )
+        ]
+    with open(TENANTS_FILE, encoding="utf-8") as f:
+        configs = json.load(f)
+    result = []
+    for cfg in configs:
+        name = cfg.get("name") or ""
+        if not re.fullmatch(r"[\w-]+", name) or any(c["name"] == name for c in result):
+            raise RuntimeError(f"Invalid or duplicate tenant name: {name!r}")
+        token = cfg.get("token") or os.getenv(cfg.get("token_env", ""))
+        if not token:
+            raise RuntimeError(f"Tenant {name}: token is missing")
+        products = cfg.get("products")
+        if products is None and cfg.get("products_file"):
+            with open(cfg["products_file"], encoding="utf-8") as f:
+                products = json.load(f)
+        result.append(
+            dict(
+                name=name,
+                token=token,
+                admin_chat_id=_parse_chat_id(cfg.get("admin_chat_id")),
+                support_chat_id=_parse_chat_id(cfg.get("support_chat_id")),
+                payment_provider_token=cfg.get("payment_provider_token")
+                or os.getenv(cfg.get("payment_provider_token_env", "")),
+                products=products,
+                texts=cfg.get("texts"),
+                images_dir=cfg.get("images_dir", IMAGES_DIR),
+                state_dir=os.path.join(STATE_DIR, name),
+                order_sync_url=cfg.get("order_sync_url"),
+                order_sync_file=cfg.get("order_sync_file"),
+                ai_daily_budget=float(cfg.get("ai_daily_budget_usd", AI_DAILY_BUDGET_USD)),
+            )
+        )
+    return result
+
+
+def load_tenants(configs: List[Dict[str, Any]] | None = None) -> List[Tenant]:
+    tenants = [Tenant(**cfg) for cfg in (configs or load_tenant_configs())]
+    for t in tenants:
+        if not t.payment_provider_token:
+            logger.warning("Tenant %s: payment provider token is not set – payment will be disabled.", t.name)
+    return tenants
+
+
+async def bind_tenant_context(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Primul handler: tenantul botului care a primit update-ul + începutul cronometrării."""
+    bind_tenant(context.application)
+    _UPDATE_STARTED.set(time.monotonic())
+
+
+async def record_update_metrics(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Ultimul grup de handlere: durata procesării update-ului."""
+    started = _UPDATE_STARTED.get()
+    if started:
+        tenant().metrics.record_update(time.monotonic() - started)
+
+
+async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
+    context.application.bot_data["tenant"].metrics.errors += 1
+    logger.error("Unhandled error: %r", context.error, exc_info=context.error)
+
+
+# ----------------- Scale-out: ingress webhook + worker-i -----------------
+
+INGRESS: "Ingress | None" = None
+
+# tipurile de update cu `chat`; restul se împart după expeditor (= chatul privat al userului)
+_CHAT_UPDATE_KINDS = ("message", "edited_message", "channel_post", "edited_channel_post", "my_chat_member",
+                      "chat_member", "chat_join_request", "message_reaction")
+
+
+def shard_key(update: Dict[str, Any]) -> int:
+    """Chatul unui update JSON: toate update-urile unei conversații merg la același worker."""
+    for kind in _CHAT_UPDATE_KINDS:
+        if kind in update:
+            return update[kind]["chat"]["id"]
+    callback = update.get("callback_query")
+    if callback:
+        message = callback.get("message")
+        return message["chat"]["id"] if message else callback["from"]["id"]
+    for value in update.values():
+        if isinstance(value, dict) and isinstance(value.get("from"), dict):
+            return value["from"]["id"]
+    return 0
+
+
+class Ingress:
+    """Procesul principal cu WORKERS > 1: primește webhook-urile și le împarte worker-ilor.
+
+    Worker-ul se alege cu crc32(chat id) % N (stabil între restarturi, spre
+    deosebire de hash()); fiecare worker are o coadă multiprocessing FIFO, iar
+    aplicația PTB procesează update-urile în ordine, deci ordinea per chat se
+    păstrează. Coada plină → 503, Telegram retrimite mai târziu. Un worker
+    căzut e repornit pe aceeași coadă.
+    """
+
+    def __init__(self, configs: List[Dict[str, Any]], workers: int):
+        self.configs = configs
+        self.tokens = {cfg["name"]: cfg["token"] for cfg in configs}
+        self.secret = WEBHOOK_SECRET
+        self._ctx = multiprocessing.get_context("spawn")
+        self.queues = [self._ctx.Queue(WORKER_QUEUE_MAX) for _ in range(workers)]
+        self.processes: List[Any] = [None] * workers
+        self.routed = [0] * workers
+        self.rejected = 0
+        self.restarts = 0
+        self._stop = threading.Event()
+
+    def start_worker(self, index: int):
+        process = self._ctx.Process(
+            target=worker_main, args=(index, self.queues[index], self.configs), name=f"worker-{index}"
+        )
+        process.start()
+        self.processes[index] = process
+
+    def route(self, tenant_name: str, body: bytes) -> bool:
+        index = zlib.crc32(str(shard_key(json.loads(body))).encode()) % len(self.queues)
+        try:
+            self.queues[index].put_nowait((tenant_name, body))
+        except queue.Full:
+            self.rejected += 1
+            return False
+        self.routed[index] += 1
+        return True
+
+    def set_webhooks(self):
+        for name, token in self.tokens.items():
+            response = httpx.post(
+                f"{TELEGRAM_BASE_URL}/bot{token}/setWebhook",
+                data={"url": f"{WEBHOOK_URL.rstrip('/')}/webhook/{name}", "secret_token": self.secret},
+                timeout=30,
+            )
+            if not response.json().get("ok"):
+                raise RuntimeError(f"Tenant {name}: setWebhook failed: {response.text}")
+            logger.info("Webhook set for tenant %s", name)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+            "workers": [
+                {
+                    "index": i,
+                    "pid": p.pid if p else None,
+                    "alive": bool(p and p.is_alive()),
+                    "routed": self.routed[i],
+                    "queued": self.queues[i].qsize(),
+                }
+                for i, p in enumerate(self.processes)
+            ],
+        }
+
+    def run(self):
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: self._stop.set())
+        for index in range(len(self.queues)):
+            self.start_worker(index)
+        self.set_webhooks()
+        logger.info("Ingress running with %s workers", len(self.queues))
+        while not self._stop.wait(1.0):
+            for index, process in enumerate(self.processes):
+                if not process.is_alive():
+                    logger.error("Worker %s exited with code %s, restarting", index, process.exitcode)
+                    self.restarts += 1
+                    self.start_worker(index)
+        # update-urile deja primite se procesează înainte de oprirea worker-ilor
+        for q in self.queues:
+            q.put(None)
+        deadline = time.monotonic() + SHUTDOWN_DEADLINE_SECONDS + 5
+        for process in self.processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.error("Worker %s did not stop in time, terminating", process.name)
+                process.terminate()
+
+
+def _feed_updates(updates, applications: Dict[str, Any], loop, stop_event: asyncio.Event):
+    """Thread în worker: coada de la ingress → update_queue-ul aplicației, în ordinea primirii."""
+    while True:
+        item = updates.get()
+        if item is None:
+            loop.call_soon_threadsafe(stop_event.set)
+            return
+        name, body = item
+        application = applications.get(name)
+        if application is None:
+            continue
+        try:
+            update = Update.de_json(json.loads(body), application.bot)
+        except Exception as e:
+            logger.error("Dropping malformed update for %s: %r", name, e)
+            continue
+        asyncio.run_coroutine_threadsafe(application.update_queue.put(update), loop).result()
+
+
+def worker_main(index: int, updates, configs: List[Dict[str, Any]]):
+    """Punctul de intrare al unui proces worker (multiprocessing spawn)."""
+    global WORKER_INDEX, shared_store
+    WORKER_INDEX = index
+    shared_store = SharedStore(os.path.join(STATE_DIR, "shared.sqlite"))
+    if traffic_recorder:
+        traffic_recorder.directory = os.path.join(traffic_recorder.directory, f"worker-{index}")
+    tenants = load_tenants(configs)
+    TENANTS.extend(tenants)
+    asyncio.run(run_bots(tenants, updates))
+
+
+def run_ingress():
+    global INGRESS
+    if not WEBHOOK_URL:
+        raise RuntimeError("WORKERS > 1 needs WEBHOOK_URL (the public URL of this HTTP server)")
+    INGRESS = Ingress(load_tenant_configs(), WORKERS)
+    threading.Thread(target=run_http_server, daemon=True).start()
+    INGRESS.run()
 
 
 # ----------------- Main -----------------
 
 
-def main():
-    if not TELEGRAM_TOKEN:
-        raise RuntimeError("TELEGRAM_TOKEN is missing")
+async def start_tenant(application):
+    """Pornește ce ține de un magazin; rulează cu tenantul lui activ."""
+    t = tenant()
+    shutdown.on_drain(f"{t.name}:broadcast", lambda: t.broadcaster.stop(pause=False))
+    shutdown.on_drain(
+        f"{t.name}:admin-digest",
+        t.admin_notifier.drain,
+        lambda: f"{t.admin_notifier.snapshot()['pending']} admin notifications",
+    )
+    if t.order_sync:
+        await t.order_sync.start()
+        shutdown.on_drain(f"{t.name}:order-sync", t.order_sync.stop, t.order_sync.pending_keys)
+    BACKGROUND_TASKS.append(
+        asyncio.create_task(reservation_expiry_loop(), name=f"{t.name}:reservation-expiry")
+    )
+    BACKGROUND_TASKS.append(
+        asyncio.create_task(
+            t.order_reminders.run(functools.partial(send_order_reminder, application)),
+            name=f"{t.name}:order-reminders",
+        )
+    )
+    if AI_PRECOMPUTE_CONCURRENCY > 0 and is_primary_worker():
+        BACKGROUND_TASKS.append(
+            asyncio.create_task(ai_precompute_loop(), name=f"{t.name}:ai-precompute")
+        )
+    job = t.broadcaster.job
+    if job and job["status"] == "running":
+        # procesul a murit în timpul unui broadcast – continuăm de la checkpoint
+        t.broadcaster.start(application.bot, t.admin_chat_id)
+
 
-    application = ApplicationBuilder().token(TELEGRAM_TOKEN).build()
+async def run_bots(tenants: List[Tenant], updates=None):
+    """Toți boții pe același event loop; oprirea (SIGINT/SIGTERM) e comună.
+
+    `updates` – coada de la ingress (proces worker): fără polling, update-urile vin de acolo.
+    """
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, shutdown.request, stop_event.set)
+        except NotImplementedError:  # Windows
+            pass
+    BACKGROUND_TASKS.append(asyncio.create_task(state_flush_loop(), name="state-flush"))
+    if traffic_recorder:
+        traffic_recorder.start()
+        shutdown.on_drain("traffic-recorder", traffic_recorder.close)
+
+    applications = []
+    for t in tenants:
+        # polling-ul, joburile și buclele pornite aici moștenesc tenantul
+        with t.active():
+            application = build_application(t)
+            try:
+                await application.initialize()
+            except TelegramError as e:
+                logger.error("Tenant %s failed to start: %r", t.name, e)
+                continue
+            await start_tenant(application)
+            if updates is None:
+                await application.updater.start_polling()
+            await application.start()
+        applications.append(application)
+    if not applications:
+        raise RuntimeError("No bot could be started")
+    logger.info("Running %s bot(s): %s", len(applications), [a.bot.username for a in applications])
+    if updates is not None:
+        by_name = {a.bot_data["tenant"].name: a for a in applications}
+        threading.Thread(
+            target=_feed_updates, args=(updates, by_name, loop, stop_event), name="ingress-feed", daemon=True
+        ).start()
+
+    await stop_event.wait()
+    for application in applications:
+        if application.updater.running:
+            await application.updater.stop()
+        await application.stop()
+    for task in BACKGROUND_TASKS:
+        task.cancel()
+    await asyncio.gather(*BACKGROUND_TASKS, return_exceptions=True)
+    BACKGROUND_TASKS.clear()
+    await shutdown.drain()
+    for application in applications:
+        await application.shutdown()
+
+
+def build_application(t: Tenant, request: BaseRequest | None = None):
+    """`request` – transport Bot API alternativ (replay.py folosește unul fals)."""
+    builder = (
+        ApplicationBuilder()
+        .token(t.token)
+        .base_url(f"{TELEGRAM_BASE_URL}/bot")
+        .base_file_url(f"{TELEGRAM_BASE_URL}/file/bot")
+        .rate_limiter(BotRateLimiter(outbound_limiter, BOT_SEND_RATE, t.metrics))
+    )
+    if request is not None:
+        builder = builder.request(request).get_updates_request(request)
+    application = builder.build()
+    application.bot_data["tenant"] = t
 
     # Conversație AI cadouri
     gift_conv = ConversationHandler(
@@ -1192,6 +6324,10 @@ def main():
                 order_from_menu_entry,
             ),
             CallbackQueryHandler(order_from_catalog_callback, pattern=r"^order:"),
+            CallbackQueryHandler(order_resume_callback, pattern=r"^order_resume:"),
+            CommandHandler(
+                "start", order_from_deep_link, filters=filters.Regex(r"^/start order-")
+            ),
         ],
         states={
             ORDER_PRODUCT: [
@@ -1208,7 +6344,10 @@ def main():
             ORDER_ADDRESS: [
                 MessageHandler(filters.TEXT & ~filters.COMMAND, order_set_address)
             ],
-            ORDER_DATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, order_set_date)],
+            ORDER_DATE: [
+                CallbackQueryHandler(order_pick_slot, pattern=r"^slot:"),
+                MessageHandler(filters.TEXT & ~filters.COMMAND, order_set_date),
+            ],
             ORDER_PAYMENT: [
                 MessageHandler(filters.TEXT & ~filters.COMMAND, order_set_payment)
             ],
@@ -1256,11 +6395,25 @@ def main():
         per_message=False,
     )
 
-    application.add_handler(CommandHandler("start", start))
+    # (înregistrare,) tenant, context de log, apoi deduplicare – înaintea tuturor handler-elor
+    if traffic_recorder:
+        application.add_handler(TypeHandler(Update, record_update), group=-4)
+    application.add_handler(TypeHandler(Update, bind_tenant_context), group=-3)
+    application.add_handler(TypeHandler(Update, bind_log_context), group=-2)
+    application.add_handler(TypeHandler(Update, drop_replayed_updates), group=-1)
+    application.add_handler(TypeHandler(Update, record_update_metrics), group=100)
+    application.add_error_handler(error_handler)
+
+    application.add_handler(
+        CommandHandler("start", start, filters=~filters.Regex(r"^/start order-"))
+    )
     application.add_handler(CallbackQueryHandler(set_language, pattern=r"^lang:"))
     application.add_handler(CallbackQueryHandler(show_catalog_from_callback, pattern=r"^menu:catalog$"))
+    application.add_handler(CallbackQueryHandler(catalog_page_callback, pattern=r"^cat:"))
+    application.add_handler(CallbackQueryHandler(catalog_photos_callback, pattern=r"^catphoto:"))
     application.add_handler(CallbackQueryHandler(ai_message_callback, pattern=r"^ai:message$"))
-    application.add_handler(CallbackQueryHandler(order_admin_decision, pattern=r"^admin_"))
+    application.add_handler(CallbackQueryHandler(order_admin_decision, pattern=r"^(ord|admin_accept|admin_reject):"))
+    application.add_handler(CallbackQueryHandler(pending_page_callback, pattern=r"^pend:"))
 
     application.add_handler(
         MessageHandler(filters.Regex("Catalog cadouri|Каталог подарков"), show_catalog)
@@ -1274,19 +6427,62 @@ def main():
 
     application.add_handler(CommandHandler("admin", admin_panel))
     application.add_handler(CommandHandler("raport_azi", raport_azi))
+    schedule_reports(application)
+    application.add_handler(CommandHandler("stoc", stock_command))
+    application.add_handler(CommandHandler("pending", pending_command))
+    application.add_handler(CommandHandler("abuse", abuse_command))
+    application.add_handler(CommandHandler("metrics", metrics_command))
+    application.add_handler(CommandHandler("ai_cost", ai_cost_command))
+    application.add_handler(CommandHandler("profile", profile_command))
+    application.add_handler(CommandHandler("memsnap", memsnap_command))
+    application.add_handler(CommandHandler("broadcast", broadcast_command))
+    application.add_handler(CommandHandler("broadcast_stop", broadcast_stop))
+    application.add_handler(CommandHandler("broadcast_resume", broadcast_resume))
+    application.add_handler(CommandHandler("broadcast_status", broadcast_status))
 
     application.add_handler(gift_conv)
     application.add_handler(order_conv)
     application.add_handler(support_conv)
 
+    # Relay suport: reply-urile operatorilor ajung la clienți și invers
+    support_chat_id = get_support_chat_id()
+    if support_chat_id:
+        application.add_handler(
+            MessageHandler(
+                filters.Chat(support_chat_id) & filters.REPLY & ~filters.COMMAND,
+                support_operator_reply,
+            )
+        )
+    application.add_handler(
+        MessageHandler(
+            filters.ChatType.PRIVATE & filters.REPLY & filters.TEXT & ~filters.COMMAND,
+            support_customer_reply,
+        )
+    )
+
+    # Căutare inline (@bot text)
+    application.add_handler(InlineQueryHandler(inline_product_search))
+
     # Handlere pentru plăți
     application.add_handler(PreCheckoutQueryHandler(precheckout_callback))
     application.add_handler(MessageHandler(filters.SUCCESSFUL_PAYMENT, successful_payment_callback))
+    return application
+
+
+def main():
+    check_groq_config()
+    if WORKERS > 1:
+        # procesul acesta devine ingress-ul; boții rulează în worker-i
+        run_ingress()
+        return
+    tenants = load_tenants()
+    TENANTS.extend(tenants)
 
-    # HTTP server pentru Render
+    # HTTP server pentru Render – unul singur pentru toți tenanții
     threading.Thread(target=run_http_server, daemon=True).start()
 
-    application.run_polling()
+    # semnalele de oprire sunt tratate de ShutdownCoordinator (vezi run_bots)
+    asyncio.run(run_bots(tenants))
 
 
 if __name__ == "__main__":
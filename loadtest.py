@@ -0,0 +1,627 @@
+"""Test de încărcare end-to-end: bot.py rulează ca proces separat, cu un Bot API și un Groq falși.
+
+Folosire:
+    python loadtest.py [--users 50] [--mix catalog=5,ai=2,order=3] [--duration 60 | --iterations 1]
+        [--api-latency-ms 30] [--groq-latency-ms 800] [--error-rate 0.01] [--think-ms 300]
+        [--workers 1] [--json raport.json]
+
+Serverul fals (getUpdates, setWebhook, sendMessage, editMessageText, sendInvoice,
+answerCallbackQuery etc.) răspunde după `--api-latency-ms` și întoarce 429 pentru
+o fracțiune `--error-rate` din trimiteri. Tot el servește /openai/v1/chat/completions
+ca Groq stub. Botul e pornit cu TELEGRAM_BASE_URL / GROQ_BASE_URL spre el; cu
+`--workers N` (N > 1) rulează ingress-ul + worker-ii, iar update-urile vin prin webhook.
+`--no-spawn` pornește doar serverul și utilizatorii (botul îl pornești tu, cu
+variabilele afișate).
+
+Utilizatorii virtuali parcurg fluxurile catalog, consultant AI și comandă (cu plată),
+cu pauza `--think-ms` între pași. Latența unui pas = de la livrarea update-ului până
+la primul apel Bot API al botului către chatul respectiv. La final: debit, p50/p90/p99
+per pas și apelurile Bot API; `--json` salvează raportul.
+"""
+
+import argparse
+import asyncio
+import email.parser
+import http.server
+import itertools
+import json
+import math
+import os
+import random
+import signal
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import parse_qsl
+
+import httpx
+
+TOKEN = "123456:loadtest"
+ADMIN_CHAT_ID = 1
+FIRST_USER_ID = 100000
+
+# metodele care trimit ceva unui chat (pot primi 429 injectat)
+SEND_METHODS = {
+    "sendMessage", "editMessageText", "editMessageReplyMarkup", "sendInvoice",
+    "sendPhoto", "sendMediaGroup", "copyMessage",
+}
+
+
+def _bot_texts() -> dict:
+    """Textele RO ale botului (butoanele de meniu) și primul produs din catalog."""
+    os.environ.setdefault("TELEGRAM_TOKEN", TOKEN)
+    os.environ.setdefault("GROQ_API_KEY", "loadtest")
+    import bot
+
+    return {**bot.TEXTS[bot.LANG_RO], "product": bot.PRODUCTS[0]["name_ro"]}
+
+
+def build_flows(texts: dict) -> dict:
+    """Pașii fiecărui flux: ("text", mesaj), ("press", prefix callback), ("press?", opțional), ("pay", None)."""
+    start = [("text", "/start"), ("press", "lang:ro")]
+    return {
+        "catalog": start + [
+            ("text", texts["btn_catalog"]),
+            ("press?", "cat:"),
+            ("text", texts["btn_back"]),
+        ],
+        "ai": start + [
+            ("text", texts["btn_ai"]),
+            ("text", "prietenei mele"),
+            ("text", "zi de naștere"),
+            ("text", "25"),
+            ("text", "prietenă"),
+            ("text", "500"),
+            ("text", "cafea, cărți, plante"),
+        ],
+        "order": start + [
+            ("text", texts["btn_order"]),
+            ("press?", "order_reuse_no"),
+            ("text", texts["product"]),
+            ("text", "Ana Test"),
+            ("text", "+37369000000"),
+            ("text", "Chișinău"),
+            ("text", texts["btn_delivery_courier"]),
+            ("text", "str. Testului 1"),
+            ("press?", "slot:"),
+            ("text", "Card"),
+            ("text", "—"),
+            ("text", "Zi de naștere"),
+            ("text", "Instagram"),
+            ("text", texts["btn_upsell_card"]),
+            ("press", "order_confirm"),
+            ("pay", None),
+        ],
+    }
+
+
+class FakeTelegram:
+    """Starea Bot API-ului fals: update-uri de livrat, webhook-uri și ce trimite botul.
+
+    Cererile HTTP vin pe thread-urile serverului; evenimentele pentru utilizatorii
+    virtuali ajung în cozile lor asyncio prin `call_soon_threadsafe`.
+    """
+
+    def __init__(self, loop, latency: float, error_rate: float, retry_after: int, groq_latency: float):
+        self.loop = loop
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.groq_latency = groq_latency
+        self._lock = threading.Condition()
+        self._updates: list = []
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self.webhook: tuple | None = None
+        self.ready = threading.Event()
+        self.inboxes: dict = {}
+        self.query_chats: dict = {}  # callback_query / pre_checkout_query id -> chat
+        self.calls: dict = {}
+        self.injected_429 = 0
+        self.admin_messages = 0
+        self.groq_calls = 0
+        self._http = httpx.AsyncClient(timeout=30)
+
+    # --- update-uri spre bot ---
+
+    def next_update_id(self) -> int:
+        return next(self._update_ids)
+
+    async def deliver(self, update: dict) -> float:
+        """Pune update-ul la dispoziția botului; întoarce momentul livrării (monotonic)."""
+        if self.webhook:
+            url, secret = self.webhook
+            sent_at = time.monotonic()
+            response = await self._http.post(
+                url, json=update, headers={"X-Telegram-Bot-Api-Secret-Token": secret}
+            )
+            if response.status_code != 200:
+                raise RuntimeError(f"webhook answered {response.status_code}")
+            return sent_at
+        with self._lock:
+            self._updates.append(update)
+            self._lock.notify_all()
+        return time.monotonic()
+
+    def _get_updates(self, params: dict) -> list:
+        offset = int(params.get("offset") or 0)
+        timeout = float(params.get("timeout") or 0)
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self._updates = [u for u in self._updates if u["update_id"] >= offset]
+            while not self._updates and time.monotonic() < deadline:
+                self._lock.wait(deadline - time.monotonic())
+            limit = int(params.get("limit") or 100)
+            return self._updates[:limit]
+
+    # --- apeluri ale botului ---
+
+    def _emit(self, chat_id, event: dict):
+        inbox = self.inboxes.get(int(chat_id)) if chat_id is not None else None
+        if inbox is not None:
+            self.loop.call_soon_threadsafe(inbox.put_nowait, event)
+
+    def _message(self, params: dict) -> dict:
+        message = {
+            "message_id": int(params.get("message_id") or next(self._message_ids)),
+            "date": int(time.time()),
+            "chat": {"id": int(params.get("chat_id") or 0), "type": "private"},
+            "from": {"id": 123456, "is_bot": True, "first_name": "Loadtest"},
+        }
+        if "text" in params:
+            message["text"] = params["text"]
+        if isinstance(params.get("reply_markup"), dict) and "inline_keyboard" in params["reply_markup"]:
+            message["reply_markup"] = params["reply_markup"]
+        return message
+
+    def _photo(self, params: dict) -> dict:
+        message = self._message(params)
+        n = message["message_id"]
+        message["photo"] = [{"file_id": f"lt-{n}", "file_unique_id": f"u{n}", "width": 1, "height": 1}]
+        return message
+
+    def call(self, method: str, params: dict) -> tuple:
+        """(status HTTP, răspuns JSON) pentru o metodă Bot API."""
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if method == "getUpdates":
+            self.ready.set()
+            return 200, {"ok": True, "result": self._get_updates(params)}
+        if self.latency:
+            time.sleep(self.latency)
+        if method in SEND_METHODS and random.random() < self.error_rate:
+            self.injected_429 += 1
+            return 429, {
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }
+        if method in ("sendMessage", "editMessageText") and not params.get("text"):
+            return 400, {"ok": False, "error_code": 400, "description": "Bad Request: message text is empty"}
+
+        chat_id = params.get("chat_id")
+        if method == "getMe":
+            result = {"id": 123456, "is_bot": True, "first_name": "Loadtest", "username": "loadtest_bot"}
+        elif method == "setWebhook":
+            self.webhook = (params["url"], params.get("secret_token") or "")
+            self.ready.set()
+            result = True
+        elif method == "deleteWebhook":
+            self.webhook = None
+            result = True
+        elif method in ("sendMessage", "editMessageText", "editMessageReplyMarkup", "sendInvoice", "copyMessage"):
+            result = self._message(params)
+        elif method == "sendPhoto":
+            result = self._photo(params)
+        elif method == "sendMediaGroup":
+            result = [self._photo(params) for _ in params.get("media") or []]
+        elif method in ("answerCallbackQuery", "answerPreCheckoutQuery"):
+            key = params.get("callback_query_id") or params.get("pre_checkout_query_id")
+            chat_id = self.query_chats.pop(key, None)
+            result = True
+        else:
+            result = True
+        if chat_id is not None and int(chat_id) == ADMIN_CHAT_ID and method in SEND_METHODS:
+            self.admin_messages += 1
+        self._emit(chat_id, {"method": method, "params": params, "result": result, "at": time.monotonic()})
+        return 200, {"ok": True, "result": result}
+
+    def groq_completion(self, body: dict) -> dict:
+        self.groq_calls += 1
+        if self.groq_latency:
+            time.sleep(self.groq_latency)
+        content = "Recomandare de test: Sweet Box Clasic, cu o felicitare personalizată."
+        prompt_tokens = sum(len(m.get("content") or "") for m in body.get("messages", [])) // 4
+        completion_tokens = len(content) // 4
+        return {
+            "id": f"chatcmpl-{self.groq_calls}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+
+def _parse_params(content_type: str, body: bytes) -> dict:
+    """Parametrii unei cereri PTB: form urlencoded, multipart (fișiere) sau JSON."""
+    if content_type.startswith("application/json"):
+        return json.loads(body or b"{}")
+    if content_type.startswith("multipart/form-data"):
+        message = email.parser.BytesParser().parsebytes(
+            b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body
+        )
+        pairs = [
+            (part.get_param("name", header="content-disposition"), part.get_payload(decode=True))
+            for part in message.get_payload()
+            if not part.get_filename()
+        ]
+        pairs = [(name, value.decode("utf-8", "replace")) for name, value in pairs if name]
+    else:
+        pairs = parse_qsl(body.decode("utf-8"), keep_blank_values=True)
+    params = {}
+    for name, value in pairs:
+        # PTB serializează câmpurile compuse (reply_markup, media, ...) ca JSON
+        if value[:1] in ("{", "["):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+        params[name] = value
+    return params
+
+
+def make_handler(api: FakeTelegram):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status: int, payload: dict):
+            body = json.dumps(payload, ensure_ascii=False).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _handle(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            content_type = self.headers.get("Content-Type", "")
+            path = self.path.split("?", 1)[0]
+            if path.endswith("/chat/completions"):
+                self._reply(200, api.groq_completion(json.loads(body or b"{}")))
+                return
+            parts = path.strip("/").split("/")
+            if len(parts) != 2 or not parts[0].startswith("bot"):
+                self._reply(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+                return
+            status, payload = api.call(parts[1], _parse_params(content_type, body))
+            self._reply(status, payload)
+
+        do_GET = _handle
+        do_POST = _handle
+
+    return Handler
+
+
+class _Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class VirtualUser:
+    """Un client Telegram simulat: trimite pasul, așteaptă răspunsurile botului, măsoară."""
+
+    def __init__(self, api: FakeTelegram, user_id: int, args, latencies: dict, stats: dict):
+        self.api = api
+        self.user_id = user_id
+        self.args = args
+        self.latencies = latencies
+        self.stats = stats
+        self.inbox: asyncio.Queue = asyncio.Queue()
+        api.inboxes[user_id] = self.inbox
+        self.keyboards: list = []  # mesajele cu butoane inline primite, cel mai nou la final
+        self.invoice: dict | None = None
+        self.pre_checkout_ok: bool | None = None
+        self._message_id = 0
+
+    def _user(self) -> dict:
+        return {"id": self.user_id, "is_bot": False, "first_name": f"VU{self.user_id}", "language_code": "ro"}
+
+    def _message(self, **fields) -> dict:
+        self._message_id += 1
+        return {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": self.user_id, "type": "private", "first_name": f"VU{self.user_id}"},
+            "from": self._user(),
+            **fields,
+        }
+
+    def _text_update(self, text: str) -> dict:
+        message = self._message(text=text)
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return {"update_id": self.api.next_update_id(), "message": message}
+
+    def _find_button(self, prefix: str) -> tuple | None:
+        for message in reversed(self.keyboards):
+            for row in message.get("reply_markup", {}).get("inline_keyboard", []):
+                for button in row:
+                    if (button.get("callback_data") or "").startswith(prefix):
+                        return message, button["callback_data"]
+        return None
+
+    def _callback_update(self, message: dict, data: str) -> dict:
+        query_id = f"cq{self.api.next_update_id()}"
+        self.api.query_chats[query_id] = self.user_id
+        return {
+            "update_id": self.api.next_update_id(),
+            "callback_query": {
+                "id": query_id,
+                "from": self._user(),
+                "chat_instance": str(self.user_id),
+                "data": data,
+                "message": message,
+            },
+        }
+
+    def _observe(self, event: dict):
+        result = event["result"]
+        if event["method"] == "sendInvoice":
+            self.invoice = event["params"]
+        elif event["method"] == "answerPreCheckoutQuery":
+            self.pre_checkout_ok = str(event["params"].get("ok")).lower() == "true"
+        if isinstance(result, dict) and "reply_markup" in result:
+            self.keyboards = self.keyboards[-4:] + [result]
+
+    async def _exchange(self, kind: str, update: dict) -> bool:
+        """Livrează update-ul și așteaptă răspunsul botului (plus ce mai vine până la liniște)."""
+        try:
+            sent_at = await self.api.deliver(update)
+        except Exception:
+            self.stats["delivery_errors"] += 1
+            return False
+        self.stats["updates"] += 1
+        try:
+            event = await asyncio.wait_for(self.inbox.get(), self.args.reply_timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            self.latencies.setdefault(kind, []).append(self.args.reply_timeout)
+            return False
+        self.latencies.setdefault(kind, []).append(event["at"] - sent_at)
+        self._observe(event)
+        settle = self.args.settle_ms / 1000
+        while True:
+            try:
+                self._observe(await asyncio.wait_for(self.inbox.get(), settle))
+            except asyncio.TimeoutError:
+                return True
+
+    async def _pay(self, flow: str) -> bool:
+        if not self.invoice:
+            return True
+        invoice, self.invoice = self.invoice, None
+        query_id = f"pq{self.api.next_update_id()}"
+        self.api.query_chats[query_id] = self.user_id
+        amount = int(invoice["prices"][0]["amount"])
+        update = {
+            "update_id": self.api.next_update_id(),
+            "pre_checkout_query": {
+                "id": query_id,
+                "from": self._user(),
+                "currency": invoice["currency"],
+                "total_amount": amount,
+                "invoice_payload": invoice["payload"],
+            },
+        }
+        if not await self._exchange(f"{flow}:pre_checkout", update) or not self.pre_checkout_ok:
+            return False
+        n = self.api.next_update_id()
+        payment = {
+            "currency": invoice["currency"],
+            "total_amount": amount,
+            "invoice_payload": invoice["payload"],
+            "telegram_payment_charge_id": f"tg-{n}",
+            "provider_payment_charge_id": f"pr-{n}",
+        }
+        update = {"update_id": n, "message": self._message(successful_payment=payment)}
+        return await self._exchange(f"{flow}:payment", update)
+
+    async def run_flow(self, flow: str, steps: list) -> bool:
+        for n, (action, value) in enumerate(steps):
+            if n:
+                await asyncio.sleep(random.uniform(0.5, 1.5) * self.args.think_ms / 1000)
+            kind = f"{flow}:{n:02d}:{action}:{str(value)[:20]}"
+            if action == "text":
+                ok = await self._exchange(kind, self._text_update(value))
+            elif action in ("press", "press?"):
+                found = self._find_button(value)
+                if found is None:
+                    if action == "press?":
+                        continue
+                    self.stats["missing_buttons"] += 1
+                    return False
+                ok = await self._exchange(kind, self._callback_update(*found))
+            else:
+                ok = await self._pay(flow)
+            if not ok:
+                return False
+        return True
+
+
+def percentile(sorted_values, q: float) -> float:
+    index = max(0, math.ceil(q * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize(latencies: dict) -> dict:
+    report = {}
+    everything = sorted(v for values in latencies.values() for v in values)
+    for kind, values in sorted(latencies.items()) + [("TOTAL", everything)]:
+        values = sorted(values)
+        if not values:
+            continue
+        report[kind] = {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+            "p90_ms": round(percentile(values, 0.90) * 1000, 1),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+            "max_ms": round(values[-1] * 1000, 1),
+        }
+    return report
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def spawn_bot(args, api_url: str) -> subprocess.Popen:
+    state_dir = tempfile.mkdtemp(prefix="loadtest-state-")
+    env = {
+        **os.environ,
+        "TELEGRAM_TOKEN": TOKEN,
+        "GROQ_API_KEY": "loadtest",
+        "TELEGRAM_BASE_URL": api_url,
+        "GROQ_BASE_URL": api_url,
+        "STATE_DIR": state_dir,
+        "ADMIN_CHAT_ID": str(ADMIN_CHAT_ID),
+        "PAYMENT_PROVIDER_TOKEN": "loadtest",
+        "PORT": str(args.bot_port),
+        "WORKERS": str(args.workers),
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+    }
+    for name in ("TENANTS_FILE", "RECORD_DIR", "ORDER_SYNC_URL", "ORDER_SYNC_FILE", "GROQ_API_KEYS"):
+        env.pop(name, None)
+    if args.workers > 1:
+        env["WEBHOOK_URL"] = f"http://127.0.0.1:{args.bot_port}"
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot.py")
+    return subprocess.Popen([sys.executable, script], env=env)
+
+
+async def run(args):
+    flows = build_flows(_bot_texts())
+    mix = parse_mix(args.mix)
+    unknown = set(mix) - set(flows)
+    if unknown:
+        sys.exit(f"Unknown flows: {', '.join(sorted(unknown))}")
+
+    loop = asyncio.get_running_loop()
+    api = FakeTelegram(
+        loop, args.api_latency_ms / 1000, args.error_rate, args.retry_after, args.groq_latency_ms / 1000
+    )
+    server = _Server(("127.0.0.1", args.port), make_handler(api))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    process = None
+    if args.no_spawn:
+        print(f"Fake Bot API on {api_url}. Start the bot with:")
+        print(f"  TELEGRAM_TOKEN={TOKEN} TELEGRAM_BASE_URL={api_url} GROQ_BASE_URL={api_url} "
+              f"GROQ_API_KEY=loadtest ADMIN_CHAT_ID={ADMIN_CHAT_ID} PAYMENT_PROVIDER_TOKEN=loadtest python bot.py")
+    else:
+        process = spawn_bot(args, api_url)
+    if not await asyncio.to_thread(api.ready.wait, args.startup_timeout):
+        if process:
+            process.kill()
+        sys.exit("The bot did not start polling / set its webhook in time")
+
+    latencies: dict = {}
+    stats = {"updates": 0, "timeouts": 0, "delivery_errors": 0, "missing_buttons": 0,
+             "flows_ok": 0, "flows_failed": 0}
+    names, weights = list(mix), list(mix.values())
+    started = time.monotonic()
+    deadline = started + args.duration if args.duration else None
+
+    async def user_loop(n: int):
+        user = VirtualUser(api, FIRST_USER_ID + n, args, latencies, stats)
+        # pornirile eșalonate, ca să nu sosească toți în aceeași milisecundă
+        await asyncio.sleep(random.uniform(0, args.ramp_up))
+        iteration = 0
+        while (deadline and time.monotonic() < deadline) or (not deadline and iteration < args.iterations):
+            flow = random.choices(names, weights)[0]
+            ok = await user.run_flow(flow, flows[flow])
+            stats["flows_ok" if ok else "flows_failed"] += 1
+            iteration += 1
+
+    await asyncio.gather(*(user_loop(n) for n in range(args.users)))
+    wall = time.monotonic() - started
+
+    if process:
+        process.send_signal(signal.SIGTERM)
+        try:
+            await asyncio.to_thread(process.wait, 60)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    server.shutdown()
+
+    report = {
+        "users": args.users,
+        "workers": args.workers,
+        "wall_seconds": round(wall, 2),
+        "updates_per_second": round(stats["updates"] / wall, 1) if wall else None,
+        **stats,
+        "injected_429": api.injected_429,
+        "admin_messages": api.admin_messages,
+        "groq_calls": api.groq_calls,
+        "bot_api_calls": dict(sorted(api.calls.items())),
+        "bot_exit_code": process.returncode if process else None,
+        "latency": summarize(latencies),
+    }
+    print(
+        f"{stats['updates']} updates in {wall:.2f}s ({report['updates_per_second']}/s), "
+        f"flows ok/failed: {stats['flows_ok']}/{stats['flows_failed']}, timeouts: {stats['timeouts']}, "
+        f"429 injected: {api.injected_429}, admin messages: {api.admin_messages}"
+    )
+    print(f"{'step':<52}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for kind, row in report["latency"].items():
+        print(
+            f"{kind:<52}{row['count']:>7}{row['p50_ms']:>10}{row['p90_ms']:>10}"
+            f"{row['p99_ms']:>10}{row['max_ms']:>10}"
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50, help="utilizatori virtuali simultani")
+    parser.add_argument("--mix", default="catalog=5,ai=2,order=3", help="ponderile fluxurilor")
+    parser.add_argument("--iterations", type=int, default=1, help="fluxuri per utilizator (fără --duration)")
+    parser.add_argument("--duration", type=float, help="secunde; utilizatorii reiau fluxuri până atunci")
+    parser.add_argument("--ramp-up", type=float, default=5, help="secunde în care pornesc utilizatorii")
+    parser.add_argument("--think-ms", type=float, default=300, help="pauza medie între pași")
+    parser.add_argument("--settle-ms", type=float, default=200, help="liniștea după care pasul e gata")
+    parser.add_argument("--reply-timeout", type=float, default=20, help="secunde de așteptat un răspuns")
+    parser.add_argument("--api-latency-ms", type=float, default=30)
+    parser.add_argument("--groq-latency-ms", type=float, default=800)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fracțiunea de trimiteri cu 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after din 429-urile injectate")
+    parser.add_argument("--workers", type=int, default=1, help="WORKERS pentru bot (> 1: ingress + webhook)")
+    parser.add_argument("--port", type=int, default=0, help="portul Bot API-ului fals (0 = liber)")
+    parser.add_argument("--bot-port", type=int, default=18080, help="PORT-ul HTTP al botului")
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    parser.add_argument("--no-spawn", action="store_true", help="nu porni bot.py (îl pornești separat)")
+    parser.add_argument("--json", help="salvează raportul (JSON) în acest fișier")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
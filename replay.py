@@ -0,0 +1,270 @@
+"""Reluare offline a traficului înregistrat cu RECORD_DIR, prin handler-ele din bot.py.
+
+Folosire:
+    python replay.py data/traffic/updates-*.jsonl.gz [--speed max|1|10] [--tenant NUME]
+        [--api-latency-ms 0] [--groq-latency-ms 0] [--admin-chat-id ID] [--json raport.json]
+
+Botul rulează cu un Bot API fals (răspunde după `--api-latency-ms`) și un Groq stub,
+cu starea într-un director temporar. `--speed max` trimite update-urile cât de repede
+se poate, `--speed 1` la ritmul original (2 = de două ori mai repede etc.).
+La final afișează distribuția latenței handler-elor per tip de update; `--json`
+o salvează pentru comparații între versiuni (ex. față de traficul de săptămâna trecută).
+Comenzile primesc ID-urile din înregistrare, ca plățile (`order-<id>`) și butoanele
+de admin înregistrate să găsească aceleași comenzi.
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+# bot.py citește configurația la import
+os.environ.update(
+    TELEGRAM_TOKEN="123456:replay",
+    GROQ_API_KEY="replay",
+    STATE_DIR=tempfile.mkdtemp(prefix="replay-state-"),
+    LOG_LEVEL=os.getenv("LOG_LEVEL", "WARNING"),
+)
+for name in ("RECORD_DIR", "TENANTS_FILE", "ORDER_SYNC_URL", "ORDER_SYNC_FILE"):
+    os.environ.pop(name, None)
+
+from telegram import Update  # noqa: E402
+from telegram.request import BaseRequest  # noqa: E402
+
+import bot  # noqa: E402
+
+
+class FakeBotApi(BaseRequest):
+    """Bot API fals: orice metodă reușește, mesajele trimise primesc ID-uri noi."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls: dict = {}
+        self._message_id = 0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def _message(self, params: dict) -> dict:
+        self._message_id += 1
+        chat_id = params.get("chat_id") or 1
+        message = {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id), "type": "private"},
+        }
+        if "text" in params:
+            message["text"] = params["text"]
+        return message
+
+    def _photo_message(self, params: dict) -> dict:
+        message = self._message(params)
+        n = message["message_id"]
+        message["photo"] = [
+            {"file_id": f"replay-{n}", "file_unique_id": f"u{n}", "width": 1, "height": 1}
+        ]
+        return message
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        endpoint = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data else {}
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if endpoint == "getUpdates":
+            # replay-ul apelează process_update direct; polling-ul nu primește nimic
+            await asyncio.sleep(1)
+            result = []
+        elif endpoint == "getMe":
+            result = {"id": 123456, "is_bot": True, "first_name": "Replay", "username": "replay_bot"}
+        elif endpoint in ("sendMessage", "sendInvoice", "copyMessage", "editMessageText"):
+            result = self._message(params)
+        elif endpoint == "sendPhoto":
+            result = self._photo_message(params)
+        elif endpoint == "sendMediaGroup":
+            result = [self._photo_message(params) for _ in params.get("media", [])]
+        else:
+            result = True
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+class GroqStub:
+    """Client Groq fals pentru `bot.GroqRouter`: răspuns fix după `latency` secunde."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        completions = SimpleNamespace(with_raw_response=SimpleNamespace(create=self._create))
+        self.chat = SimpleNamespace(completions=completions)
+
+    def _create(self, model, messages, **kwargs):
+        # apelat din asyncio.to_thread, ca clientul real
+        self.calls += 1
+        time.sleep(self.latency)
+        content = "Recomandare de test: Sweet Box Clasic."
+        completion = SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(
+                prompt_tokens=sum(len(m["content"]) for m in messages) // 4,
+                completion_tokens=len(content) // 4,
+            ),
+        )
+        return SimpleNamespace(headers={}, parse=lambda: completion)
+
+
+def read_records(paths, tenant_name):
+    records = []
+    for path in paths:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if tenant_name is None or record["tenant"] == tenant_name:
+                    records.append(record)
+    records.sort(key=lambda r: r["ts"])
+    return records
+
+
+def pin_order_ids(records):
+    """Scoate marcajele `order` și le întoarce ca {update_id: [ID-uri comenzi]}."""
+    pinned: dict = {}
+    updates = []
+    for record in records:
+        if "order" in record:
+            pinned.setdefault(record["order"]["update_id"], []).append(record["order"]["order_id"])
+        else:
+            updates.append(record)
+    return updates, pinned
+
+
+def update_kind(update: Update) -> str:
+    if update.callback_query:
+        return "callback:" + (update.callback_query.data or "").split(":", 1)[0]
+    if update.inline_query:
+        return "inline_query"
+    if update.pre_checkout_query:
+        return "pre_checkout"
+    message = update.effective_message
+    if message and message.successful_payment:
+        return "payment"
+    if message and message.text:
+        if message.text.startswith("/"):
+            return "command:" + message.text.split()[0].split("@")[0]
+        return "text"
+    return "other"
+
+
+def percentile(sorted_values, q: float) -> float:
+    index = max(0, math.ceil(q * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize(latencies: dict) -> dict:
+    report = {}
+    everything = sorted(v for values in latencies.values() for v in values)
+    for kind, values in sorted(latencies.items()) + [("TOTAL", everything)]:
+        values = sorted(values)
+        if not values:
+            continue
+        report[kind] = {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+            "p90_ms": round(percentile(values, 0.90) * 1000, 2),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2),
+        }
+    return report
+
+
+async def replay(args):
+    records, pinned = pin_order_ids(read_records(args.files, args.tenant))
+    if not records:
+        sys.exit("No recorded updates found")
+
+    # ID-urile comenzilor create de update-ul curent; fără marcaj (înregistrări vechi),
+    # ID-ul se generează normal și plățile înregistrate nu-și mai găsesc comanda
+    current_order_ids: list = []
+    generate_order_id = bot.next_order_id
+    bot.next_order_id = lambda: current_order_ids.pop(0) if current_order_ids else generate_order_id()
+
+    groq_stub = GroqStub(args.groq_latency_ms / 1000)
+    bot.groq_router = bot.GroqRouter(
+        [groq_stub], bot.GROQ_MAX_INFLIGHT, bot.GROQ_QUEUE_MAX, bot.GROQ_QUEUE_TIMEOUT
+    )
+    fake_api = FakeBotApi(args.api_latency_ms / 1000)
+    tenant = bot.Tenant("replay", os.environ["TELEGRAM_TOKEN"], admin_chat_id=args.admin_chat_id)
+    bot.TENANTS.append(tenant)
+    with tenant.active():
+        application = bot.build_application(tenant, request=fake_api)
+        await application.initialize()
+
+    latencies: dict = {}
+    errors = 0
+    started = time.monotonic()
+    first_ts = records[0]["ts"]
+    for record in records:
+        if args.speed != "max":
+            delay = (record["ts"] - first_ts) / float(args.speed) - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        update = Update.de_json(record["update"], application.bot)
+        current_order_ids[:] = pinned.get(update.update_id, [])
+        t0 = time.perf_counter()
+        try:
+            await application.process_update(update)
+        except Exception:
+            errors += 1
+        latencies.setdefault(update_kind(update), []).append(time.perf_counter() - t0)
+    wall = time.monotonic() - started
+
+    await bot.shutdown.drain()
+    await application.shutdown()
+
+    report = {
+        "updates": len(records),
+        "wall_seconds": round(wall, 2),
+        "updates_per_second": round(len(records) / wall, 1) if wall else None,
+        "errors": errors + tenant.metrics.errors,
+        "groq_calls": groq_stub.calls,
+        "bot_api_calls": fake_api.calls,
+        "latency": summarize(latencies),
+    }
+    print(f"{len(records)} updates in {wall:.2f}s, errors: {report['errors']}")
+    print(f"{'kind':<28}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for kind, row in report["latency"].items():
+        print(
+            f"{kind:<28}{row['count']:>7}{row['p50_ms']:>10}{row['p90_ms']:>10}"
+            f"{row['p99_ms']:>10}{row['max_ms']:>10}"
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="fișiere updates-*.jsonl.gz din RECORD_DIR")
+    parser.add_argument("--speed", default="max", help="max sau factor față de ritmul original")
+    parser.add_argument("--tenant", help="doar update-urile acestui tenant")
+    parser.add_argument("--api-latency-ms", type=float, default=0)
+    parser.add_argument("--groq-latency-ms", type=float, default=0)
+    parser.add_argument("--admin-chat-id", type=int, help="chatul de admin din înregistrare")
+    parser.add_argument("--json", help="salvează raportul (JSON) în acest fișier")
+    args = parser.parse_args()
+    if args.speed != "max":
+        float(args.speed)
+    asyncio.run(replay(args))
+
+
+if __name__ == "__main__":
+    main()
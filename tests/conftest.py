@@ -0,0 +1,42 @@
+import os
+import sys
+import tempfile
+
+# bot.py citește configurația la import: fără token-uri reale, starea într-un director temporar
+os.environ.update(
+    TELEGRAM_TOKEN="123456:test",
+    GROQ_API_KEY="test",
+    STATE_DIR=tempfile.mkdtemp(prefix="cadolab-tests-"),
+    LOG_LEVEL="WARNING",
+    LOG_FORMAT="text",
+)
+for name in ("RECORD_DIR", "TENANTS_FILE", "ORDER_SYNC_URL", "ORDER_SYNC_FILE", "WORKERS"):
+    os.environ.pop(name, None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+import bot  # noqa: E402
+
+
+@pytest.fixture
+def state(tmp_path):
+    """PersistentState nou într-un director temporar: state("nume")."""
+    return lambda name: bot.PersistentState(name, str(tmp_path))
+
+
+@pytest.fixture
+def shared_store(tmp_path):
+    return bot.SharedStore(str(tmp_path / "shared.sqlite"))
+
+
+ADMIN_ID = 1000
+
+
+@pytest.fixture
+def shop(tmp_path):
+    """Un tenant cu starea în tmp_path, activ pe durata testului."""
+    t = bot.Tenant("test", "123456:test", admin_chat_id=ADMIN_ID, state_dir=str(tmp_path))
+    with t.active():
+        yield t
@@ -0,0 +1,62 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import bot
+from conftest import ADMIN_ID
+
+CLIENT_ID = 42
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+class FakeQuery:
+    def __init__(self, data):
+        self.data = data
+        self.from_user = SimpleNamespace(id=ADMIN_ID)
+        self.message = SimpleNamespace(reply_markup=None)
+        self.answers = []
+        self.markups = []
+
+    async def answer(self, text=None, show_alert=False):
+        self.answers.append((text, show_alert))
+
+    async def edit_message_reply_markup(self, reply_markup=None):
+        self.markups.append(reply_markup)
+
+
+def _press(data):
+    query, fake_bot = FakeQuery(data), FakeBot()
+    update = SimpleNamespace(callback_query=query)
+    asyncio.run(bot.order_admin_decision(update, SimpleNamespace(bot=fake_bot)))
+    return query, fake_bot
+
+
+def test_legacy_button_without_order_id_notifies_client(shop):
+    shop.customers.register(CLIENT_ID, "ru")
+    query, fake_bot = _press(f"admin_accept:{CLIENT_ID}")
+    assert fake_bot.sent == [(CLIENT_ID, shop.texts["ru"]["order_legacy_accepted"])]
+    assert query.markups == [None]
+    assert query.answers
+
+
+def test_legacy_reject_without_order_id_defaults_to_ro(shop):
+    query, fake_bot = _press(f"admin_reject:{CLIENT_ID}")
+    assert fake_bot.sent == [(CLIENT_ID, shop.texts["ro"]["order_legacy_cancelled"])]
+    assert query.markups == [None]
+
+
+def test_legacy_button_with_order_id_goes_through_order_book(shop):
+    shop.order_book.create(
+        {"order_id": 7, "user_id": CLIENT_ID, "lang": "ro", "timestamp": datetime.now()}
+    )
+    query, fake_bot = _press(f"admin_accept:{CLIENT_ID}:7")
+    assert shop.order_book.get(7)["status"] == "accepted"
+    assert fake_bot.sent == [(CLIENT_ID, shop.texts["ro"]["order_status_accepted"].format(order_id=7))]
+    assert query.markups and query.markups[0] is not None
@@ -0,0 +1,48 @@
+import pytest
+
+import bot
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("zi de naștere", "birthday"),
+        ("Ziua de naștere a mamei", "birthday"),
+        ("aniversare", "birthday"),
+        ("день рождения", "birthday"),
+        ("Ziua Îndrăgostiților", "valentine"),
+        ("14 februarie", "valentine"),
+        ("Valentine's day", "valentine"),
+        ("ziua femeii", "womens_day"),
+        ("Ziua de 8 martie", "womens_day"),
+        ("8 марта", "womens_day"),
+        ("Crăciun", "new_year"),
+        ("ziua mamei", None),
+        ("ziua", None),
+        ("80 de ani", None),
+        ("14ani", None),
+        ("aniversare pe 8 martie", None),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_occasion_match(text, expected):
+    assert bot._match_profile(text, bot.AI_PROFILE_OCCASIONS) == expected
+
+
+@pytest.mark.parametrize("occasion", list(bot.AI_PROFILE_OCCASIONS))
+def test_occasion_labels_match_their_own_class(occasion):
+    label_ro, label_ru, _ = bot.AI_PROFILE_OCCASIONS[occasion]
+    assert bot._match_profile(label_ro, bot.AI_PROFILE_OCCASIONS) == occasion
+    assert bot._match_profile(label_ru, bot.AI_PROFILE_OCCASIONS) == occasion
+
+
+def test_valentine_profile_is_not_served_the_birthday_answer():
+    data = {"who": "iubita", "occasion": "Ziua Îndrăgostiților", "relation": "iubită", "budget": "500"}
+    key = bot.AiPrecomputed.profile_key(bot.LANG_RO, data)
+    assert key is not None and "|valentine|" in key
+
+
+def test_unknown_occasion_has_no_precomputed_profile():
+    data = {"who": "mama", "occasion": "ziua mamei", "relation": "mamă", "budget": "500"}
+    assert bot.AiPrecomputed.profile_key(bot.LANG_RO, data) is None
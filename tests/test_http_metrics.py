@@ -0,0 +1,55 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import bot
+
+
+@pytest.fixture
+def server():
+    httpd = bot._HttpServer(("127.0.0.1", 0), bot.HealthHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _get(url, token=None):
+    request = urllib.request.Request(url, headers={"Authorization": f"Bearer {token}"} if token else {})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, b""
+
+
+def _handler(address, authorization=None):
+    handler = bot.HealthHandler.__new__(bot.HealthHandler)
+    handler.client_address = (address, 50000)
+    handler.headers = {"Authorization": authorization} if authorization else {}
+    return handler
+
+
+def test_health_check_stays_public(server, monkeypatch):
+    monkeypatch.setattr(bot, "METRICS_TOKEN", "s3cret")
+    assert _get(server + "/") == (200, b"OK")
+
+
+def test_metrics_require_token(server, monkeypatch):
+    monkeypatch.setattr(bot, "METRICS_TOKEN", "s3cret")
+    assert _get(server + "/metrics")[0] == 401
+    assert _get(server + "/metrics", token="wrong")[0] == 401
+    status, body = _get(server + "/metrics", token="s3cret")
+    assert status == 200
+    assert "groq" in json.loads(body)
+
+
+def test_metrics_without_token_only_on_localhost(server, monkeypatch):
+    monkeypatch.setattr(bot, "METRICS_TOKEN", None)
+    assert _get(server + "/metrics")[0] == 200
+    assert _handler("127.0.0.1")._metrics_allowed()
+    assert not _handler("203.0.113.7")._metrics_allowed()
+    assert not _handler("203.0.113.7", "Bearer anything")._metrics_allowed()
@@ -0,0 +1,81 @@
+import pytest
+
+import bot
+
+
+@pytest.fixture(params=["local", "shared"])
+def inventory(request, state, shared_store):
+    if request.param == "local":
+        inv = bot.Inventory(state("inventory"), ttl_seconds=60)
+    else:
+        inv = bot.SharedInventory(shared_store, "inventory", ttl_seconds=60)
+    inv.seed([{"id": "box", "stock": 2}, {"id": "card"}])
+    return inv
+
+
+def test_reserve_until_sold_out(inventory):
+    changes = []
+    inventory.on_availability_change = changes.append
+    assert inventory.reserve("box", 1)
+    assert inventory.reserve("box", 2)
+    assert not inventory.reserve("box", 3)
+    assert not inventory.is_available("box")
+    assert changes == ["box"]
+    # fără stoc declarat = nelimitat
+    assert inventory.reserve("card", 4)
+    assert inventory.is_available("card")
+
+
+def test_release_returns_stock_once(inventory):
+    inventory.reserve("box", 1)
+    inventory.reserve("box", 2)
+    assert inventory.release(1)
+    assert not inventory.release(1)
+    assert inventory.is_available("box")
+    assert "1" not in inventory.reservations
+
+
+def test_expire_releases_only_held(inventory):
+    inventory.reserve("box", 1)
+    inventory.reserve("box", 2)
+    assert inventory.commit(2, "box")
+    assert inventory.expire(now=bot.time.time() + 61) == ["1"]
+    assert inventory.reservations["2"]["status"] == "committed"
+    assert inventory.reserve("box", 3)
+    assert not inventory.reserve("box", 4)
+
+
+def test_hold_redoes_expired_reservation(inventory):
+    inventory.reserve("box", 1)
+    inventory.expire(now=bot.time.time() + 61)
+    assert inventory.hold(1, "box")
+    assert inventory.reservations["1"]["status"] == "held"
+    # deja rezervată: hold nu mai scade stocul
+    assert inventory.hold(1, "box")
+    assert inventory.reserve("box", 2)
+    assert not inventory.reserve("box", 3)
+
+
+def test_commit_fails_when_sold_out_meanwhile(inventory):
+    inventory.reserve("box", 1)
+    inventory.expire(now=bot.time.time() + 61)
+    inventory.reserve("box", 2)
+    inventory.reserve("box", 3)
+    assert not inventory.commit(1, "box")
+    assert "1" not in inventory.reservations
+
+
+def test_forget_keeps_stock_consumed(inventory):
+    inventory.reserve("box", 1)
+    inventory.commit(1, "box")
+    inventory.forget(1)
+    assert "1" not in inventory.reservations
+    assert not inventory.release(1)
+    assert inventory.reserve("box", 2)
+    assert not inventory.reserve("box", 3)
+
+
+def test_products_without_stock_need_no_reservation(inventory):
+    assert inventory.hold(1, None)
+    assert inventory.commit(1, None)
+    assert "1" not in inventory.reservations
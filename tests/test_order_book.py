@@ -0,0 +1,92 @@
+from datetime import datetime
+
+import pytest
+
+import bot
+
+
+def _order(order_id, **fields):
+    return {"order_id": order_id, "user_id": 42, "timestamp": datetime(2026, 3, 1, 12, 0), **fields}
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return bot.OrderJournal("orders", str(tmp_path))
+
+
+def test_sorted_ids_paging():
+    ids = bot.SortedIds()
+    for order_id in (5, 1, 9, 3, 9, 7):
+        ids.add(order_id)
+    assert ids.page(0, 10) == [1, 3, 5, 7, 9]
+    assert ids.page(3, 2) == [5, 7]
+    assert ids.page(9, 2) == []
+    ids.remove(5)
+    ids.remove(4)
+    assert ids.page(0, 10) == [1, 3, 7, 9]
+    assert len(ids) == 4
+
+
+def test_transition_moves_order_between_indexes():
+    book = bot.OrderBook()
+    book.create(_order(1, delivery_date="2026-03-08"))
+    book.create(_order(2))
+    order = book.transition(1, "accepted", by=1000)
+    assert order["status"] == "accepted"
+    assert [h[0] for h in order["history"]] == ["new", "accepted"]
+    assert order["history"][-1][2] == 1000
+    assert book.counts()["new"] == 1 and book.counts()["accepted"] == 1
+    assert [o["order_id"] for o in book.page("2026-03-08")[0]] == [1]
+
+    book.transition(1, "cancelled")
+    assert [o["order_id"] for o in book.page("open")[0]] == [2]
+    assert book.page("2026-03-08") == ([], False)
+    assert "2026-03-08" not in book.by_date
+
+
+@pytest.mark.parametrize("order_id, status", [(1, "done"), (1, "new"), (99, "accepted")])
+def test_invalid_transition(order_id, status):
+    book = bot.OrderBook()
+    book.create(_order(1))
+    with pytest.raises(bot.OrderTransitionError):
+        book.transition(order_id, status)
+    assert book.get(1)["status"] == "new"
+
+
+def test_page_reports_more():
+    book = bot.OrderBook()
+    for order_id in range(1, 6):
+        book.create(_order(order_id))
+    orders, more = book.page("new", after=0, limit=2)
+    assert [o["order_id"] for o in orders] == [1, 2] and more
+    orders, more = book.page("new", after=4, limit=2)
+    assert [o["order_id"] for o in orders] == [5] and not more
+    assert book.page("unknown") == ([], False)
+
+
+def test_journal_replay_rebuilds_state(journal, tmp_path):
+    book = bot.OrderBook(journal)
+    book.create(_order(1, delivery_date="2026-03-08"))
+    book.create(_order(2))
+    book.transition(1, "accepted")
+    book.update(1, paid=True)
+    book.transition(2, "cancelled")
+    journal.flush()
+
+    replayed = bot.OrderBook(bot.OrderJournal("orders", str(tmp_path)))
+    assert replayed.get(1)["status"] == "accepted"
+    assert replayed.get(1)["paid"] is True
+    assert replayed.get(1)["timestamp"] == datetime(2026, 3, 1, 12, 0)
+    assert replayed.get(2)["status"] == "cancelled"
+    assert replayed.counts() == book.counts()
+    assert [o["order_id"] for o in replayed.page("2026-03-08")[0]] == [1]
+
+
+def test_journal_skips_torn_last_line(journal, tmp_path):
+    book = bot.OrderBook(journal)
+    book.create(_order(1))
+    journal.flush()
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"op": "status", "order_id": 1, "sta')
+    replayed = bot.OrderBook(bot.OrderJournal("orders", str(tmp_path)))
+    assert replayed.get(1)["status"] == "new"
@@ -0,0 +1,72 @@
+import asyncio
+from types import SimpleNamespace
+
+import bot
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, reply_markup=None):
+        self.sent.append((chat_id, text, reply_markup))
+
+
+def _remind(payload, shop):
+    application = SimpleNamespace(bot=FakeBot(), user_data={42: {}})
+    asyncio.run(bot.send_order_reminder(application, "42", payload))
+    assert application.user_data[42]["order_reminded"] is True
+    return application.bot.sent
+
+
+def test_deadlines_survive_restart(state):
+    store = state("order_reminders")
+    wheel = bot.TimerWheel(store, slots=8)
+    wheel.arm("42", 3, {"chat_id": 42, "lang": "ru"})
+    wheel.arm("43", 3, {"chat_id": 43, "lang": "ro"})
+    wheel.cancel("43")
+    store.flush()
+
+    restored = bot.TimerWheel(state("order_reminders"), slots=8)
+    assert list(restored.timers) == ["42"]
+    fired = [item for _ in range(4) for item in restored.advance()]
+    assert fired == [("42", {"chat_id": 42, "lang": "ru", "restored": True})]
+
+
+def test_live_reminder_has_no_button(shop):
+    [(chat_id, text, keyboard)] = _remind({"chat_id": 42, "lang": "ro"}, shop)
+    assert (chat_id, text, keyboard) == (42, shop.texts["ro"]["order_reminder"], None)
+
+
+def test_restored_reminder_offers_resume(shop):
+    [(_, text, keyboard)] = _remind({"chat_id": 42, "lang": "ru", "restored": True}, shop)
+    assert text == shop.texts["ru"]["order_reminder_restored"]
+    [[button]] = keyboard.inline_keyboard
+    assert button.callback_data == "order_resume:ru"
+
+
+def test_resume_button_starts_the_order(shop):
+    answered, markups, sent = [], [], []
+
+    async def answer():
+        answered.append(True)
+
+    async def edit_message_reply_markup(reply_markup=None):
+        markups.append(reply_markup)
+
+    async def send_message(text, reply_markup=None):
+        sent.append(text)
+
+    update = SimpleNamespace(
+        callback_query=SimpleNamespace(
+            data="order_resume:ru", answer=answer, edit_message_reply_markup=edit_message_reply_markup
+        ),
+        effective_user=SimpleNamespace(id=42),
+        effective_chat=SimpleNamespace(id=42, send_message=send_message),
+    )
+    context = SimpleNamespace(user_data={})
+    assert asyncio.run(bot.order_resume_callback(update, context)) == bot.ORDER_PRODUCT
+    assert answered and markups == [None]
+    assert context.user_data["lang"] == "ru"
+    assert sent[-1] == shop.texts["ru"]["order_ask_product"]
+    assert "42" in shop.order_reminders.timers
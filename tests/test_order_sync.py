@@ -0,0 +1,93 @@
+import asyncio
+
+import bot
+
+
+class RecordingSink(bot.OrderSink):
+    name = "test"
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+        self.closed = False
+
+    async def write_batch(self, records):
+        if self.fail:
+            raise ConnectionError("down")
+        self.batches.append([r["idempotency_key"] for r in records])
+
+    async def close(self):
+        self.closed = True
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_full_batch_is_written_without_waiting():
+    async def scenario():
+        sink = RecordingSink()
+        pipeline = bot.OrderSyncPipeline(sink, batch_size=2, flush_seconds=60)
+        for order_id in (1, 2, 3):
+            pipeline.submit({"order_id": order_id})
+        await pipeline.start()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert sink.batches == [["order-1", "order-2"]]
+        # order-3 așteaptă restul lotului
+        assert pipeline.pending_keys() == ["order-3"]
+        await pipeline.stop()
+        return sink, pipeline
+
+    sink, pipeline = _run(scenario())
+    assert sink.batches == [["order-1", "order-2"], ["order-3"]]
+    assert sink.closed
+    assert pipeline.synced == 3 and pipeline.pending_keys() == []
+
+
+def test_stop_during_collection_keeps_taken_records():
+    async def scenario():
+        sink = RecordingSink()
+        pipeline = bot.OrderSyncPipeline(sink, batch_size=10, flush_seconds=60)
+        await pipeline.start()
+        pipeline.submit({"order_id": 1})
+        pipeline.submit({"order_id": 2})
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert pipeline.pending_keys() == ["order-1", "order-2"]
+        # get() se termină chiar înainte de cancel(): wait_for poate înghiți anularea
+        pipeline.submit({"order_id": 3})
+        await asyncio.wait_for(pipeline.stop(), 5)
+        return sink
+
+    batches = _run(scenario()).batches
+    assert sum(batches, []) == ["order-1", "order-2", "order-3"]
+
+
+def test_stop_without_start_drains_queue_in_batches():
+    async def scenario():
+        sink = RecordingSink()
+        pipeline = bot.OrderSyncPipeline(sink, batch_size=2)
+        for order_id in range(1, 6):
+            pipeline.submit({"order_id": order_id})
+        assert pipeline.pending_keys() == [f"order-{i}" for i in range(1, 6)]
+        await pipeline.stop()
+        return sink
+
+    assert _run(scenario()).batches == [["order-1", "order-2"], ["order-3", "order-4"], ["order-5"]]
+
+
+def test_batch_given_up_after_retries():
+    async def scenario():
+        pipeline = bot.OrderSyncPipeline(RecordingSink(fail=True), max_retries=1)
+        pipeline.submit({"order_id": 1})
+        await pipeline.stop()
+        return pipeline
+
+    pipeline = _run(scenario())
+    assert (pipeline.synced, pipeline.failed) == (0, 1)
+
+
+def test_sync_record_serializes_datetimes():
+    record = bot._order_to_sync_record({"order_id": 7, "timestamp": bot.datetime(2026, 3, 8, 9, 30)})
+    assert record == {"order_id": 7, "timestamp": "2026-03-08T09:30:00", "idempotency_key": "order-7"}
@@ -0,0 +1,49 @@
+import pytest
+
+import bot
+
+PRODUCTS = [
+    {"id": "box_mama", "name_ro": "Cutie pentru mama", "name_ru": "Коробка для мамы",
+     "description_ro": "Ciocolată și flori", "description_ru": "Шоколад и цветы"},
+    {"id": "box_tata", "name_ro": "Cutie pentru tata", "name_ru": "Коробка для папы",
+     "description_ro": "Cafea și whisky", "description_ru": "Кофе и виски"},
+    {"id": "card", "name_ro": "Felicitare", "name_ru": "Открытка", "description_ro": "", "description_ru": ""},
+]
+
+
+@pytest.fixture
+def index():
+    return bot.ProductSearchIndex(PRODUCTS)
+
+
+def _ids(products):
+    return [p["id"] for p in products]
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("cutie", ["box_mama", "box_tata"]),
+        ("cu", ["box_mama", "box_tata"]),
+        ("ciocolata", ["box_mama"]),
+        ("CIOCOLATĂ", ["box_mama"]),
+        ("cutie tata", ["box_tata"]),
+        ("tata cutie", ["box_tata"]),
+        ("шоколад", ["box_mama"]),
+        ("box", ["box_mama", "box_tata"]),
+        ("felicit", ["card"]),
+        ("cutie felicitare", []),
+        ("trandafiri", []),
+    ],
+)
+def test_search(index, query, expected):
+    assert _ids(index.search(query)) == expected
+
+
+@pytest.mark.parametrize("query", ["", "   ", "!?", "c"])
+def test_empty_query_returns_catalog(index, query):
+    assert _ids(index.search(query)) == ["box_mama", "box_tata", "card"]
+
+
+def test_one_letter_token_is_ignored(index):
+    assert _ids(index.search("cutie m")) == ["box_mama", "box_tata"]
@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+import bot
+
+
+def _update(update_id, callback_id=None):
+    callback = SimpleNamespace(id=callback_id) if callback_id else None
+    return SimpleNamespace(update_id=update_id, callback_query=callback)
+
+
+def _restarted(state, high_water, guard_seconds=300, max_size=10):
+    store = state("seen_updates")
+    store.data["high_water"] = high_water
+    return bot.SeenUpdates(max_size, store, guard_seconds)
+
+
+def test_duplicate_update_and_callback_are_dropped(state):
+    seen = bot.SeenUpdates(10, state("seen_updates"), 300)
+    assert not seen.is_replay(_update(1, "cq-a"))
+    assert seen.is_replay(_update(1))
+    # alt update_id, același callback_query (dublu-click redelivrat)
+    assert seen.is_replay(_update(2, "cq-a"))
+    assert seen.dropped == 2
+    assert seen.high_water == 1
+
+
+def test_cache_is_bounded(state):
+    seen = bot.SeenUpdates(2, state("seen_updates"), 300)
+    for update_id in (1, 2, 3):
+        assert not seen.is_replay(_update(update_id))
+    assert len(seen._seen) == 2
+
+
+def test_restart_drops_redelivered_updates_during_guard(state):
+    seen = _restarted(state, high_water=100)
+    assert seen.is_replay(_update(99))
+    assert seen.is_replay(_update(100))
+    assert not seen.is_replay(_update(101))
+
+
+def test_guard_expires(state):
+    seen = _restarted(state, high_water=100, guard_seconds=0)
+    assert not seen.is_replay(_update(99))
+    # după primul update sub prag, pragul de la restart nu mai contează
+    assert not seen.is_replay(_update(98))
+
+
+def test_numbering_reset_far_below_the_mark(state):
+    seen = _restarted(state, high_water=1_000_000, max_size=10)
+    assert not seen.is_replay(_update(5))
+    assert seen.high_water == 5
+    assert seen._state.data["high_water"] == 5
+    assert not seen.is_replay(_update(6))
+    assert seen.is_replay(_update(6))
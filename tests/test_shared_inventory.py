@@ -0,0 +1,32 @@
+import bot
+
+
+def _worker(tmp_path, changed):
+    store = bot.SharedStore(str(tmp_path / "shared.sqlite"))
+    inventory = bot.SharedInventory(store, "inventory", ttl_seconds=60)
+    inventory.REFRESH_SECONDS = 0
+    inventory.on_availability_change = changed.append
+    return inventory
+
+
+def test_refresh_sees_sell_out_from_other_worker(tmp_path):
+    seen_a, seen_b = [], []
+    a, b = _worker(tmp_path, seen_a), _worker(tmp_path, seen_b)
+    a.seed([{"id": "box", "stock": 1}])
+    b.refresh()
+    assert b.is_available("box")
+
+    assert a.reserve("box", order_id=1)
+    assert seen_a == ["box"]
+    b.refresh()
+    assert seen_b == ["box"]
+    assert not b.is_available("box")
+
+
+def test_refresh_without_change_keeps_pages(tmp_path):
+    seen = []
+    inventory = _worker(tmp_path, seen)
+    inventory.seed([{"id": "box", "stock": 2}])
+    inventory.refresh()
+    inventory.refresh()
+    assert seen == []
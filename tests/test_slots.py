@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import bot
+
+WINDOWS = ["00:00-12:00", "12:00-23:59"]
+TZ = "Europe/Chisinau"
+
+
+@pytest.fixture(params=["local", "shared"])
+def slots(request, state, shared_store, monkeypatch):
+    monkeypatch.setattr(bot, "SLOT_CAPACITY", 2)
+    monkeypatch.setattr(bot, "SLOT_CITY_CAPACITY", {"balti": 1})
+    if request.param == "local":
+        return bot.SlotScheduler(state("slots"), WINDOWS, 3, TZ)
+    return bot.SharedSlotScheduler(shared_store, "slots", WINDOWS, 3, TZ)
+
+
+def _day(offset):
+    return (datetime.now(bot.ZoneInfo(TZ)).date() + timedelta(days=offset)).isoformat()
+
+
+def test_book_until_capacity(slots):
+    day = _day(1)
+    assert slots.book(day, 0, "Chișinău", 1)
+    assert slots.book(day, 0, "chisinau", 2)
+    assert not slots.book(day, 0, "CHISINAU", 3)
+    assert slots.remaining(day, 0, "Chișinău") == 0
+    # alt interval, alt oraș: capacitate separată
+    assert slots.book(day, 1, "Chișinău", 3)
+    assert slots.book(day, 0, "Bălți", 4)
+    assert not slots.book(day, 0, "Bălți", 5)
+
+
+def test_release_frees_the_slot_once(slots):
+    day = _day(1)
+    slots.book(day, 0, None, 1)
+    slots.book(day, 0, None, 2)
+    slots.release(1)
+    slots.release(1)
+    assert slots.remaining(day, 0, None) == 1
+    assert (day, 0) in slots.available(None, limit=10)
+
+
+@pytest.mark.parametrize(
+    "day, window, offered",
+    [
+        (1, 0, True),
+        (3, 1, True),
+        (4, 0, False),
+        (-1, 1, False),
+        (1, 2, False),
+        (1, -1, False),
+        ("2026-02-30", 0, False),
+        ("mâine", 0, False),
+    ],
+)
+def test_is_offered(slots, day, window, offered):
+    day = _day(day) if isinstance(day, int) else day
+    assert slots.is_offered(day, window) is offered
+
+
+def test_started_window_is_not_offered(slots):
+    # intervalul de la 00:00 a început deja azi
+    assert not slots.is_offered(_day(0), 0)
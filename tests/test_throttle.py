@@ -0,0 +1,50 @@
+import pytest
+
+import bot
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(bot.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_burst_then_wait(clock):
+    throttle = bot.UserThrottle({"ai": (3, 60)})
+    assert [throttle.hit("ai", 1) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert throttle.hit("ai", 1) == pytest.approx(60)
+    clock[0] += 59
+    assert throttle.hit("ai", 1) == pytest.approx(1)
+    clock[0] += 1
+    assert throttle.hit("ai", 1) == 0.0
+    assert throttle.hit("ai", 1) == pytest.approx(60)
+    assert throttle.allowed["ai"] == 4
+    assert throttle.throttled["ai"] == 3
+    assert throttle.offenders == {1: {"ai": 3}}
+
+
+def test_users_and_features_are_independent(clock):
+    throttle = bot.UserThrottle({"ai": (1, 60), "card": (1, 60)})
+    assert throttle.hit("ai", 1) == 0.0
+    assert throttle.hit("ai", 2) == 0.0
+    assert throttle.hit("card", 1) == 0.0
+    assert throttle.hit("ai", 1) > 0
+
+
+def test_unknown_feature_or_user_is_not_limited(clock):
+    throttle = bot.UserThrottle({"ai": (1, 60)})
+    assert throttle.hit("support", 1) == 0.0
+    assert all(throttle.hit("ai", None) == 0.0 for _ in range(5))
+
+
+def test_full_buckets_are_evicted(clock):
+    throttle = bot.UserThrottle({"ai": (2, 10)})
+    for user_id in range(100):
+        throttle.hit("ai", user_id)
+    clock[0] += 11
+    throttle.hit("ai", 1000)
+    # la un apel se scot cel mult 64 de intrări expirate din față
+    assert len(throttle._tat["ai"]) == 100 - 64 + 1
+    throttle.hit("ai", 1001)
+    assert list(throttle._tat["ai"]) == [1000, 1001]